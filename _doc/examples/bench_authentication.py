@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Coût de l'authentification
+==========================
+
+Le mot de passe commun est haché avec :epkg:`scrypt`
+(voir :func:`hash_password <mathenjeu.apps.common.password.hash_password>`),
+une fonction volontairement lente et gourmande en mémoire.
+Seule la connexion (``/authenticate``) vérifie le mot de passe,
+un mot de passe déjà vérifié n'est pas haché de nouveau
+(voir :class:`PasswordVerifier <mathenjeu.apps.common.password.PasswordVerifier>`),
+les requêtes suivantes ne vérifient que la signature du cookie
+et celle-ci est gardée en cache
+(voir :class:`SessionCache <mathenjeu.apps.common.session_cache.SessionCache>`).
+Ce script mesure le nombre de connexions par seconde
+et le coût de l'authentification pour les autres requêtes.
+
+Le script n'est pas exécuté lors de la génération de la documentation.
+"""
+import hashlib
+import tempfile
+from time import perf_counter
+from starlette.testclient import TestClient
+from mathenjeu.apps import QCMApp
+from mathenjeu.apps.common import hash_password
+
+#####################
+# Paramètres.
+
+N_LOGINS = 50
+N_REQUESTS = 2000
+temp = tempfile.mkdtemp()
+
+#####################
+# Coût d'un hachage, l'ancienne version utilisait :epkg:`sha256`.
+
+begin = perf_counter()
+for i in range(10):
+    hash_password("abc")
+print("scrypt: %1.2fms" % ((perf_counter() - begin) / 10 * 1000))
+begin = perf_counter()
+for i in range(10000):
+    hashlib.sha256(b"abc").hexdigest()
+print("sha256: %1.4fms" % ((perf_counter() - begin) / 10))
+
+#####################
+# Connexions par seconde. Les élèves d'une classe utilisent
+# le même mot de passe, il n'est haché qu'une fois par processus
+# sauf si le cache est vidé avant chaque connexion.
+
+
+def logins(clear):
+    app = QCMApp(cookie_key="dummypwd", folder=temp, userpwd="abc")
+    with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+        begin = perf_counter()
+        for i in range(N_LOGINS):
+            if clear:
+                app.pwd_verifier.clear()
+            client.post("/authenticate",
+                        data=dict(alias="eleve%d" % i, pwd="abc"))
+        return N_LOGINS / (perf_counter() - begin)
+
+
+print("logins/s with cache: %1.1f" % logins(False))
+print("logins/s without cache: %1.1f" % logins(True))
+
+#####################
+# Coût de l'authentification pour les autres requêtes,
+# avec et sans le cache des sessions vérifiées.
+
+for ttl in [60., None]:
+    app = QCMApp(cookie_key="dummypwd", folder=temp, userpwd="abc",
+                 session_cache_ttl=ttl)
+    with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+        client.post("/authenticate", data=dict(alias="eleve", pwd="abc"))
+        cook = client.cookies.get(app.cookie_name)
+    begin = perf_counter()
+    for i in range(N_REQUESTS):
+        app._decode_session(cook)  # pylint: disable=W0212
+    print("session_cache_ttl=%r: %1.1fus per request" % (
+        ttl, (perf_counter() - begin) / N_REQUESTS * 1e6))
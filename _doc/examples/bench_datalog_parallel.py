@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Lecture des logs avec plusieurs processus
+=========================================
+
+Avec ``n_jobs > 1``, :func:`enumerate_qcmlog <mathenjeu.datalog.qcmlog.enumerate_qcmlog>`
+découpe les fichiers en blocs d'octets lus par plusieurs processus
+(voir :func:`enumerate_parsed_shards <mathenjeu.datalog.parallel.enumerate_parsed_shards>`).
+Les processus décodent les lignes et construisent les observations,
+le processus principal calcule seulement les durées dans l'ordre des fichiers.
+Ce script compare le temps de lecture avec un seul processus
+et avec plusieurs sur des logs synthétiques
+(voir :func:`write_synthetic_qcmlog <mathenjeu.datalog.synthetic.write_synthetic_qcmlog>`).
+L'accélération ne peut pas dépasser le nombre de coeurs
+ni le rapport entre le temps avec un seul processus et le temps
+de calcul du processus principal (colonne *max_speedup*),
+ce rapport se mesure même sur une machine avec un seul coeur.
+
+Le script n'est pas exécuté lors de la génération de la documentation.
+"""
+import os
+import tempfile
+from time import perf_counter, process_time
+import pandas
+from mathenjeu.datalog import (
+    enumerate_parsed_shards, enumerate_qcmlog, enumerate_log_lines,
+    write_synthetic_qcmlog)
+from mathenjeu.datalog.lineparser import QCMLogLineParser
+
+#####################
+# Paramètres.
+
+N_LINES = 10 ** 6
+SHARD_SIZE = 2 ** 24
+cpus = os.cpu_count() or 1
+JOBS = sorted(set([1, 2, 4, cpus]))
+temp = tempfile.mkdtemp()
+name = os.path.join(temp, "QCMApp.log")
+write_synthetic_qcmlog(name, nb_lines=N_LINES)
+print("size: %1.1f Mb, cores: %d" % (os.path.getsize(name) / 2 ** 20, cpus))
+
+#####################
+# Décodage des lignes seulement (*parse*) puis calcul
+# des observations (*enumerate_qcmlog*). Avec un seul processus,
+# les lignes sont décodées sans pool de processus.
+
+
+def parse(files, n_jobs, parser, shard_size):
+    if n_jobs == 1:
+        return parser.parse_lines(enumerate_log_lines(files[0]))
+    return enumerate_parsed_shards(files, n_jobs=n_jobs, parser=parser,
+                                   shard_size=shard_size)
+
+
+def measure(fct, n_jobs):
+    parser = QCMLogLineParser(errors='skip')
+    begin, cpu = perf_counter(), process_time()
+    nb = sum(1 for _ in fct([name], n_jobs=n_jobs, parser=parser,
+                            shard_size=SHARD_SIZE))
+    return nb, perf_counter() - begin, process_time() - cpu
+
+
+rows = []
+for fct in [parse, enumerate_qcmlog]:
+    for n_jobs in JOBS:
+        nb, duration, cpu_main = measure(fct, n_jobs)
+        rows.append(dict(fct=fct.__name__, n_jobs=n_jobs, rows=nb,
+                         time=duration, cpu_main=cpu_main,
+                         lines_per_s=N_LINES / duration))
+        print(rows[-1])
+
+#####################
+# Résultats, l'accélération est calculée par rapport à ``n_jobs=1``.
+# *cpu_main* est le temps de calcul du processus principal,
+# *max_speedup* l'accélération obtenue avec autant de coeurs que nécessaire.
+
+df = pandas.DataFrame(rows)
+ref = df[df.n_jobs == 1].set_index('fct')['time']
+df['speedup'] = df['fct'].map(ref) / df['time']
+df['max_speedup'] = df['fct'].map(ref) / df['cpu_main']
+print(df.to_string())
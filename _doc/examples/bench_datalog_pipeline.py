@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Performances de la lecture des logs
+===================================
+
+La fonction :func:`benchmark_qcmlog <mathenjeu.datalog.benchmark.benchmark_qcmlog>`
+génère des logs synthétiques
+(voir :func:`write_synthetic_qcmlog <mathenjeu.datalog.synthetic.write_synthetic_qcmlog>`) :
+des élèves jouent aux questionnaires de :mod:`mathenjeu.tests.qcms`,
+la page envoie des événements, les élèves répondent ou passent
+les questions, quelques lignes ont l'ancien format et quelques autres
+sont tronquées. Elle mesure ensuite le temps et la mémoire
+nécessaires à :func:`enumerate_qcmlog <mathenjeu.datalog.qcmlog.enumerate_qcmlog>`,
+:func:`enumerate_qcmlogdf <mathenjeu.datalog.qcmlog.enumerate_qcmlogdf>`
+et aux agrégations, chaque mesure est faite dans un processus séparé.
+Ce script sert de référence pour vérifier qu'une modification
+du parseur améliore ou dégrade les performances.
+
+Le script n'est pas exécuté lors de la génération de la documentation.
+"""
+import os
+import tempfile
+from mathenjeu.datalog import benchmark_qcmlog
+
+#####################
+# Paramètres. L'étape *enumerate_qcmlogdf* qui construit
+# un dataframe par élève est beaucoup plus lente que les autres,
+# elle n'est mesurée que sur les plus petits fichiers.
+
+SIZES = [10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+SMALL_SIZES = [10 ** 4, 10 ** 5]
+temp = tempfile.mkdtemp()
+
+#####################
+# Mesures.
+
+df = benchmark_qcmlog(
+    SIZES, steps=['enumerate_qcmlog', 'consolidate', 'question_stats'],
+    folder=temp, fLOG=print)
+dfs = benchmark_qcmlog(SMALL_SIZES, steps=['enumerate_qcmlogdf'],
+                       folder=temp, fLOG=print)
+
+#####################
+# Résultats.
+
+for d in [df, dfs]:
+    print(d[['step', 'lines', 'time', 'lines_per_s', 'mb_per_s',
+             'peak_rss']].to_string())
+
+#####################
+# Les fichiers générés sont conservés dans *temp*.
+
+print(temp, os.listdir(temp))
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Lecture en continu de logs volumineux
+=====================================
+
+La fonction :func:`enumerate_qcmlog <mathenjeu.datalog.qcmlog.enumerate_qcmlog>`
+lit les fichiers de logs par blocs de taille fixe
+(voir :func:`enumerate_log_lines <mathenjeu.datalog.logreader.enumerate_log_lines>`).
+Ce script construit un fichier de logs synthétique de plusieurs
+gigaoctets et compare la lecture par blocs à l'ancienne lecture
+qui chargeait tout le fichier avec ``f.readlines()``.
+On mesure le temps nécessaire pour obtenir la première observation,
+le débit et la mémoire maximale utilisée par le processus.
+Chaque mesure est faite dans un processus séparé car la mémoire
+maximale d'un processus ne peut que croître.
+
+Le script n'est pas exécuté lors de la génération de la documentation.
+"""
+import os
+import sys
+import subprocess
+import tempfile
+from time import perf_counter
+
+#####################
+# Paramètres. Le fichier fait environ *SIZE* octets.
+
+SIZE = 2 * 2 ** 30
+this = os.path.abspath(os.path.dirname(__file__))
+source = os.path.join(this, "..", "..", "_unittests", "ut_datalog",
+                      "data", "QCMApp.log")
+temp = tempfile.mkdtemp()
+big = os.path.join(temp, "QCMApp-big.log")
+
+#####################
+# Génération du fichier. Le contenu du fichier de test
+# est répété, chaque répétition correspond à un autre élève.
+
+with open(source, "r", encoding="utf-8") as f:
+    content = f.read()
+
+begin = perf_counter()
+with open(big, "w", encoding="utf-8") as f:
+    size = 0
+    i = 0
+    while size < SIZE:
+        block = content.replace('"alias":"', '"alias":"s%d-' % i)
+        f.write(block)
+        size += len(block)
+        i += 1
+print("generated %d bytes in %1.2fs" % (
+    os.stat(big).st_size, perf_counter() - begin))
+
+#####################
+# Code exécuté dans chaque processus. Le mode *readlines*
+# reproduit l'ancienne lecture, le mode *lines* la lecture
+# par blocs, le mode *observations* ajoute le traitement
+# de chaque ligne.
+
+script = """
+import resource
+import sys
+from time import perf_counter
+from mathenjeu.datalog import enumerate_qcmlog, enumerate_log_lines
+
+name, mode = sys.argv[1:]
+begin = perf_counter()
+first = None
+n = 0
+if mode == 'readlines':
+    # previous implementation, everything is loaded in memory
+    with open(name, "r", encoding="utf-8") as f:
+        for line in f.readlines():
+            if "[DATA]" not in line:
+                continue
+            if first is None:
+                first = perf_counter() - begin
+            n += 1
+elif mode == 'lines':
+    for line in enumerate_log_lines(name):
+        if first is None:
+            first = perf_counter() - begin
+        n += 1
+else:
+    for obs in enumerate_qcmlog([name]):
+        if first is None:
+            first = perf_counter() - begin
+        n += 1
+total = perf_counter() - begin
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print("%s: n=%d first=%1.4fs total=%1.2fs peak_rss=%1.1fMb" % (
+    mode, n, first, total, rss))
+"""
+
+#####################
+# Mesures.
+
+for mode in ['lines', 'readlines', 'observations']:
+    out = subprocess.run([sys.executable, "-c", script, big, mode],
+                         capture_output=True, check=False)
+    print(out.stdout.decode("utf-8").strip())
+    if out.returncode != 0:
+        print(out.stderr.decode("utf-8"))
+
+os.remove(big)
@@ -84,8 +84,11 @@ mathdef_link_only = True
 
 epkg_dictionary.update({
     'BaseLogging': 'http://www.xavierdupre.fr/app/lightmlrestapi/helpsphinx/lightmlrestapi/mlapp/base_logging.html#lightmlrestapi.mlapp.base_logging.BaseLogging',
+    'datetime.strptime': 'https://docs.python.org/3/library/datetime.html#datetime.datetime.strptime',
     'FileZilla': 'https://filezilla-project.org/',
     'format': 'https://docs.python.org/3/library/functions.html?highlight=format#format',
+    'functools.lru_cache': 'https://docs.python.org/3/library/functools.html#functools.lru_cache',
+    'HMAC': 'https://docs.python.org/3/library/hmac.html',
     'HTTP': 'https://en.wikipedia.org/wiki/Hypertext_Transfer_Protocol',
     'HTTPS': 'https://en.wikipedia.org/wiki/HTTPS',
     'HTTP 404': 'https://en.wikipedia.org/wiki/HTTP_404',
@@ -93,9 +96,20 @@ epkg_dictionary.update({
     'https': 'https://en.wikipedia.org/wiki/HTTPS',
     'hypercorn': 'https://pgjones.gitlab.io/hypercorn/',
     "QCM": 'https://en.wikipedia.org/wiki/Multiple_choice',
+    'marshal': 'https://docs.python.org/3/library/marshal.html',
+    'mmap': 'https://docs.python.org/3/library/mmap.html',
+    'msgpack': 'https://msgpack.org/',
+    'zstandard': 'https://python-zstandard.readthedocs.io/',
+    'parquet': 'https://parquet.apache.org/',
+    'pickle': 'https://docs.python.org/3/library/pickle.html',
+    'pyarrow': 'https://arrow.apache.org/docs/python/',
     'pyformat': 'https://github.com/myint/pyformat',
+    'sha256': 'https://docs.python.org/3/library/hashlib.html',
+    'SQLite': 'https://www.sqlite.org/',
+    'scrypt': 'https://docs.python.org/3/library/hashlib.html#hashlib.scrypt',
     'SessionMiddleware': 'https://github.com/encode/starlette/blob/master/starlette/middleware/sessions.py',
     'starlette': 'https://github.com/encode/starlette',
+    'TimedRotatingFileHandler': 'https://docs.python.org/3/library/logging.handlers.html#logging.handlers.TimedRotatingFileHandler',
     "ujson": 'https://github.com/esnme/ultrajson',
     'uvicorn': 'https://github.com/encode/uvicorn',
     'waitress': 'https://docs.pylonsproject.org/projects/waitress/en/latest/',
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+@brief      test log(time=3s)
+"""
+import os
+import time
+import unittest
+import ujson
+from starlette.testclient import TestClient
+from pyquickhelper.pycode import get_temp_folder, ExtTestCase
+from mathenjeu.apps.common import EventCoalescer, collapse_events
+from mathenjeu.cli import create_qcm_local_app
+from mathenjeu.datalog import enumerate_log_lines, parse_qcmlog_line
+
+
+class TestEventCoalescer(ExtTestCase):
+
+    def test_collapse_events(self):
+        self.assertEqual(collapse_events(['a', 'a', 'b', 'b', 'a']),
+                         ['a', 'b', 'a'])
+        self.assertEqual(collapse_events([]), [])
+
+    def test_event_coalescer(self):
+        records = []
+        coal = EventCoalescer(
+            lambda *args: records.append(args), window=0.2, timer=False)
+        for i in range(5):
+            self.assertEqual(coal.add('k1', 'event', {'alias': 'a'}, None,
+                                      'focus:%s' % (i >= 3)), i == 0)
+        self.assertTrue(coal.add('k2', 'event', {'alias': 'b'}, None, 'x'))
+        self.assertEqual(len(records), 2)
+        time.sleep(0.3)
+        coal.sweep()
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0][3], dict(events=['focus:False']))
+        self.assertEqual(records[2][3], dict(
+            events=['focus:False', 'focus:True'], count=4))
+        # key k2 had only one event
+        self.assertEqual(len(coal.buckets), 0)
+        coal.add('k1', 'event', None, None, 'e')
+        coal.add('k1', 'event', None, None, 'e')
+        coal.flush()
+        self.assertEqual(records[-1][3], dict(events=['e'], count=1))
+        self.assertEqual(coal.nb_received, 8)
+        self.assertEqual(coal.nb_written, 5)
+        self.assertRaise(lambda: EventCoalescer(None, window=0), ValueError)
+
+    def test_event_coalescer_timer(self):
+        records = []
+        coal = EventCoalescer(
+            lambda *args: records.append(args), window=0.1)
+        for _ in range(3):
+            coal.add('k1', 'event', {'alias': 'a'}, None, 'focus:True')
+        # no other event, the background thread writes the window
+        for _ in range(50):
+            if len(records) == 2:
+                break
+            time.sleep(0.05)
+        self.assertEqual(records[-1][3], dict(events=['focus:True'], count=2))
+        self.assertEqual(len(coal.buckets), 0)
+        coal.close()
+        self.assertIsNone(coal.thread)
+
+    def read_events(self, temp):
+        names = [os.path.join(temp, n) for n in os.listdir(temp)
+                 if n.startswith("QCMApp") and n.endswith(".log")]
+        rows = [parse_qcmlog_line(line)
+                for line in enumerate_log_lines(names[0])]
+        return [r for r in rows if r['msg'] == 'event']
+
+    def test_event_window(self):
+        temp = get_temp_folder(__file__, "temp_event_window")
+        app = create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                   userpwd="abc", event_window=60,
+                                   fLOG=None)
+        with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+            client.post("/authenticate", data=dict(alias="xavierd", pwd="abc"))
+            for i in range(10):
+                page = client.get(
+                    "/event?game=simple_french_qcm&qn=1&focus=%s" % (i % 2 == 0))
+                self.assertEqual(page.status_code, 200)
+            page = client.get("/event?game=simple_french_qcm&qn=2&focus=true")
+            self.assertEqual(page.status_code, 200)
+            self.assertEqual(len(self.read_events(temp)), 2)
+        events = self.read_events(temp)
+        self.assertEqual(len(events), 3)
+        self.assertEqual(events[0]['events'],
+                         ['focus:True,game:simple_french_qcm,qn:1'])
+        self.assertEqual(events[0]['session']['alias'], 'xavierd')
+        self.assertEqual(events[2]['count'], 9)
+        self.assertEqual(len(events[2]['events']), 9)
+
+    def test_event_batch(self):
+        temp = get_temp_folder(__file__, "temp_event_batch")
+        app = create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                   userpwd="abc", event_batch=500,
+                                   fLOG=None)
+        with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+            client.post("/authenticate", data=dict(alias="xavierd", pwd="abc"))
+            page = client.get("/qcm?game=simple_french_qcm&qn=0")
+            self.assertIn(b"sendBeacon", page.content)
+            evs = [dict(game="simple_french_qcm", qn="0", focus=f)
+                   for f in ['true', 'true', 'false']]
+            page = client.post("/event", content=ujson.dumps(dict(events=evs)))
+            self.assertEqual(page.status_code, 200)
+            page = client.post("/event", content=b"{")
+            self.assertEqual(page.status_code, 400)
+            page = client.post("/event", content=b'{"events": [1]}')
+            self.assertEqual(page.status_code, 400)
+        events = self.read_events(temp)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['count'], 3)
+        self.assertEqual(events[0]['events'],
+                         ['focus:true,game:simple_french_qcm,qn:0',
+                          'focus:false,game:simple_french_qcm,qn:0'])
+
+
+if __name__ == "__main__":
+    unittest.main()
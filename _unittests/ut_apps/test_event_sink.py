@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+@brief      test log(time=3s)
+"""
+import os
+import threading
+import unittest
+from starlette.testclient import TestClient
+from pyquickhelper.pycode import get_temp_folder, ExtTestCase
+from mathenjeu.cli import create_qcm_local_app
+from mathenjeu.datalog import enumerate_qcmlog, enumerate_binlog_records
+
+
+class TestEventSink(ExtTestCase):
+
+    def run_exam(self, temp, event_sink, async_log=None, threads=None):
+        app = create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                   userpwd="abc", event_sink=event_sink,
+                                   async_log=async_log, fLOG=None)
+        if threads is not None:
+            write_batch = app.event_sink.write_batch
+
+            def wrapped(events):
+                threads.append((threading.current_thread().name, len(events)))
+                write_batch(events)
+
+            app.event_sink.write_batch = wrapped
+        with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+            page = client.post("/authenticate",
+                               data=dict(alias="xavierd", pwd="abc"))
+            self.assertEqual(page.status_code, 200)
+            for qn in range(3):
+                page = client.get("/qcm?game=simple_french_qcm&qn=%d" % qn)
+                self.assertEqual(page.status_code, 200)
+                page = client.get(
+                    "/event?game=simple_french_qcm&qn=%d&focus=a0" % qn)
+                self.assertEqual(page.status_code, 200)
+                client.post(
+                    "/answer?game=simple_french_qcm&qn=%d&next=%d" % (
+                        qn, qn + 1),
+                    data=dict(a0='on', b='ok'), follow_redirects=False)
+        names = [os.path.join(temp, n) for n in sorted(os.listdir(temp))
+                 if n.startswith("QCMApp")]
+        return app, names
+
+    @staticmethod
+    def clean(obs):
+        return [{k: v for k, v in o.items()
+                 if k != 'time' and not k.endswith('-duration')}
+                for o in obs]
+
+    def test_event_sink(self):
+        temp = get_temp_folder(__file__, "temp_event_sink")
+        app, names = self.run_exam(temp, True)
+        self.assertIsNone(app.event_sink.stream)
+        text = [n for n in names if n.endswith(".log")]
+        binary = [n for n in names if n.endswith(".events.mpk")]
+        self.assertEqual(len(text), 1)
+        self.assertEqual(len(binary), 1)
+        exp = self.clean(enumerate_qcmlog(text))
+        got = self.clean(enumerate_qcmlog(binary))
+        self.assertGreater(len(exp), 3)
+        self.assertEqual(exp, got)
+
+    def test_event_sink_async(self):
+        temp = get_temp_folder(__file__, "temp_event_sink_async")
+        threads = []
+        app, names = self.run_exam(temp, True, async_log=dict(
+            flush_interval=0.2, batch_size=1000), threads=threads)
+        self.assertIsNone(app.log_writer)
+        self.assertEqual(set(t[0] for t in threads), {"BatchLogWriter"})
+        self.assertLess(len(threads), sum(t[1] for t in threads))
+        text = [n for n in names if n.endswith(".log")]
+        binary = [n for n in names if n.endswith(".events.mpk")]
+        exp = self.clean(enumerate_qcmlog(text))
+        got = self.clean(enumerate_qcmlog(binary))
+        self.assertGreater(len(exp), 3)
+        self.assertEqual(exp, got)
+
+    def test_event_sink_only(self):
+        temp = get_temp_folder(__file__, "temp_event_sink_only")
+        _, names = self.run_exam(temp, 'only')
+        text = [n for n in names if n.endswith(".log")]
+        binary = [n for n in names if n.endswith(".events.mpk")]
+        with open(text[0], "r", encoding="utf-8") as f:
+            self.assertNotIn("[DATA]", f.read())
+        rows = list(enumerate_binlog_records(binary[0]))
+        self.assertEqual([r['msg'] for r in rows].count('answer'), 3)
+        self.assertRaise(
+            lambda: create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                         event_sink='yes', fLOG=None),
+            ValueError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+@brief      test log(time=3s)
+"""
+import unittest
+from starlette.testclient import TestClient
+from pyquickhelper.pycode import get_temp_folder, ExtTestCase
+from mathenjeu.apps import QCMApp
+from mathenjeu.apps.display import DisplayQuestionChoiceHTML
+from mathenjeu.apps.qcm import GameCatalog
+from mathenjeu.tests import get_game
+
+
+class TestGameCatalog(ExtTestCase):
+
+    @staticmethod
+    def counted_get_game():
+        calls = []
+
+        def fct_game(name):
+            calls.append(name)
+            return get_game(name)
+
+        return calls, fct_game
+
+    def test_game_catalog(self):
+        calls, fct_game = self.counted_get_game()
+        display = DisplayQuestionChoiceHTML()
+        catalog = GameCatalog(fct_game, display)
+        game = get_game("simple_french_qcm")
+        for qn in [0, 1, '1', '2', len(game) - 1]:
+            expected = display.get_context(game, qn)
+            context = catalog.get_context("simple_french_qcm", qn)
+            self.assertEqual(expected, context)
+        self.assertEqual(calls, ["simple_french_qcm"])
+        self.assertEqual(len(catalog.contexts), 4)
+
+        context['qn'] = 'changed'
+        context = catalog.get_context("simple_french_qcm", len(game) - 1)
+        self.assertEqual(context['qn'], len(game) - 1)
+
+        self.assertRaise(lambda: catalog.get_context("simple_french_qcm", "a"),
+                         ValueError)
+        self.assertRaise(lambda: catalog.get_context("simple_french_qcm", 1000),
+                         IndexError)
+        self.assertRaise(lambda: catalog.get_game("unknown"), ValueError)
+        self.assertEqual(len(catalog.contexts), 4)
+        self.assertEqual(len(catalog), 1)
+
+        catalog.clear()
+        catalog.precompile(["simple_french_qcm", "ml_french_qcm"])
+        self.assertEqual(len(catalog), 2)
+        self.assertEqual(len(catalog.contexts),
+                         len(game) + len(get_game("ml_french_qcm")))
+        self.assertEqual(len(calls), 4)
+
+    def test_game_catalog_qcm_app(self):
+        temp = get_temp_folder(__file__, "temp_game_catalog")
+        calls, fct_game = self.counted_get_game()
+        app = QCMApp(cookie_key="dummypwd", folder=temp, userpwd="abc",
+                     fct_game=fct_game)
+        with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+            page = client.post("/authenticate",
+                               data=dict(alias="xavierd", pwd="abc"))
+            self.assertEqual(page.status_code, 200)
+            self.assertEqual(calls, [])
+            pages = []
+            for _ in range(3):
+                page = client.get("/qcm?game=test_qcm1&qn=1")
+                self.assertEqual(page.status_code, 200)
+                pages.append(page.content)
+            self.assertEqual(calls, ["test_qcm1"])
+            self.assertEqual(pages[0], pages[2])
+            self.assertIn(b"Question - 2/", pages[0])
+            self.assertIn(b"qn=1&", pages[0])
+            page = client.get("/qcm?game=test_qcm1&qn=01")
+            self.assertIn(b"qn=01&", page.content)
+            self.assertEqual(calls, ["test_qcm1"])
+
+    def test_game_catalog_precompile(self):
+        temp = get_temp_folder(__file__, "temp_game_catalog_precompile")
+        calls, fct_game = self.counted_get_game()
+        app = QCMApp(cookie_key="dummypwd", folder=temp, userpwd="abc",
+                     fct_game=fct_game, precompile_games=True)
+        with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+            self.assertEqual(calls, ["test_qcm1", "test_ml1"])
+            client.post("/authenticate", data=dict(alias="xavierd", pwd="abc"))
+            page = client.get("/qcm?game=test_ml1&qn=0")
+            self.assertEqual(page.status_code, 200)
+            self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+@brief      test log(time=3s)
+"""
+import os
+import time
+import unittest
+import threading
+from starlette.testclient import TestClient
+from pyquickhelper.pycode import get_temp_folder, ExtTestCase
+from mathenjeu.apps.common import LogApp
+from mathenjeu.cli import create_qcm_local_app
+from mathenjeu.datalog import enumerate_log_lines, parse_qcmlog_line
+
+
+class LogWriterApp(LogApp):
+    "Uses its own logger."
+
+
+class TestLogWriter(ExtTestCase):
+
+    def read_logs(self, folder, prefix):
+        rows = []
+        for name in sorted(os.listdir(folder)):
+            if name.startswith(prefix) and name.endswith(".log"):
+                rows.extend(parse_qcmlog_line(line) for line in
+                            enumerate_log_lines(os.path.join(folder, name)))
+        return rows
+
+    def test_log_writer(self):
+        temp = get_temp_folder(__file__, "temp_log_writer")
+        app = LogWriterApp(folder=temp, async_log=dict(
+            batch_size=50, flush_interval=0.01))
+        writer = app.log_writer
+
+        def log(k):
+            for i in range(250):
+                app.info('[DATA]', dict(msg='event', thread=k, i=i))
+
+        threads = [threading.Thread(target=log, args=(k, ))
+                   for k in range(4)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        app.flush_log()
+        self.assertEqual(writer.nb_written, 1000)
+        self.assertLess(writer.nb_batches, 1000)
+        rows = self.read_logs(temp, "LogWriterApp")
+        self.assertEqual(len(rows), 1000)
+        for k in range(4):
+            self.assertEqual([r['i'] for r in rows if r['thread'] == k],
+                             list(range(250)))
+        times = [r['time'] for r in rows]
+        self.assertEqual(times, sorted(times))
+
+        app.close_log()
+        self.assertIsNone(app.log_writer)
+        app.info('[DATA]', dict(msg='event', thread=-1))
+        self.assertEqual(len(self.read_logs(temp, "LogWriterApp")), 1001)
+
+    def test_log_writer_backpressure(self):
+        temp = get_temp_folder(__file__, "temp_log_writer_backpressure")
+        app = LogWriterApp(folder=temp, async_log=dict(
+            max_queue=1, flush_interval=0.01))
+        writer = app.log_writer
+        for i in range(200):
+            begin = time.perf_counter()
+            app.info('[DATA]', dict(msg='event', i=i))
+            app.info('[LogWriterApp] page', dict(i=i))
+            self.assertLess(time.perf_counter() - begin, 0.1)
+        app.close_log()
+        # the data is never dropped
+        self.assertGreater(writer.nb_overflows, 0)
+        self.assertGreater(writer.nb_dropped, 0)
+        self.assertEqual(writer.nb_written + writer.nb_dropped, 400)
+        rows = self.read_logs(temp, "LogWriterApp")
+        self.assertEqual([r['i'] for r in rows], list(range(200)))
+
+    def test_qcm_app_async_log(self):
+        temp = get_temp_folder(__file__, "temp_qcm_app_async_log")
+        app = create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                   async_log=True, fLOG=None)
+        self.assertIsNotNone(app.log_writer)
+        with TestClient(app.app.router) as client:
+            for i in range(20):
+                page = client.get("/event?game=g&qn=%d" % i)
+                self.assertEqual(page.status_code, 200)
+        # shutdown writes everything
+        self.assertIsNone(app.log_writer)
+        rows = [r for r in self.read_logs(temp, "QCMApp")
+                if r.get('msg', None) == 'event' and
+                'game:g' in r['events'][0]]
+        self.assertEqual(len(rows), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
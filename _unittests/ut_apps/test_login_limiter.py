@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+@brief      test log(time=3s)
+"""
+import asyncio
+import threading
+import time
+import unittest
+import httpx
+from starlette.testclient import TestClient
+from pyquickhelper.pycode import get_temp_folder, ExtTestCase
+from mathenjeu.cli import create_qcm_local_app
+from mathenjeu.apps.common import LoginLimiter
+
+
+class TestLoginLimiter(ExtTestCase):
+
+    @staticmethod
+    def slow(x):
+        time.sleep(0.2)
+        return x
+
+    def test_login_limiter(self):
+        limiter = LoginLimiter(max_concurrent=2, max_waiting=2,
+                               wait_timeout=1.)
+
+        async def main():
+            return await asyncio.gather(
+                *[limiter.run(self.slow, i) for i in range(6)])
+
+        res = asyncio.run(main())
+        self.assertEqual(res[:4], [(True, 0), (True, 1), (True, 2), (True, 3)])
+        self.assertEqual(res[4:], [(False, None), (False, None)])
+        metrics = limiter.metrics()
+        self.assertEqual(metrics['admitted'], 4)
+        self.assertEqual(metrics['rejected'], 2)
+        self.assertEqual(metrics['timeouts'], 0)
+        self.assertEqual(metrics['peak_active'], 2)
+        self.assertEqual(metrics['peak_waiting'], 2)
+        self.assertEqual((metrics['active'], metrics['waiting']), (0, 0))
+        self.assertGreater(metrics['wait_max'], 0.15)
+        self.assertGreater(metrics['duration_mean'], 0.15)
+
+        # a new event loop
+        self.assertEqual(asyncio.run(limiter.run(self.slow, 7)), (True, 7))
+        limiter.close()
+
+    def test_login_limiter_timeout(self):
+        limiter = LoginLimiter(max_concurrent=1, wait_timeout=0.05)
+
+        async def main():
+            return await asyncio.gather(
+                *[limiter.run(self.slow, i) for i in range(2)])
+
+        res = asyncio.run(main())
+        self.assertEqual(res, [(True, 0), (False, None)])
+        self.assertEqual(limiter.metrics()['timeouts'], 1)
+        self.assertEqual(limiter.metrics()['waiting'], 0)
+        self.assertRaise(lambda: LoginLimiter(0), ValueError)
+        limiter.close()
+
+    def test_login_limiter_release_at_timeout(self):
+        limiter = LoginLimiter(max_concurrent=1, wait_timeout=0.01)
+
+        async def main():
+            semaphore = limiter._get_semaphore()  # pylint: disable=W0212
+            loop = asyncio.get_running_loop()
+            res = []
+            for i in range(20):
+                # the permit is released when the waiting login times out
+                await semaphore.acquire()
+                loop.call_later(limiter.wait_timeout, semaphore.release)
+                res.append(await limiter.run(abs, i))
+            # a login cancelled while it waits
+            await semaphore.acquire()
+            waiting = asyncio.ensure_future(limiter.run(abs, 20))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            semaphore.release()
+            await asyncio.sleep(0)
+            return semaphore, res
+
+        semaphore, res = asyncio.run(main())
+        self.assertFalse(semaphore.locked())
+        metrics = limiter.metrics()
+        self.assertEqual(metrics['admitted'] + metrics['timeouts'], 20)
+        self.assertEqual(metrics['admitted'], sum(r[0] for r in res))
+        self.assertEqual((metrics['active'], metrics['waiting']), (0, 0))
+        limiter.close()
+
+    def test_app_login_limiter(self):
+        temp = get_temp_folder(__file__, "temp_app_login_limiter")
+        app = create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                   userpwd="abc", fLOG=None,
+                                   login_concurrency=1)
+        with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+            page = client.get("/login_metrics")
+            self.assertNotIn(b"admitted", page.content)
+            self.assertIn(b"Se connecter", page.content)
+            page = client.post("/authenticate",
+                               data=dict(alias="xavierd", pwd="abc"))
+            self.assertEqual(page.status_code, 200)
+            self.assertIn(b"est reconnu", page.content)
+            page = client.get("/login_metrics")
+            self.assertEqual(page.json()['admitted'], 1)
+            page = client.post("/authenticate",
+                               data=dict(alias="xavierd", pwd="abd"))
+            self.assertIn(b"n'est pas reconnu", page.content)
+            page = client.get("/login_metrics")
+            self.assertEqual(page.json()['admitted'], 2)
+
+        # a burst of logins
+        app.login_limiter.max_waiting = 1
+        is_allowed = app.is_allowed
+
+        def slow_is_allowed(alias, pwd, request):
+            time.sleep(0.2)
+            return is_allowed(alias, pwd, request)
+
+        app.is_allowed = slow_is_allowed
+
+        async def main():
+            transport = httpx.ASGITransport(app=app.app.router)
+            async with httpx.AsyncClient(
+                    transport=transport, base_url="http://127.0.0.1") as client:
+                return await asyncio.gather(*[
+                    client.post("/authenticate",
+                                data=dict(alias="eleve%d" % i, pwd="abc"))
+                    for i in range(4)])
+
+        pages = asyncio.run(main())
+        self.assertEqual([p.status_code for p in pages], [200, 200, 503, 503])
+        self.assertIn(b"Trop de connexions", pages[-1].content)
+        self.assertEqual(pages[-1].headers['retry-after'], '6')
+        metrics = app.login_limiter.metrics()
+        self.assertEqual(metrics['rejected'], 2)
+        self.assertEqual(metrics['peak_waiting'], 1)
+
+    def test_app_login_default_thread(self):
+        temp = get_temp_folder(__file__, "temp_app_login_default_thread")
+        app = create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                   userpwd="abc", fLOG=None)
+        self.assertEqual(app.login_limiter.max_concurrent,
+                         LoginLimiter.DEFAULT_CONCURRENCY)
+        threads = []
+        is_allowed = app.is_allowed
+
+        def thread_is_allowed(alias, pwd, request):
+            threads.append(threading.current_thread().name)
+            return is_allowed(alias, pwd, request)
+
+        app.is_allowed = thread_is_allowed
+        with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+            page = client.post("/authenticate",
+                               data=dict(alias="xavierd", pwd="abc"))
+            self.assertIn(b"est reconnu", page.content)
+            self.assertEqual(client.get("/login_metrics").json()['admitted'], 1)
+        self.assertEqual(len(threads), 1)
+        self.assertStartsWith("LoginLimiter", threads[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
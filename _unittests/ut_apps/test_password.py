@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+@brief      test log(time=3s)
+"""
+import unittest
+import ujson
+from starlette.testclient import TestClient
+from pyquickhelper.pycode import get_temp_folder, ExtTestCase
+from mathenjeu.cli import create_qcm_local_app
+from mathenjeu.apps.common import (
+    hash_password, verify_password, PasswordVerifier)
+
+
+class TestPassword(ExtTestCase):
+
+    def test_hash_password(self):
+        h1 = hash_password("abc", n=2 ** 10)
+        h2 = hash_password("abc", n=2 ** 10)
+        self.assertNotEqual(h1, h2)
+        self.assertTrue(h1.startswith("scrypt$1024$8$1$"))
+        self.assertTrue(verify_password("abc", h1))
+        self.assertTrue(verify_password("abc", h2))
+        self.assertFalse(verify_password("abd", h1))
+        self.assertFalse(verify_password(None, h1))
+        self.assertFalse(verify_password("abc", None))
+        self.assertEqual(hash_password("é", salt=b"0" * 16),
+                         hash_password("é", salt=b"0" * 16))
+        self.assertRaise(lambda: verify_password("abc", "a" * 64), ValueError)
+
+    def test_password_verifier(self):
+        hashed = hash_password("abc", n=2 ** 10)
+        verifier = PasswordVerifier()
+        self.assertTrue(verifier.verify("abc", hashed))
+        self.assertTrue(verifier.verify("abc", hashed))
+        self.assertEqual(verifier.cache.nb_hits, 1)
+        self.assertEqual(len(verifier.cache), 1)
+        self.assertFalse(verifier.verify("abd", hashed))
+        self.assertFalse(verifier.verify("abd", hashed))
+        self.assertEqual(len(verifier.cache), 1)
+        self.assertEqual(verifier.cache.nb_hits, 1)
+        self.assertFalse(verifier.verify(None, hashed))
+        # the cache depends on the hashed password
+        self.assertFalse(verifier.verify("abc", hash_password("abd", n=2 ** 10)))
+        verifier.clear()
+        self.assertEqual(len(verifier.cache), 0)
+
+    def test_app_password(self):
+        temp = get_temp_folder(__file__, "temp_app_password")
+        app = create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                   userpwd="abc", fLOG=None)
+        self.assertTrue(app.hashed_userpwd.startswith("scrypt$"))
+        with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+            page = client.post("/authenticate",
+                               data=dict(alias="xavierd", pwd="abd"))
+            self.assertIn(b"n'est pas reconnu", page.content)
+            for alias in ["xavierd", "marie-c"]:
+                page = client.post("/authenticate",
+                                   data=dict(alias=alias, pwd="abc"))
+                self.assertIn(b"est reconnu", page.content)
+            # the password was hashed only once
+            self.assertEqual(app.pwd_verifier.cache.nb_hits, 1)
+            cook = client.cookies.get(app.cookie_name)
+
+        # the cookie does not contain the hashed password
+        session = ujson.loads(app.signer.loads(cook)[0])
+        self.assertEqual(session['hashpwd'], app.pwd_stamp())
+        self.assertNotIn(app.hashed_userpwd, cook)
+
+        # another process with the same key accepts the session
+        app2 = create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                    userpwd="abc", fLOG=None)
+        self.assertEqual(app2.hashed_userpwd, app.hashed_userpwd)
+        self.assertEqual(app2._decode_session(cook)['alias'],  # pylint: disable=W0212
+                         'marie-c')
+        app3 = create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                    userpwd="abcd", fLOG=None)
+        self.assertEqual(app3._decode_session(cook), {})  # pylint: disable=W0212
+        app4 = create_qcm_local_app(cookie_key="other", folder=temp,
+                                    userpwd="abc", fLOG=None)
+        self.assertNotEqual(app4.hashed_userpwd, app.hashed_userpwd)
+
+
+if __name__ == "__main__":
+    unittest.main()
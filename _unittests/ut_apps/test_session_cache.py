@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+@brief      test log(time=3s)
+"""
+import os
+import time
+import unittest
+from starlette.testclient import TestClient
+from pyquickhelper.pycode import get_temp_folder, ExtTestCase
+from mathenjeu.cli import create_qcm_local_app, create_static_local_app
+from mathenjeu.apps.common import SessionCache
+from mathenjeu.apps import QCMApp
+
+
+class TestSessionCache(ExtTestCase):
+
+    @staticmethod
+    def count_decodes(app):
+        calls = []
+        decode = app._decode_session  # pylint: disable=W0212
+
+        def wrapped(cook):
+            calls.append(cook)
+            return decode(cook)
+
+        app._decode_session = wrapped  # pylint: disable=W0212
+        return calls
+
+    def test_session_cache_qcm(self):
+        temp = get_temp_folder(__file__, "temp_session_cache_qcm")
+        app = create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                   userpwd="abc", fLOG=None)
+        calls = self.count_decodes(app)
+        with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+            page = client.post("/authenticate",
+                               data=dict(alias="xavierd", pwd="abc"))
+            self.assertEqual(page.status_code, 200)
+            del calls[:]
+            page = client.get("/qcm?game=simple_french_qcm&qn=0")
+            self.assertEqual(page.status_code, 200)
+            self.assertEqual(len(calls), 1)
+            page = client.get("/event?game=simple_french_qcm&qn=0&focus=a0")
+            self.assertEqual(page.status_code, 200)
+            self.assertEqual(len(calls), 2)
+            self.assertNotIn(None, calls)
+
+    def test_session_cache_static(self):
+        temp = get_temp_folder(__file__, "temp_session_cache_static")
+        folder = os.path.normpath(os.path.join(temp, '..'))
+        app = create_static_local_app(cookie_key="dummypwd", folder=temp,
+                                      content=[('zoo', folder)],
+                                      userpwd="abcd", fLOG=None)
+        calls = self.count_decodes(app)
+        with TestClient(app.app, base_url="http://127.0.0.1") as client:
+            page = client.post("/authenticate",
+                               data=dict(alias="xavierd", pwd="abcd"))
+            self.assertEqual(page.status_code, 200)
+            del calls[:]
+            page = client.get("/zoo/test_session_cache.py")
+            self.assertEqual(page.status_code, 200)
+            self.assertIn(b"count_decodes", page.content)
+            self.assertEqual(len(calls), 1)
+
+        # an invalid session is not decoded twice either
+        app.hashed_userpwd = app.hash_pwd("other")
+        del calls[:]
+        with TestClient(app.app, base_url="http://127.0.0.1") as client:
+            client.cookies.set(app.cookie_name, app.signer.dumps(
+                ['{"alias":"xavierd","hashpwd":"0"}']))
+            page = client.get("/event?focus=a0")
+            self.assertEqual(page.status_code, 200)
+            self.assertEqual(len(calls), 1)
+
+    def test_session_cache_class(self):
+        cache = SessionCache(max_size=2, ttl=0.5)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), 1)
+        cache.remove('a')
+        cache.remove('zz')
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual((cache.nb_hits, cache.nb_misses), (2, 2))
+        time.sleep(0.6)
+        self.assertEqual(cache.get('c'), None)
+        self.assertEqual(len(cache), 0)
+        cache.set('d', 4)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertRaise(lambda: SessionCache(ttl=0), ValueError)
+
+    def test_verified_session_cache(self):
+        temp = get_temp_folder(__file__, "temp_verified_session_cache")
+        app = create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                   userpwd="abc", fLOG=None)
+        calls = []
+        verify = app._verify_session  # pylint: disable=W0212
+
+        def wrapped(cook):
+            calls.append(cook)
+            return verify(cook)
+
+        app._verify_session = wrapped  # pylint: disable=W0212
+        with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+            page = client.post("/authenticate",
+                               data=dict(alias="xavierd", pwd="abc"))
+            self.assertEqual(page.status_code, 200)
+            cook = client.cookies.get(app.cookie_name)
+            for qn in range(3):
+                page = client.get(
+                    "/qcm?game=simple_french_qcm&qn={0}".format(qn))
+                self.assertEqual(page.status_code, 200)
+                self.assertIn(b"<p>xavierd</p>", page.content)
+            self.assertEqual(calls, [cook])
+
+            # logout removes the session from the cache
+            client.get("/logout", follow_redirects=False)
+            self.assertEqual(len(app.session_cache), 0)
+            client.cookies.set(app.cookie_name, cook)
+            page = client.get("/qcm?game=simple_french_qcm&qn=0")
+            self.assertIn(b"<p>xavierd</p>", page.content)
+            self.assertEqual(calls, [cook, cook])
+
+        # a new password invalidates the verified sessions
+        session = app._decode_session(cook)  # pylint: disable=W0212
+        self.assertEqual(session['alias'], 'xavierd')
+        self.assertEqual(len(calls), 2)
+        app.set_userpwd("abcd")
+        self.assertEqual(app._decode_session(cook), {})  # pylint: disable=W0212
+        self.assertEqual(len(calls), 3)
+
+        # the cache can be disabled
+        app = QCMApp(cookie_key="dummypwd", folder=temp, userpwd="abc",
+                     session_cache_ttl=None)
+        self.assertEmpty(app.session_cache)
+        self.assertEqual(app._decode_session(cook)['alias'],  # pylint: disable=W0212
+                         'xavierd')
+
+
+if __name__ == "__main__":
+    unittest.main()
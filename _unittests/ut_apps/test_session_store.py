@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+@brief      test log(time=3s)
+"""
+import os
+import time
+import unittest
+from starlette.testclient import TestClient
+from pyquickhelper.pycode import get_temp_folder, ExtTestCase
+from mathenjeu.cli import create_qcm_local_app
+from mathenjeu.apps.common import (
+    MemorySessionStore, SQLiteSessionStore, SessionStore,
+    create_session_store)
+
+
+class TestSessionStore(ExtTestCase):
+
+    def check_store(self, store, other=None):
+        sid = store.create(dict(alias="xavierd", hashpwd="0"))
+        self.assertGreater(len(sid), 40)
+        self.assertEqual(store.get(sid), dict(alias="xavierd", hashpwd="0"))
+        self.assertEqual(store.get("unknown"), None)
+        sid2 = store.create(dict(alias="xavierd"))
+        sid3 = store.create(dict(alias="marie"))
+        self.assertEqual(store.count(), (3, 2))
+        if other is not None:
+            self.assertEqual(other.get(sid3), dict(alias="marie"))
+        store.delete(sid)
+        self.assertEqual(store.get(sid), None)
+        self.assertEqual(store.revoke("xavierd"), 1)
+        self.assertEqual(store.get(sid2), None)
+        self.assertEqual(store.count(), (1, 1))
+        store.clear()
+        self.assertEqual(store.count(), (0, 0))
+
+        store.ttl = 0.2
+        sid = store.create(dict(alias="xavierd"))
+        self.assertNotEmpty(store.get(sid))
+        time.sleep(0.3)
+        self.assertEqual(store.get(sid), None)
+        self.assertEqual(store.count(), (0, 0))
+
+    def test_memory_store(self):
+        self.check_store(MemorySessionStore())
+        self.assertRaise(lambda: MemorySessionStore(0), ValueError)
+
+    def test_sqlite_store(self):
+        temp = get_temp_folder(__file__, "temp_sqlite_store")
+        name = os.path.join(temp, "sessions.db")
+        store = SQLiteSessionStore(name)
+        other = SQLiteSessionStore(name)
+        self.check_store(store, other)
+        store.close()
+        other.close()
+
+    def test_sqlite_store_cache(self):
+        temp = get_temp_folder(__file__, "temp_sqlite_store_cache")
+        name = os.path.join(temp, "sessions.db")
+        store = SQLiteSessionStore(name, cache_ttl=0.2)
+        other = SQLiteSessionStore(name, cache_ttl=None)
+        self.assertIsInstance(store, SessionStore)
+        self.assertRaise(SessionStore, TypeError)
+        sid = store.create(dict(alias="xavierd"))
+        self.assertEqual(store.get(sid), dict(alias="xavierd"))
+        session = store.get(sid)
+        session['alias'] = 'changed'
+        self.assertEqual(store.cache.nb_hits, 1)
+
+        # a revocation by another process is seen once the cache expired
+        other.revoke("xavierd")
+        self.assertEqual(store.get(sid), dict(alias="xavierd"))
+        time.sleep(0.3)
+        self.assertEqual(store.get(sid), None)
+
+        # a deletion by the same process is seen immediately
+        sid = store.create(dict(alias="marie"))
+        self.assertNotEmpty(store.get(sid))
+        store.delete(sid)
+        self.assertEqual(store.get(sid), None)
+        sid = store.create(dict(alias="marie"))
+        self.assertNotEmpty(store.get(sid))
+        self.assertEqual(store.revoke("marie"), 1)
+        self.assertEqual(store.get(sid), None)
+        store.close()
+        other.close()
+
+    def test_create_session_store(self):
+        temp = get_temp_folder(__file__, "temp_create_session_store")
+        self.assertEqual(create_session_store(None), None)
+        store = create_session_store('memory', 10)
+        self.assertIsInstance(store, MemorySessionStore)
+        self.assertEqual(store.ttl, 10)
+        self.assertIs(create_session_store(store), store)
+        store = create_session_store(os.path.join(temp, "s.db"))
+        self.assertIsInstance(store, SQLiteSessionStore)
+        store.close()
+        self.assertRaise(lambda: create_session_store(5), ValueError)
+
+    def test_server_side_session(self):
+        temp = get_temp_folder(__file__, "temp_server_side_session")
+        name = os.path.join(temp, "sessions.db")
+        app = create_qcm_local_app(cookie_key="dummypwd", folder=temp,
+                                   userpwd="abc", fLOG=None,
+                                   session_store=SQLiteSessionStore(
+                                       name, cache_ttl=0.2))
+        with TestClient(app.app.router, base_url="http://127.0.0.1") as client:
+            page = client.post("/authenticate",
+                               data=dict(alias="xavierd", pwd="abc"))
+            self.assertEqual(page.status_code, 200)
+            cook = client.cookies.get(app.cookie_name)
+            self.assertEqual(app.session_store.get(cook)['alias'], 'xavierd')
+            page = client.get("/qcm?game=simple_french_qcm&qn=0")
+            self.assertEqual(page.status_code, 200)
+            self.assertIn(b"<p>xavierd</p>", page.content)
+            self.assertEqual(app.session_store.count(), (1, 1))
+
+            # a worker sharing the same database knows the session
+            other = SQLiteSessionStore(name)
+            self.assertEqual(other.get(cook)['alias'], 'xavierd')
+
+            # revocation
+            other.revoke('xavierd')
+            other.close()
+            time.sleep(0.3)
+            page = client.get("/qcm?game=simple_french_qcm&qn=0")
+            self.assertNotIn(b"<p>xavierd</p>", page.content)
+            self.assertIn(b'href="/login" role="button"', page.content)
+
+            page = client.post("/authenticate",
+                               data=dict(alias="xavierd", pwd="abc"))
+            cook = client.cookies.get(app.cookie_name)
+            self.assertEqual(app.session_store.count(), (1, 1))
+            client.get("/logout", follow_redirects=False)
+            self.assertEqual(app.session_store.get(cook), None)
+            self.assertEqual(app.session_store.count(), (0, 0))
+        app.session_store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
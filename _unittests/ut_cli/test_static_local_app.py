@@ -3,6 +3,7 @@
 """
 import unittest
 from pyquickhelper.loghelper import BufferedPrint
+from pyquickhelper.pycode import get_temp_folder
 from mathenjeu.__main__ import main
 
 
@@ -22,9 +23,10 @@ class TestStaticLocalAppCli(unittest.TestCase):
         self.assertIn("usage: static_local", res)
 
     def test_local_webapp_start(self):
+        temp = get_temp_folder(__file__, "temp_static_local_app")
         st = BufferedPrint()
         main(args=['static_local', '-c', 'dummypwd', '-po', '8889',
-                   '-u', 'abc'], fLOG=st.fprint)
+                   '-u', 'abc', '--folder=' + temp], fLOG=st.fprint)
         res = str(st)
         self.assertIn("[create_static_local_app] create", res)
 
@@ -0,0 +1,52 @@
+"""
+@brief      test tree node (time=2s)
+"""
+import unittest
+import datetime
+import numpy
+import pandas
+from pyquickhelper.pycode import ExtTestCase
+from mathenjeu.datalog import aggregate_notnan
+from mathenjeu.datalog.qcmlog import _aggnotnan
+
+
+class TestAggregation(ExtTestCase):
+
+    def test_aggregate_notnan(self):
+        td = datetime.timedelta
+        df = pandas.DataFrame(dict(
+            person_id=['a', 'a', 'b', 'c', 'c', 'd'],
+            x=[1., numpy.nan, numpy.nan, 2., 3., numpy.nan],
+            i=[1, 2, 3, 4, 5, 6],
+            t=[td(1), None, td(2), td(1), td(1), None],
+            t2=[td(1), None, None, None, None, None],
+            b=['ok', None, 'skip', 'on', 'ok', None],
+            s=['ok', None, 'skip', ' thal', 'ok', None],
+            o=[1, 'ok', None, 2.5, 'x', None]))
+        exp = df.groupby('person_id').agg(_aggnotnan)
+        got = aggregate_notnan(df)
+        self.assertEqualDataFrame(exp, got)
+        self.assertEqual(list(got['b'])[:3], [1, 1000, 2])
+        self.assertEqual(got.loc['c', 's'], ' thal,1')
+
+    def test_aggregate_notnan_empty(self):
+        df = pandas.DataFrame(dict(person_id=['a', 'b'],
+                                   s=[None, None], x=[numpy.nan, 1.]))
+        got = aggregate_notnan(df)
+        self.assertEqual(got.shape, (2, 2))
+        self.assertTrue(numpy.isnan(got.loc['a', 'x']))
+
+    def test_aggregate_notnan_all_nan(self):
+        df = pandas.DataFrame(dict(person_id=['a', 'a', 'b'],
+                                   f=[numpy.nan, numpy.nan, numpy.nan],
+                                   x=[1., numpy.nan, numpy.nan]))
+        exp = df.groupby('person_id').agg(_aggnotnan)
+        got = aggregate_notnan(df)
+        self.assertEqualDataFrame(exp, got)
+        self.assertTrue(numpy.isnan(got.loc['a', 'f']))
+        got = aggregate_notnan(df[['person_id', 'f']].iloc[:2])
+        self.assertTrue(numpy.isnan(got.loc['a', 'f']))
+
+
+if __name__ == "__main__":
+    unittest.main()
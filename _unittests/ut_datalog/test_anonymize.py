@@ -0,0 +1,56 @@
+"""
+@brief      test tree node (time=2s)
+"""
+import os
+import unittest
+import hashlib
+import hmac
+from pyquickhelper.pycode import ExtTestCase
+from mathenjeu.datalog import enumerate_qcmlog, PersonIdHasher
+
+
+class TestAnonymize(ExtTestCase):
+
+    def test_hasher(self):
+        hasher = PersonIdHasher(maxsize=2)
+        exp = hashlib.sha256("xavierd127.0.0.1".encode("utf-8")).hexdigest()
+        self.assertEqual(hasher("xavierd", "127.0.0.1"), exp[:20])
+        self.assertEqual(hasher("xavierd", "127.0.0.1"), exp[:20])
+        hasher("a", "b")
+        hasher("c", "d")
+        info = hasher.cache_info()
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 3)
+        self.assertEqual(info.currsize, 2)
+        hasher.cache_clear()
+        self.assertEqual(hasher.cache_info().currsize, 0)
+
+    def test_hasher_key(self):
+        hasher = PersonIdHasher(key="secret")
+        exp = hmac.new(b"secret", b"xavierd127.0.0.1",
+                       hashlib.sha256).hexdigest()[:20]
+        self.assertEqual(hasher("xavierd", "127.0.0.1"), exp)
+        self.assertNotEqual(PersonIdHasher()("xavierd", "127.0.0.1"), exp)
+
+    def test_enumerate_qcmlog_hasher(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        exp = list(enumerate_qcmlog(logs))
+        hasher = PersonIdHasher()
+        got = list(enumerate_qcmlog(logs, hasher=hasher))
+        self.assertEqual(exp, got)
+        misses = hasher.cache_info().misses
+        self.assertGreaterEqual(misses, len(set(o['person_id'] for o in exp)))
+        # the cache is shared across files and calls
+        list(enumerate_qcmlog(logs * 2, hasher=hasher))
+        self.assertEqual(hasher.cache_info().misses, misses)
+
+        hasher = PersonIdHasher(key=b"secret")
+        got = list(enumerate_qcmlog(logs, hasher=hasher, as_records=True))
+        ids = set(o.person_id for o in got)
+        self.assertEqual(len(ids), len(set(o['person_id'] for o in exp)))
+        self.assertEqual(ids & set(o['person_id'] for o in exp), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+@brief      test tree node (time=2s)
+"""
+import os
+import unittest
+import time
+from datetime import datetime, timedelta
+from pyquickhelper.pycode import ExtTestCase, get_temp_folder
+from mathenjeu.apps.common import EventSink
+from mathenjeu.datalog import (
+    enumerate_binlog_records, enumerate_qcmlog, is_binlog, split_log_files,
+    parse_qcmlog_line)
+
+
+class TestBinLog(ExtTestCase):
+
+    def test_binlog(self):
+        temp = get_temp_folder(__file__, "temp_binlog")
+        sink = EventSink(temp, "QCMApp")
+        t0 = time.time()
+        client = ('127.0.0.1', 5000)
+        session = dict(alias='xavierd', hashpwd='h')
+        sink.write('qcm', session, client,
+                   dict(game='simple_french_qcm', qn='0'), created=t0)
+        sink.write('event', session, client,
+                   dict(events=['game:simple_french_qcm,qn:0']),
+                   created=t0 + 1.5)
+        sink.write('answer', session, client,
+                   dict(data={'game': 'simple_french_qcm', 'qn': '0',
+                              'a0': 'on', 'b': 'ok', 'next': '1'}),
+                   created=t0 + 2.25)
+        sink.write('authenticate', {}, client, dict(alias='xavierd'),
+                   created=t0 + 3)
+        name = sink.filename
+        sink.close()
+        self.assertTrue(is_binlog(name))
+        self.assertFalse(is_binlog("QCMApp.log"))
+        self.assertEqual(split_log_files([name], shard_size=10),
+                         [(name, 0, os.stat(name).st_size)])
+
+        rows = list(enumerate_binlog_records(name, chunk_size=7))
+        self.assertEqual(len(rows), 4)
+        line = ('{0},INFO,[DATA],{{"msg":"qcm","session":{{"alias":"xavierd"}},'
+                '"client":["127.0.0.1",5000],"game":"simple_french_qcm",'
+                '"qn":"0"}}')
+        ti = datetime.fromtimestamp(int(t0)) + timedelta(
+            milliseconds=int((t0 - int(t0)) * 1000))
+        exp = parse_qcmlog_line(line.format(
+            ti.strftime("%Y-%m-%d %H:%M:%S,") + "%03d" % (
+                ti.microsecond // 1000)))
+        self.assertEqual(rows[0], exp)
+        self.assertEqual(rows[2]['data']['a0'], 'on')
+        self.assertEqual(rows[3]['session'], None)
+        self.assertEqual(rows[3]['alias'], 'xavierd')
+        raw = list(enumerate_binlog_records(name, raw=True))
+        self.assertEqual(raw[0][1:], ['qcm', 'xavierd', ['127.0.0.1', 5000],
+                                      'simple_french_qcm', '0', None, None,
+                                      None])
+
+        obs = list(enumerate_qcmlog([name]))
+        end = [o for o in obs if o.get('qtime', None) == 'end']
+        self.assertEqual(len(end), 1)
+        self.assertEqual(end[0]['simple_french_qcm-0-duration'],
+                         rows[2]['time'] - rows[0]['time'])
+        self.assertEqual(list(enumerate_qcmlog([name], n_jobs=2)), obs)
+
+        # a record being written is ignored
+        with open(name, "ab") as f:
+            f.write(b'\x10\x00\x00\x00\x93')
+        self.assertEqual(len(list(enumerate_binlog_records(name))), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+@brief      test tree node (time=3s)
+"""
+import os
+import unittest
+import shutil
+import threading
+from pyquickhelper.pycode import ExtTestCase, get_temp_folder
+from mathenjeu.apps.common import LogApp, compress_log_file
+from mathenjeu.apps.common import log_rotation
+from mathenjeu.datalog import (
+    enumerate_qcmlog, enumerate_log_lines, split_log_files, log_compression,
+    export_qcmlog, read_qcmlog_store, enumerate_followed_lines,
+    build_qcmlog_index, log_segment_key)
+
+try:
+    import zstandard  # pylint: disable=W0611
+    compressions = ['gzip', 'zstd']
+except ImportError:
+    compressions = ['gzip']
+
+
+class TestCompressedLogs(ExtTestCase):
+
+    def setUp(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        self.name = os.path.join(this, "data", "QCMApp.log")
+
+    def test_log_compression(self):
+        self.assertEqual(log_compression("a.log.2018-12-12.gz"), 'gzip')
+        self.assertEqual(log_compression("a.log.2018-12-12.zst"), 'zstd')
+        self.assertIsNone(log_compression("a.log.2018-12-12"))
+        self.assertRaise(lambda: compress_log_file("a", "b", 'bz2'),
+                         ValueError)
+
+    def test_read_compressed(self):
+        temp = get_temp_folder(__file__, "temp_read_compressed")
+        exp = list(enumerate_qcmlog([self.name]))
+        lines = list(enumerate_log_lines(self.name))
+        for compression in compressions:
+            copy = os.path.join(temp, "QCMApp.log." + compression)
+            shutil.copy(self.name, copy)
+            dest = copy + (".gz" if compression == 'gzip' else ".zst")
+            compress_log_file(copy, dest, compression)
+            self.assertFalse(os.path.exists(copy))
+            self.assertLess(os.stat(dest).st_size,
+                            os.stat(self.name).st_size)
+            self.assertEqual(list(enumerate_qcmlog([dest])), exp)
+            self.assertEqual(list(enumerate_qcmlog([dest], n_jobs=2)), exp)
+            self.assertEqual(split_log_files([dest], shard_size=100),
+                             [(dest, 0, None)])
+            self.assertEqual(list(enumerate_log_lines(dest, chunk_size=97)),
+                             lines)
+            # ranges
+            size = os.stat(self.name).st_size
+            for start, stop in [(0, 1000), (1000, 5000), (5000, None)]:
+                self.assertEqual(
+                    list(enumerate_log_lines(dest, start=start, stop=stop)),
+                    list(enumerate_log_lines(self.name, start=start,
+                                             stop=stop)))
+            self.assertGreater(size, 5000)
+            self.assertRaise(lambda: build_qcmlog_index(dest),  # pylint: disable=W0640
+                             ValueError)
+
+    def test_log_segment_key(self):
+        names = ["QCMApp-2018-12-12.log.2018-12-12.gz",
+                 "QCMApp-2018-12-12.log.2018-12-12.1.gz",
+                 "QCMApp-2018-12-12.log.2018-12-12.2",
+                 "QCMApp-2018-12-12.log.2018-12-12.10",
+                 "QCMApp-2018-12-12.log.2018-12-13.gz",
+                 "QCMApp-2018-12-12.log",
+                 "QCMApp-2018-12-14.log.2018-12-14.zst",
+                 "QCMApp-2018-12-14.log"]
+        self.assertEqual(sorted(reversed(names), key=log_segment_key), names)
+
+    def test_rotation_compressed(self):
+        temp = get_temp_folder(__file__, "temp_rotation_compressed")
+        threads = []
+        compress = log_rotation.compress_log_file
+
+        def wrapped(*args):
+            threads.append(threading.current_thread().name)
+            compress(*args)
+
+        log_rotation.compress_log_file = wrapped
+        try:
+            app = LogApp(folder=temp, compress_log='gzip', max_log_size=2000)
+            request = dict(client=["127.0.0.1", 80])
+            for i in range(100):
+                app.log_event("qcm", request, session=dict(alias="xavierd"),
+                              game="simple_french_qcm", qn=str(i))
+            app.close_log()
+            app.handler.close()
+        finally:
+            log_rotation.compress_log_file = compress
+        self.assertGreater(len(threads), 3)
+        self.assertNotIn(threading.current_thread().name, threads)
+        names = [os.path.join(temp, n) for n in os.listdir(temp)]
+        gz = [n for n in names if n.endswith(".gz")]
+        plain = [n for n in names if not n.endswith(".gz")]
+        self.assertGreater(len(gz), 3)
+        # the live file and the last segment
+        self.assertEqual(len(plain), 2)
+        qns = []
+        for name in names:
+            for line in enumerate_log_lines(name):
+                qns.append(int(line.split('"qn":"')[1].split('"')[0]))
+        self.assertEqual(list(sorted(qns)), list(range(100)))
+        obs = list(enumerate_qcmlog(gz))
+        self.assertGreater(len(obs), 10)
+        # the segments are followed in the order they were written
+        rows = list(enumerate_followed_lines(temp, prefix="LogApp",
+                                             timeout=0.1))
+        self.assertEqual([int(r['qn']) for r in rows], list(range(100)))
+
+    def test_compress_keeps_mtime(self):
+        temp = get_temp_folder(__file__, "temp_compress_mtime")
+        log = os.path.join(temp, "QCMApp.log.2018-12-12")
+        shutil.copy(self.name, log)
+        os.utime(log, (1000000000, 1000000000))
+        compress_log_file(log, log + ".gz")
+        self.assertEqual(os.stat(log + ".gz").st_mtime, 1000000000)
+
+    def test_export_follow_compressed(self):
+        temp = get_temp_folder(__file__, "temp_export_compressed")
+        other = os.path.join(temp, "other")
+        export_qcmlog([self.name], other)
+        exp = len(read_qcmlog_store(other))
+        store = os.path.join(temp, "store")
+        log = os.path.join(temp, "QCMApp.log.2018-12-12")
+        shutil.copy(self.name, log)
+        export_qcmlog([log], store)
+        compress_log_file(log, log + ".gz")
+        # nothing new
+        self.assertEqual(export_qcmlog([log + ".gz"], store), 0)
+        self.assertEqual(len(read_qcmlog_store(store)), exp)
+
+        rows = list(enumerate_followed_lines(temp, timeout=0.1))
+        self.assertEqual(len(rows), len(list(enumerate_log_lines(self.name))))
+        rows = list(enumerate_followed_lines(temp, timeout=0.1,
+                                             from_start=False))
+        self.assertEqual(rows, [])
+
+    def test_export_rotate_compress(self):
+        temp = get_temp_folder(__file__, "temp_export_rotate_compress")
+        with open(self.name, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        half = len(lines) // 2
+        store = os.path.join(temp, "store")
+        # live file exported, renamed by the rotation, compressed
+        # at the next rotation
+        log = os.path.join(temp, "QCMApp.log")
+        with open(log, "w", encoding="utf-8") as f:
+            f.write("".join(lines[:half]))
+        n1 = export_qcmlog([log], store)
+        self.assertGreater(n1, 0)
+        segment = log + ".2018-12-12"
+        os.rename(log, segment)
+        with open(log, "w", encoding="utf-8") as f:
+            pass
+        compress_log_file(segment, segment + ".gz")
+        self.assertEqual(export_qcmlog([segment + ".gz", log], store), 0)
+        self.assertEqual(export_qcmlog([segment + ".gz", log], store), 0)
+        # new lines in the live file
+        with open(log, "w", encoding="utf-8") as f:
+            f.write("".join(lines[half:]))
+        n2 = export_qcmlog([segment + ".gz", log], store)
+
+        other = os.path.join(temp, "other")
+        exp = export_qcmlog([self.name], other)
+        self.assertEqual(n1 + n2, exp)
+        self.assertEqual(len(read_qcmlog_store(store)), exp)
+
+
+if __name__ == "__main__":
+    unittest.main()
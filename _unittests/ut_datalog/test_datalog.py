@@ -45,6 +45,17 @@ class TestLocalAppData(ExtTestCase):
         self.assertIn(" Prout", values)
         # print(merged.T)
 
+    def test_datalog_df_idle(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        dfs = list(enumerate_qcmlogdf(logs, max_idle_rows=0))
+        self.assertEqual(len(dfs), 10)
+        dfs = list(enumerate_qcmlogdf(
+            logs, max_idle_time=datetime.timedelta(seconds=1)))
+        self.assertEqual(len(dfs), 9)
+        dfs = list(enumerate_qcmlogdf(logs, max_idle_time=3600))
+        self.assertEqual(len(dfs), 5)
+
 
 if __name__ == "__main__":
     unittest.main()
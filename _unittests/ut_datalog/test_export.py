@@ -0,0 +1,151 @@
+"""
+@brief      test tree node (time=3s)
+"""
+import os
+import unittest
+from unittest.mock import patch
+from pyquickhelper.pycode import ExtTestCase, get_temp_folder
+from mathenjeu.datalog import (
+    enumerate_qcmlog, export_qcmlog, read_qcmlog_store,
+    qcmlog_observation_records)
+from mathenjeu.datalog.export import _load_state
+
+
+class TestExport(ExtTestCase):
+
+    def test_export(self):
+        temp = get_temp_folder(__file__, "temp_export")
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        exp = []
+        for obs in enumerate_qcmlog(logs):
+            exp.extend(qcmlog_observation_records(obs))
+
+        store = os.path.join(temp, "store")
+        n = export_qcmlog(logs, store)
+        self.assertEqual(n, len(exp))
+        df = read_qcmlog_store(store)
+        self.assertEqual(df.shape[0], len(exp))
+        self.assertEqual(set(df['day']), {'2018-12-12'})
+        self.assertIn('simple_french_qcm', set(df['game']))
+        sub = df[(df.person_id == '8a8c40ad28eb1206efd5') &
+                 (df.field == 'duration') & (df.qn == '8')]
+        self.assertEqual(list(sub['value']), ['1.422'])
+        self.assertEqual(list(sub['number']), [1.422])
+        self.assertEqual(df['number'].dtype, float)
+        good = df[df.field == 'good']
+        self.assertNotEmpty(good)
+        self.assertEqual(set(good['number']) - {0., 1.}, set())
+        self.assertTrue(df[df.field == 'a0']['number'].isnull().all())
+
+        # nothing new
+        self.assertEqual(export_qcmlog(logs, store), 0)
+        df = read_qcmlog_store(
+            store, filters=[('game', '=', 'simple_french_qcm')])
+        self.assertEqual(set(df['game']), {'simple_french_qcm'})
+
+    def test_export_append(self):
+        temp = get_temp_folder(__file__, "temp_export_append")
+        this = os.path.abspath(os.path.dirname(__file__))
+        name = os.path.join(this, "data", "QCMApp.log")
+        with open(name, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        exp = []
+        for obs in enumerate_qcmlog([name]):
+            exp.extend(qcmlog_observation_records(obs))
+
+        log = os.path.join(temp, "QCMApp.log")
+        store = os.path.join(temp, "store")
+        total = 0
+        with open(log, "w", encoding="utf-8") as f:
+            for i in range(0, len(lines), 50):
+                f.write("".join(lines[i:i + 50]))
+                # incomplete line
+                f.write(lines[min(i + 50, len(lines) - 1)][:10])
+                f.flush()
+                total += export_qcmlog([log], store)
+                f.seek(f.tell() - 10)
+        total += export_qcmlog([log], store)
+        self.assertEqual(total, len(exp))
+        df = read_qcmlog_store(store)
+        self.assertEqual(df.shape[0], len(exp))
+
+    def test_export_failure(self):
+        temp = get_temp_folder(__file__, "temp_export_failure")
+        this = os.path.abspath(os.path.dirname(__file__))
+        name = os.path.join(this, "data", "QCMApp.log")
+        with open(name, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        exp = []
+        for obs in enumerate_qcmlog([name]):
+            exp.extend(qcmlog_observation_records(obs))
+
+        # a malformed line after the first batches
+        log = os.path.join(temp, "QCMApp.log")
+        with open(log, "w", encoding="utf-8") as f:
+            f.write("".join(lines[:150]))
+            f.write(lines[150][:45] + "\n")
+            f.write("".join(lines[150:]))
+        store = os.path.join(temp, "store")
+        self.assertRaise(lambda: export_qcmlog([log], store, batch_size=20),
+                         ValueError)
+        self.assertTrue(os.path.exists(os.path.join(store, "_staging")))
+        self.assertEqual(read_qcmlog_store(store).shape[0], 0)
+
+        # the line is fixed, the lines are read again
+        with open(log, "w", encoding="utf-8") as f:
+            f.write("".join(lines))
+        self.assertEqual(export_qcmlog([log], store, batch_size=20), len(exp))
+        self.assertFalse(os.path.exists(os.path.join(store, "_staging")))
+        self.assertEqual(read_qcmlog_store(store).shape[0], len(exp))
+
+    def test_export_failure_after_commit(self):
+        temp = get_temp_folder(__file__, "temp_export_failure_commit")
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        store = os.path.join(temp, "store")
+        moved = []
+
+        def move_one(folder, state):
+            # the process stops after the first file was moved
+            rel = state['staged'][0]
+            dest = os.path.join(folder, rel)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(os.path.join(folder, "_staging", rel), dest)
+            moved.append(rel)
+            raise OSError("the process stops")
+
+        with patch("mathenjeu.datalog.export._move_staged", move_one):
+            self.assertRaise(lambda: export_qcmlog(logs, store, batch_size=20),
+                             OSError)
+        self.assertEqual(len(moved), 1)
+        self.assertGreater(len(_load_state(store)['staged']), 1)
+
+        # the next call finishes the move and adds nothing
+        self.assertEqual(export_qcmlog(logs, store), 0)
+        self.assertEqual(_load_state(store)['staged'], [])
+        exp = export_qcmlog(logs, os.path.join(temp, "once"))
+        self.assertEqual(read_qcmlog_store(store).shape[0], exp)
+
+    def test_export_state_pruned(self):
+        temp = get_temp_folder(__file__, "temp_export_state")
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        exp = export_qcmlog(logs, os.path.join(temp, "all"),
+                            max_state_age=None)
+        state = _load_state(os.path.join(temp, "all"))
+        self.assertGreater(len(state['cache']), 10)
+
+        store = os.path.join(temp, "store")
+        self.assertEqual(export_qcmlog(logs, store, max_state_age=1), exp)
+        state = _load_state(store)
+        self.assertLess(len(state['cache']), 10)
+        for key in state['last_key']:
+            self.assertIn(key, state['cache'])
+        last = max(events[-1][0] for events in state['cache'].values())
+        for events in state['cache'].values():
+            self.assertLess((last - events[-1][0]).total_seconds(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
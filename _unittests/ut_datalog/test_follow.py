@@ -0,0 +1,78 @@
+"""
+@brief      test tree node (time=3s)
+"""
+import os
+import unittest
+import copy
+import threading
+import time
+from pyquickhelper.pycode import ExtTestCase, get_temp_folder
+from mathenjeu.datalog import (
+    enumerate_qcmlog, enumerate_qcmlog_follow, enumerate_followed_lines)
+
+
+class TestFollow(ExtTestCase):
+
+    def test_follow_rotation(self):
+        temp = get_temp_folder(__file__, "temp_follow_rotation")
+        this = os.path.abspath(os.path.dirname(__file__))
+        name = os.path.join(this, "data", "QCMApp.log")
+        with open(name, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        exp = [copy.copy(obs) for obs in enumerate_qcmlog([name])]
+
+        log = os.path.join(temp, "QCMApp-2018-12-12.log")
+        half = len(lines) // 2
+
+        def write():
+            with open(log, "w", encoding="utf-8") as f:
+                for i in range(0, half, 20):
+                    f.write("".join(lines[i:min(i + 20, half)]))
+                    # incomplete line
+                    f.write(lines[half][:10])
+                    f.flush()
+                    time.sleep(0.02)
+                    f.seek(f.tell() - 10)
+                    f.truncate()
+            # rotation
+            os.rename(log, log + ".2018-12-12")
+            with open(log, "w", encoding="utf-8") as f:
+                for i in range(half, len(lines), 20):
+                    f.write("".join(lines[i:i + 20]))
+                    f.flush()
+                    time.sleep(0.02)
+
+        th = threading.Thread(target=write)
+        th.start()
+        got = [copy.copy(obs) for obs in enumerate_qcmlog_follow(
+            temp, delay=0.01, timeout=0.5)]
+        th.join()
+        self.assertEqual(len(exp), len(got))
+        self.assertEqual(exp, got)
+
+    def test_follow_from_end(self):
+        temp = get_temp_folder(__file__, "temp_follow_from_end")
+        this = os.path.abspath(os.path.dirname(__file__))
+        name = os.path.join(this, "data", "QCMApp.log")
+        with open(name, "r", encoding="utf-8") as f:
+            content = f.read()
+        log = os.path.join(temp, "QCMApp.log")
+        with open(log, "w", encoding="utf-8") as f:
+            f.write(content)
+        with open(os.path.join(temp, "StaticApp.log"), "w",
+                  encoding="utf-8") as f:
+            f.write(content)
+        positions = {}
+        got = list(enumerate_followed_lines(
+            temp, timeout=0, from_start=False, positions=positions))
+        self.assertEqual(got, [])
+        self.assertEqual(list(positions.values()), [len(content)])
+        got = list(enumerate_followed_lines(
+            temp, timeout=0, positions=positions))
+        self.assertEqual(got, [])
+        got = list(enumerate_followed_lines(temp, timeout=0))
+        self.assertEqual(len(got), content.count("[DATA]"))
+
+
+if __name__ == "__main__":
+    unittest.main()
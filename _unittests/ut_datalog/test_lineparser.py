@@ -0,0 +1,77 @@
+"""
+@brief      test tree node (time=2s)
+"""
+import os
+import unittest
+from pyquickhelper.pycode import ExtTestCase
+from mathenjeu.datalog import (
+    parse_qcmlog_line, QCMLogLineParser, enumerate_qcmlog)
+
+
+class TestLineParser(ExtTestCase):
+
+    lines = [
+        '2018-12-12 17:56:42,833,INFO,[DATA],{"msg":"event","session":'
+        '{"alias":"xavierd"},"events":["game:simple_french_qcm,qn:2"]}',
+        "2018-12-12 17:56:43,833,INFO,[DATA],{'msg': 'event', 'session': "
+        "{'alias': 'xavierd'}, 'events': ['game:simple_french_qcm,qn:2']}",
+        "2018-12-12 17:56:44,833,INFO,[DATA],{'msg': 'finish', 'session': "
+        "{'alias': 'xavierd'}, 'client': ('127.0.0.1', 50000), "
+        "'data': QueryParams('game=simple_french_qcm')}",
+        "2018-12-12 17:56:45,833,INFO,[DATA],{'msg': 'finish', "
+        "'session': None, 'data': QueryParams('')}",
+        "2018-12-12 17:56:46,833,INFO,[DATA],{'msg\": 'qcm'",
+    ]
+
+    def test_parse_legacy(self):
+        data = parse_qcmlog_line(self.lines[1])
+        self.assertEqual(data['events'], ['game:simple_french_qcm,qn:2'])
+        self.assertEqual(data['session'], {'alias': 'xavierd'})
+        data = parse_qcmlog_line(self.lines[2])
+        self.assertEqual(data['client'], ['127.0.0.1', 50000])
+        self.assertEqual(data['data'], {'game': 'simple_french_qcm'})
+        self.assertEqual(data['time'].second, 44)
+        self.assertRaise(lambda: parse_qcmlog_line(self.lines[3]), ValueError)
+        self.assertRaise(lambda: parse_qcmlog_line(self.lines[4]), ValueError)
+        self.assertRaise(lambda: parse_qcmlog_line("no separator"),
+                         ValueError)
+
+    def test_parser_policy(self):
+        self.assertRaise(lambda: QCMLogLineParser(errors='ignore'),
+                         ValueError)
+        parser = QCMLogLineParser()
+        self.assertRaise(lambda: parser.parse_lines(self.lines), ValueError)
+        self.assertEqual(parser.counts['error'], 1)
+
+        parser = QCMLogLineParser(errors='skip')
+        rows = parser.parse_lines(self.lines)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(parser.counts, {'json': 1, 'quotes': 1,
+                                         'queryparams': 1, 'error': 2})
+        self.assertEqual(parser.failures, [])
+
+        parser = QCMLogLineParser(errors='collect')
+        rows = parser.parse_lines(self.lines)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual([_[0] for _ in parser.failures], self.lines[3:])
+
+    def test_enumerate_qcmlog_errors(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        exp = list(enumerate_qcmlog(logs))
+        parser = QCMLogLineParser(errors='collect')
+        got = list(enumerate_qcmlog(logs, parser=parser))
+        self.assertEqual(exp, got)
+        self.assertEqual(parser.counts['error'], 0)
+        self.assertGreater(parser.counts['json'], 100)
+
+        parser = QCMLogLineParser(errors='collect')
+        got = list(enumerate_qcmlog(logs, parser=parser, n_jobs=2,
+                                    shard_size=2000))
+        self.assertEqual(exp, got)
+        self.assertEqual(parser.counts['error'], 0)
+        self.assertGreater(parser.counts['json'], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+@brief      test tree node (time=3s)
+"""
+import os
+import unittest
+from datetime import datetime
+from pyquickhelper.pycode import ExtTestCase, get_temp_folder
+from mathenjeu.datalog import (
+    QCMLogIndex, build_qcmlog_index, enumerate_log_lines,
+    parse_qcmlog_line, PersonIdHasher, enumerate_qcmlog_follow)
+from mathenjeu.datalog.qcmlog import _person
+from mathenjeu.datalog.logindex import _line_game
+
+
+class TestLogIndex(ExtTestCase):
+
+    def test_select(self):
+        temp = get_temp_folder(__file__, "temp_logindex_select")
+        this = os.path.abspath(os.path.dirname(__file__))
+        name = os.path.join(this, "data", "QCMApp.log")
+        with open(name, "r", encoding="utf-8") as f:
+            content = f.read()
+        log = os.path.join(temp, "QCMApp.log")
+        with open(log, "w", encoding="utf-8") as f:
+            f.write(content)
+        rows = [parse_qcmlog_line(line) for line in enumerate_log_lines(log)]
+
+        index = QCMLogIndex([log])
+        self.assertExists(log + ".qidx")
+        self.assertEqual(list(index.select()), rows)
+        persons = index.persons
+        self.assertIn('8a8c40ad28eb1206efd5', persons)
+        for pid in persons:
+            exp = [r for r in rows if (_person(r) or (None, None))[1] == pid]
+            self.assertEqual(list(index.select(person_id=pid)), exp)
+        self.assertIn('simple_french_qcm', index.games)
+        for game in index.games:
+            exp = [r for r in rows if _line_game(r) == game]
+            self.assertEqual(list(index.select(game=game)), exp)
+            exp = [r for r in exp
+                   if (_person(r) or (None, None))[1] == '8a8c40ad28eb1206efd5']
+            self.assertEqual(list(index.select(
+                person_id='8a8c40ad28eb1206efd5', game=game)), exp)
+        self.assertEqual(list(index.select(person_id='unknown')), [])
+        self.assertEqual(list(index.select(game='unknown')), [])
+
+        begin = datetime(2018, 12, 12, 17, 56, 44)
+        end = datetime(2018, 12, 12, 17, 57)
+        exp = [r for r in rows if begin <= r['time'] < end]
+        self.assertGreater(len(exp), 0)
+        self.assertEqual(list(index.select(time_range=(begin, end))), exp)
+        exp = [r for r in rows if begin <= r['time']]
+        self.assertEqual(list(index.select(time_range=(begin, None))), exp)
+        self.assertEqual(
+            list(index.select(time_range=(None, datetime(2000, 1, 1)))), [])
+        self.assertRaise(lambda: list(index.select(time_range=(0, 1))),
+                         TypeError)
+
+        # the index is not rebuilt
+        mtime = os.stat(log + ".qidx").st_mtime_ns
+        QCMLogIndex([log])
+        self.assertEqual(os.stat(log + ".qidx").st_mtime_ns, mtime)
+        # another hasher rebuilds it
+        index = QCMLogIndex([log], hasher=PersonIdHasher(key="k"))
+        self.assertNotIn('8a8c40ad28eb1206efd5', index.persons)
+        # the index is not read as a log
+        obs = list(enumerate_qcmlog_follow(temp, timeout=0))
+        self.assertGreater(len(obs), 0)
+
+    def test_index_append(self):
+        temp = get_temp_folder(__file__, "temp_logindex_append")
+        this = os.path.abspath(os.path.dirname(__file__))
+        name = os.path.join(this, "data", "QCMApp.log")
+        with open(name, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        log = os.path.join(temp, "QCMApp.log")
+        with open(log, "w", encoding="utf-8") as f:
+            f.write("".join(lines[:50]))
+            # incomplete line
+            f.write(lines[50][:10])
+        index = build_qcmlog_index(log)
+        n = len(index['offsets'])
+        self.assertEqual(n, sum(1 for line in lines[:50] if "[DATA]" in line))
+        with open(log, "w", encoding="utf-8") as f:
+            f.write("".join(lines))
+        index = build_qcmlog_index(log)
+        self.assertEqual(len(index['offsets']),
+                         sum(1 for line in lines if "[DATA]" in line))
+        rows = [parse_qcmlog_line(line) for line in enumerate_log_lines(log)]
+        self.assertEqual(list(QCMLogIndex([log]).select()), rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
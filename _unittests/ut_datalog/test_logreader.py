@@ -0,0 +1,62 @@
+"""
+@brief      test tree node (time=2s)
+"""
+import os
+import sys
+import subprocess
+import unittest
+from pyquickhelper.pycode import ExtTestCase
+from mathenjeu.datalog import (
+    enumerate_log_lines, enumerate_qcmlog, split_log_files)
+
+
+class TestLogReader(ExtTestCase):
+
+    def test_log_lines(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        name = os.path.join(this, "data", "QCMApp.log")
+        with open(name, "r", encoding="utf-8") as f:
+            exp = [line.strip("\n\r") for line in f.readlines()
+                   if "[DATA]" in line]
+        for chunk_size in [1, 7, 100, 2 ** 20]:
+            lines = list(enumerate_log_lines(name, chunk_size=chunk_size))
+            self.assertEqual(exp, lines)
+        lines = list(enumerate_log_lines(name, tag=None))
+        self.assertEqual(len(lines), 193)
+        self.assertRaise(lambda: list(enumerate_log_lines(name, chunk_size=0)),
+                         ValueError)
+
+    def test_datalog_chunk(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        exp = list(enumerate_qcmlog(logs))
+        obs = list(enumerate_qcmlog(logs, chunk_size=13))
+        self.assertEqual(exp, obs)
+
+    def test_log_lines_range(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        name = os.path.join(this, "data", "QCMApp.log")
+        exp = list(enumerate_log_lines(name, tag=None))
+        for shard_size in [1, 50, 333, 10000, 2 ** 20]:
+            shards = split_log_files([name], shard_size=shard_size)
+            for chunk_size in [16, 2 ** 20]:
+                lines = []
+                for _, start, stop in shards:
+                    lines.extend(enumerate_log_lines(
+                        name, tag=None, chunk_size=chunk_size,
+                        start=start, stop=stop))
+                self.assertEqual(exp, lines)
+
+    def test_no_web_dependency(self):
+        code = ("import sys, mathenjeu.datalog; print(sorted(m for m in sys.modules "
+                "if m.split('.')[0] in ('starlette', 'jinja2', 'itsdangerous') "
+                "or m.startswith('mathenjeu.apps')))")
+        env = os.environ.copy()
+        env['PYTHONPATH'] = os.pathsep.join(p for p in sys.path if p)
+        out = subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                             stdout=subprocess.PIPE).stdout
+        self.assertEqual(out.decode('ascii').strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+@brief      test tree node (time=3s)
+"""
+import os
+import unittest
+from decimal import Decimal
+import pandas
+from pyquickhelper.pycode import ExtTestCase, get_temp_folder
+from mathenjeu.datalog import (
+    enumerate_qcmlog, enumerate_qcmlogdf, enumerate_parsed_shards,
+    parse_qcmlog_line, enumerate_log_lines, PersonIdHasher)
+from mathenjeu.datalog.parallel import _dump_rows, _load_rows
+
+
+class TestParallel(ExtTestCase):
+
+    def test_parsed_shards(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        exp = [parse_qcmlog_line(line)
+               for line in enumerate_log_lines(logs[0])]
+        got = list(enumerate_parsed_shards(logs * 2, n_jobs=2,
+                                           shard_size=1000))
+        self.assertEqual(exp * 2, got)
+
+    def test_parsed_shards_file_order(self):
+        # the files are not given in chronological order,
+        # the rows follow the order of the files, not the time
+        temp = get_temp_folder(__file__, "temp_parsed_shards_file_order")
+        this = os.path.abspath(os.path.dirname(__file__))
+        with open(os.path.join(this, "data", "QCMApp.log"), "r",
+                  encoding="utf-8") as f:
+            lines = f.readlines()
+        parts = [lines[:70], lines[70:130], lines[130:]]
+        names = []
+        for i, part in enumerate(parts):
+            name = os.path.join(temp, "QCMApp.log.%d" % (len(parts) - i))
+            with open(name, "w", encoding="utf-8") as f:
+                f.write("".join(part))
+            names.append(name)
+        files = [names[2], names[0], names[1]]
+
+        exp = [parse_qcmlog_line(line)
+               for name in files for line in enumerate_log_lines(name)]
+        got = list(enumerate_parsed_shards(files, n_jobs=2, shard_size=1000))
+        self.assertEqual(exp, got)
+        times = [row['time'] for row in got]
+        self.assertNotEqual(times, list(sorted(times)))
+        self.assertEqual(times[0], exp[0]['time'])
+        self.assertGreater(times[0], times[-1])
+
+        for kwargs in [{}, dict(hasher=PersonIdHasher(key="k")),
+                       dict(fields=['good', 'a0'], expected_answers=[
+                           ['simple_french_qcm-0-ANS']])]:
+            exp = list(enumerate_qcmlog(files, **kwargs))
+            got = list(enumerate_qcmlog(files, n_jobs=2, shard_size=1000,
+                                        **kwargs))
+            self.assertEqual(exp, got)
+            self.assertNotEqual(exp, list(enumerate_qcmlog(names, **kwargs)))
+
+    def test_dump_rows(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        exp = [parse_qcmlog_line(line) for line in enumerate_log_lines(
+            os.path.join(this, "data", "QCMApp.log"))]
+        copy = [dict(row) for row in exp]
+        data = _dump_rows(copy)
+        self.assertEqual(data[:1], b'm')
+        self.assertEqual(exp, _load_rows(data))
+        copy = [dict(row) for row in exp]
+        copy[0]['value'] = Decimal(1)
+        data = _dump_rows(copy)
+        self.assertEqual(data[:1], b'p')
+        got = _load_rows(data)
+        self.assertEqual(got[0]['value'], Decimal(1))
+        self.assertEqual(exp[1:], got[1:])
+
+    def test_datalog_parallel(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        exp = list(enumerate_qcmlog(logs))
+        obs = list(enumerate_qcmlog(logs, n_jobs=2, shard_size=2000))
+        self.assertEqual(exp, obs)
+
+    def test_datalog_df_parallel(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        exp = pandas.concat(list(enumerate_qcmlogdf(logs)), sort=False)
+        got = pandas.concat(list(enumerate_qcmlogdf(logs, n_jobs=2)),
+                            sort=False)
+        self.assertEqualDataFrame(exp, got)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+@brief      test tree node (time=2s)
+"""
+import os
+import unittest
+from pyquickhelper.pycode import ExtTestCase
+from mathenjeu.datalog import (
+    filter_qcmlog_lines, enumerate_qcmlog, QCMLogLineParser)
+
+
+class TestProjection(ExtTestCase):
+
+    lines = [
+        '2018-12-12 17:56:42,833,INFO,[DATA],{"msg":"event","session":'
+        '{"alias":"xavierd"},"events":["game:simple_french_qcm,qn:2"]}',
+        "2018-12-12 17:56:43,833,INFO,[DATA],{'msg': 'event', 'session': "
+        "{'alias': 'xavierd'}, 'events': ['game:simple_french_qcm,qn:2']}",
+        '2018-12-12 17:56:44,458,INFO,[DATA],{"msg": "qcm","session":'
+        '{"alias":"xavierd"},"game":"simple_french_qcm","qn":"3"}',
+        "2018-12-12 17:56:46,833,INFO,[DATA],{'msg\": 'qcm'",
+    ]
+
+    def setUp(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        self.logs = [os.path.join(this, "data", "QCMApp.log")]
+
+    def test_filter_qcmlog_lines(self):
+        self.assertEqual(list(filter_qcmlog_lines(self.lines, {'qcm'})),
+                         self.lines[2:])
+        self.assertEqual(list(filter_qcmlog_lines(self.lines, {'event'})),
+                         self.lines[:2] + self.lines[3:])
+
+    def test_msgs(self):
+        exp = list(enumerate_qcmlog(self.logs))
+        parser = QCMLogLineParser()
+        got = list(enumerate_qcmlog(self.logs, msgs=('qcm', 'answer'),
+                                    parser=parser))
+        self.assertEqual(exp, got)
+        total = QCMLogLineParser()
+        list(enumerate_qcmlog(self.logs, parser=total))
+        self.assertLess(sum(parser.counts.values()),
+                        sum(total.counts.values()))
+        got = list(enumerate_qcmlog(self.logs, msgs=('qcm', 'answer'),
+                                    n_jobs=2, shard_size=5000))
+        self.assertEqual(exp, got)
+        got = list(enumerate_qcmlog(self.logs, msgs=('qcm', )))
+        self.assertEqual(set(o['qtime'] for o in got), {'begin', 'event'})
+
+    def test_fields(self):
+        exp = list(enumerate_qcmlog(self.logs))
+        got = list(enumerate_qcmlog(self.logs, fields=['good', 'duration']))
+        self.assertNotIn('event', set(o['qtime'] for o in got))
+        self.assertEqual(len(got), len([o for o in exp
+                                        if o['qtime'] != 'event']))
+        for o in got:
+            for k in o:
+                if k.count('-') >= 2:
+                    self.assertTrue(k.endswith(('-duration', '-good')))
+        expk = [{k: v for k, v in o.items()
+                 if '-' not in k or k.endswith(('-duration', '-good'))}
+                for o in exp if o['qtime'] != 'event']
+        self.assertEqual(expk, got)
+
+        rec = list(enumerate_qcmlog(self.logs, fields=['b', 'events'],
+                                    as_records=True))
+        recs = list(enumerate_qcmlog(self.logs, as_records=True))
+        self.assertEqual(len(rec), len(recs))
+        names = set(k.field for r in rec for k, _ in r.fields)
+        self.assertIn('b', names)
+        self.assertNotIn('duration', names)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+@brief      test tree node (time=2s)
+"""
+import os
+import unittest
+from datetime import timedelta
+import numpy
+import pandas
+from pyquickhelper.pycode import ExtTestCase
+from mathenjeu.datalog import (
+    enumerate_qcmlog, qcmlog_question_stats, QuestionStats, QuantileSketch)
+from mathenjeu.tests import simple_french_qcm
+
+
+class TestQuestionStats(ExtTestCase):
+
+    def test_sketch(self):
+        rnd = numpy.random.RandomState(0)
+        values = rnd.lognormal(size=10000)
+        sk = QuantileSketch(0.01)
+        for v in values[:5000]:
+            sk.add(v)
+        sk2 = QuantileSketch(0.01)
+        for v in values[5000:]:
+            sk2.add(v)
+        sk.merge(sk2)
+        self.assertEqual(sk.count, 10000)
+        self.assertLess(len(sk.bins), 1000)
+        for q in [0, 0.1, 0.5, 0.9, 0.99, 1]:
+            exp = numpy.quantile(values, q, method='lower')
+            got = sk.quantile(q)
+            self.assertLess(abs(got - exp) / exp, 0.0101)
+        self.assertAlmostEqual(sk.mean(), values.mean())
+        self.assertTrue(numpy.isnan(QuantileSketch().quantile(0.5)))
+        sk = QuantileSketch()
+        sk.add(0)
+        sk.add(2)
+        self.assertEqual(sk.quantile(0), 0)
+        self.assertAlmostEqual(sk.quantile(1), 2)
+        self.assertRaise(lambda: QuantileSketch(1), ValueError)
+        self.assertRaise(lambda: sk.merge(QuantileSketch(0.1)), ValueError)
+
+    def test_question_stats(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        exp_answers = simple_french_qcm().expected_answers()
+        obs = list(enumerate_qcmlog(logs, exp_answers))
+        df = qcmlog_question_stats(obs)
+        self.assertEqual(list(df.columns),
+                         ['n', 'accuracy', 'skip_rate', 'revisit_rate',
+                          'duration_mean', 'duration_q50', 'duration_q90'])
+        self.assertEqual(df.shape, (9, 7))
+        self.assertEqual(list(df.index.get_level_values('qn')),
+                         [str(i) for i in range(9)])
+
+        # expected values with pandas
+        for (game, qn), row in df.iterrows():
+            prefix = "{0}-{1}-".format(game, qn)
+            ends = [o for o in obs if o.get('qtime', None) == 'end' and
+                    o.get('game', None) == game and o.get('qn', None) == qn]
+            self.assertEqual(row['n'], len(ends))
+            good = [o[prefix + 'good'] for o in ends]
+            self.assertAlmostEqual(row['accuracy'], numpy.mean(good))
+            skip = [o[prefix + 'b'] == 'skip' for o in ends]
+            self.assertAlmostEqual(row['skip_rate'], numpy.mean(skip))
+            visit = [o[prefix + 'nbvisit'] > 1 for o in ends]
+            self.assertAlmostEqual(row['revisit_rate'], numpy.mean(visit))
+            durations = [o[prefix + 'duration'].total_seconds() for o in ends
+                         if o[prefix + 'duration'] != timedelta(days=1)]
+            if durations:
+                self.assertAlmostEqual(row['duration_mean'],
+                                       numpy.mean(durations))
+
+        # records
+        got = QuestionStats().update(
+            enumerate_qcmlog(logs, exp_answers, as_records=True))
+        pandas.testing.assert_frame_equal(df, got.to_dataframe())
+
+        # no expected answers
+        df = qcmlog_question_stats(enumerate_qcmlog(logs))
+        self.assertEqual(df['accuracy'].max(), 0)
+        self.assertEqual(qcmlog_question_stats([]).shape, (0, 7))
+
+
+if __name__ == "__main__":
+    unittest.main()
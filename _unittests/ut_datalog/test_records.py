@@ -0,0 +1,49 @@
+"""
+@brief      test tree node (time=2s)
+"""
+import os
+import unittest
+import copy
+import datetime
+from pyquickhelper.pycode import ExtTestCase
+from mathenjeu.datalog import (
+    enumerate_qcmlog, FieldKey, QCMObservation, field_key)
+from mathenjeu.tests import simple_french_qcm
+
+
+class TestRecords(ExtTestCase):
+
+    def test_field_key(self):
+        k1 = field_key('g', 1, 'a0')
+        k2 = field_key('g', 1, 'a0')
+        self.assertIs(k1, k2)
+        self.assertIsInstance(k1, FieldKey)
+        self.assertEqual(k1, ('g', '1', 'a0'))
+        self.assertEqual(str(k1), 'g-1-a0')
+        self.assertEqual(str(field_key(None, None, 'next')), 'next')
+
+    def test_records(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        exp_answers = simple_french_qcm().expected_answers()
+        exp = [copy.copy(obs) for obs in enumerate_qcmlog(logs, exp_answers)]
+        got = list(enumerate_qcmlog(logs, exp_answers, as_records=True))
+        self.assertEqual(len(exp), len(got))
+        for e, g in zip(exp, got):
+            self.assertIsInstance(g, QCMObservation)
+            self.assertEqual(e, g.to_dict())
+        last = got[-1]
+        self.assertEqual(last.qtime, 'end')
+        self.assertEqual(last.game, 'simple_french_qcm')
+        self.assertEqual(last.qn, '8')
+        fields = dict(last.fields)
+        self.assertEqual(
+            fields[field_key('simple_french_qcm', '8', 'duration')],
+            datetime.timedelta(seconds=1, microseconds=422000))
+        self.assertIn("QCMObservation(", repr(last))
+        self.assertEqual(got[0], got[0])
+        self.assertNotEqual(got[0], got[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
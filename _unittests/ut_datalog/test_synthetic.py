@@ -0,0 +1,83 @@
+"""
+@brief      test tree node (time=5s)
+"""
+import os
+import unittest
+from pyquickhelper.pycode import ExtTestCase, get_temp_folder
+from mathenjeu.datalog import (
+    enumerate_synthetic_qcmlog_lines, write_synthetic_qcmlog,
+    enumerate_qcmlog, QCMLogLineParser, benchmark_qcmlog)
+from mathenjeu.datalog.synthetic import SYNTHETIC_GAMES
+from mathenjeu.tests import get_game
+
+
+class TestSynthetic(ExtTestCase):
+
+    def test_enumerate_synthetic(self):
+        lines = list(enumerate_synthetic_qcmlog_lines(nb_lines=3000))
+        self.assertEqual(len(lines), 3000)
+        self.assertEqual(
+            lines, list(enumerate_synthetic_qcmlog_lines(nb_lines=3000)))
+        self.assertNotEqual(
+            lines, list(enumerate_synthetic_qcmlog_lines(nb_lines=3000, seed=1)))
+        self.assertEqual(lines, sorted(lines, key=lambda s: s[:23]))
+        msgs = set()
+        for line in lines:
+            for msg in ['home-logged', 'qcm', 'event', 'answer', 'finish']:
+                if '"msg":"{0}"'.format(msg) in line:
+                    msgs.add(msg)
+        self.assertEqual(len(msgs), 5)
+
+        parser = QCMLogLineParser(errors='collect')
+        rows = parser.parse_lines(lines)
+        self.assertGreater(parser.counts['quotes'], 0)
+        self.assertGreater(parser.counts['error'], 0)
+        self.assertEqual(len(rows) + parser.counts['error'], len(lines))
+        self.assertIn('"b":"skip"', "".join(lines))
+
+        self.assertRaise(lambda: list(enumerate_synthetic_qcmlog_lines()),
+                         ValueError)
+
+    def test_students(self):
+        lines = list(enumerate_synthetic_qcmlog_lines(
+            nb_students=2, games=['simple_french_qcm'], malformed_rate=0,
+            legacy_rate=0))
+        parser = QCMLogLineParser()
+        rows = parser.parse_lines(lines)
+        self.assertEqual(parser.counts['json'], len(lines))
+        aliases = set(r['session']['alias'] for r in rows)
+        self.assertEqual(aliases, {'s0000000', 's0000001'})
+        self.assertEqual(len([r for r in rows if r['msg'] == 'finish']), 2)
+
+    def test_write_synthetic(self):
+        temp = get_temp_folder(__file__, "temp_synthetic")
+        name = os.path.join(temp, "QCMApp.log")
+        nb = write_synthetic_qcmlog(name, nb_lines=2500, buffer_size=1000)
+        self.assertEqual(nb, 2500)
+        with open(name, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read().split("\n")[:-1],
+                             list(enumerate_synthetic_qcmlog_lines(nb_lines=2500)))
+
+        expected = []
+        for game in SYNTHETIC_GAMES:
+            expected.extend(get_game(game).expected_answers())
+        obs = list(enumerate_qcmlog(
+            [name], expected, parser=QCMLogLineParser(errors='skip')))
+        goods = [v for o in obs for k, v in o.items() if k.endswith('-good')]
+        self.assertEqual(set(goods), {0, 1})
+
+    def test_benchmark(self):
+        df = benchmark_qcmlog(sizes=[1000, 2000], isolate=False)
+        self.assertEqual(df.shape, (8, 9))
+        self.assertEqual(list(df.lines), [1000] * 4 + [2000] * 4)
+        self.assertTrue((df.rows > 0).all())
+        self.assertTrue((df.time > 0).all())
+        df = benchmark_qcmlog(sizes=[1000], steps=['question_stats'])
+        self.assertEqual(df.shape, (1, 9))
+        self.assertGreater(df.peak_rss[0], 0)
+        self.assertRaise(lambda: benchmark_qcmlog(sizes=[1000], steps=['a']),
+                         ValueError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+"""
+@brief      test tree node (time=1s)
+"""
+import unittest
+from datetime import datetime
+import numpy
+from pyquickhelper.pycode import ExtTestCase
+from mathenjeu.datalog import parse_log_time, parse_log_times
+
+
+class TestTimeParse(ExtTestCase):
+
+    def test_parse_log_time(self):
+        for ti in ['2018-12-12 17:56:42,833', '2018-12-12 17:56:42,003',
+                   '2019-01-01 00:00:00,000', '2018-12-12 17:56:42,8',
+                   '2018-12-12 17:56:42,833001', '2018-1-2 17:56:42,833']:
+            exp = datetime.strptime(ti, '%Y-%m-%d %H:%M:%S,%f')
+            self.assertEqual(exp, parse_log_time(ti))
+        for ti in ['2018-12-12 17:56:42.833', '2018-12-12 17:+6:42,833',
+                   '2018-13-12 17:56:42,833', '2018-12-12 17:56:42,83a']:
+            self.assertRaise(lambda t=ti: parse_log_time(t), ValueError)
+
+    def test_parse_log_times(self):
+        tis = ['2018-12-12 17:56:42,833', '2018-12-12 17:56:42,8',
+               '2019-01-01 00:00:00,000']
+        got = parse_log_times(tis)
+        self.assertEqual(got.dtype, numpy.dtype('datetime64[ms]'))
+        exp = numpy.array(
+            [datetime.strptime(ti, '%Y-%m-%d %H:%M:%S,%f') for ti in tis],
+            dtype='datetime64[ms]')
+        self.assertEqual(exp.tolist(), got.tolist())
+        self.assertEqual(parse_log_times([]).shape, (0, ))
+        self.assertRaise(lambda: parse_log_times(['2018-12-12 17:5a:42,833']),
+                         ValueError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+@brief      test tree node (time=2s)
+"""
+import os
+import unittest
+import datetime
+import numpy
+import pandas
+from pyquickhelper.pycode import ExtTestCase
+from mathenjeu.datalog import (
+    enumerate_qcmlog, enumerate_qcmlogdf, aggregate_notnan,
+    qcmlog_wide_dataframe)
+from mathenjeu.tests import simple_french_qcm
+
+
+class TestWideDataFrame(ExtTestCase):
+
+    def test_consolidate(self):
+        this = os.path.abspath(os.path.dirname(__file__))
+        logs = [os.path.join(this, "data", "QCMApp.log")]
+        rows = [obs for obs in enumerate_qcmlog(logs)
+                if obs['qtime'] == 'end']
+        df = pandas.DataFrame(rows)
+        cols = sorted(c for c in df.columns if '-' in c)
+        exp = aggregate_notnan(df[['person_id'] + cols])
+        dfs = list(enumerate_qcmlogdf(logs, consolidate=True))
+        self.assertEqual(len(dfs), 1)
+        self.assertEqualDataFrame(exp, dfs[0])
+
+        game = simple_french_qcm()
+        rows = [obs for obs in enumerate_qcmlog(logs, game.expected_answers())
+                if obs['qtime'] == 'end']
+        exp = aggregate_notnan(pandas.DataFrame(rows)[['person_id'] + cols])
+        dfs = list(enumerate_qcmlogdf(logs, consolidate=True, games=[game]))
+        got = dfs[0]
+        self.assertEqual(got.shape[0], 5)
+        self.assertIn('simple_french_qcm-0-a2', got.columns)
+        self.assertEqualDataFrame(exp, got[exp.columns])
+
+    def test_wide_mixed(self):
+        td = datetime.timedelta
+        rows = [
+            {'person_id': 'b', 'qtime': 'end', 'g-0-b': 'ok',
+             'g-0-ANS': ' thal', 'g-0-duration': td(seconds=1)},
+            {'person_id': 'a', 'qtime': 'end', 'g-0-b': 'skip',
+             'g-0-ANS': 'x', 'g-0-duration': td(seconds=2)},
+            {'person_id': 'b', 'qtime': 'begin', 'g-0-b': 'ok'},
+            {'person_id': 'b', 'qtime': 'end', 'g-0-b': 'ok',
+             'g-0-ANS': 'on', 'g-0-good': numpy.nan,
+             'g-0-duration': td(seconds=3)},
+        ]
+        got = qcmlog_wide_dataframe(rows, capacity=1)
+        self.assertEqual(list(got.index), ['a', 'b'])
+        self.assertEqual(list(got['g-0-b']), [1000, 2])
+        self.assertEqual(list(got['g-0-ANS']), ['x', ' thal,1'])
+        self.assertEqual(list(got['g-0-duration']), [td(seconds=2), 0])
+        self.assertNotIn('g-0-good', got.columns)
+
+
+if __name__ == "__main__":
+    unittest.main()
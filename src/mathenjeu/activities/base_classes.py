@@ -25,6 +25,13 @@ class Base:
         """
         return self._col_eid
 
+    @property
+    def Name(self):
+        """
+        Returns the name.
+        """
+        return self._col_name
+
     @property
     def Fields(self):
         """
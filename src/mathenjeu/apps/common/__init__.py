@@ -2,5 +2,14 @@
 @file
 @brief Shortcut to *common*.
 """
+from .event_coalescer import EventCoalescer, collapse_events
+from .event_sink import EventSink
 from .auth_app import AuthentificationAnswers
 from .log_app import LogApp
+from .log_rotation import CompressedRotatingFileHandler, compress_log_file, LOG_COMPRESSIONS
+from .log_writer import BatchLogWriter
+from .login_limiter import LoginLimiter
+from .password import PasswordVerifier, hash_password, verify_password
+from .session_cache import SessionCache
+from .session_store import (
+    SessionStore, MemorySessionStore, SQLiteSessionStore, create_session_store)
@@ -4,9 +4,15 @@
 @brief Starts an application.
 """
 import hashlib
-from starlette.responses import RedirectResponse
+import hmac
+from starlette.requests import HTTPConnection, Request
+from starlette.responses import RedirectResponse, JSONResponse
 from itsdangerous import URLSafeTimedSerializer
 import ujson
+from .login_limiter import LoginLimiter
+from .password import PasswordVerifier, hash_password
+from .session_cache import SessionCache
+from .session_store import create_session_store
 
 
 class AuthentificationAnswers:
@@ -26,7 +32,10 @@ class AuthentificationAnswers:
                  redirect_logout="/", max_age=14 * 24 * 60 * 60,
                  cookie_key=None, cookie_name="mathenjeu",
                  cookie_domain="127.0.0.1", cookie_path="/",
-                 secure=False, page_context=None, userpwd=None):
+                 secure=False, page_context=None, userpwd=None,
+                 session_cache_size=10000, session_cache_ttl=60.,
+                 session_store=None, login_concurrency=None,
+                 login_queue=100, login_wait=5.):
         """
         @param      app             :epkg:`starlette` application
         @param      login_page      name of the login page
@@ -43,6 +52,23 @@ class AuthentificationAnswers:
                                     before rendering the pages (as a function
                                     which returns a dictionary)
         @param      userpwd         users are authentified with any alias but a common password
+        @param      session_cache_size  maximum number of verified sessions kept in memory,
+                                    see @see cl SessionCache
+        @param      session_cache_ttl   a verified session is verified again after
+                                    this duration (seconds), None or 0 to disable the cache
+        @param      session_store   None to store the session in a signed cookie,
+                                    otherwise the cookie only contains a session id
+                                    and the session is stored on the server,
+                                    ``'memory'``, a filename (:epkg:`SQLite`)
+                                    or a @see cl SessionStore,
+                                    see @see fn create_session_store
+        @param      login_concurrency   maximum number of logins processed
+                                    at the same time in a pool of threads,
+                                    None for the default value of @see cl LoginLimiter,
+                                    the password is never hashed in the event loop
+        @param      login_queue     maximum number of waiting logins
+        @param      login_wait      maximum time (seconds) a login waits,
+                                    the user is then asked to retry
         """
         if cookie_key is None:
             raise ValueError("cookie_key cannot be None")
@@ -59,8 +85,14 @@ class AuthentificationAnswers:
         self.secure = secure
         self.signer = URLSafeTimedSerializer(self.cookie_key)
         self.userpwd = userpwd
-        self.hashed_userpwd = None if userpwd is None else self.hash_pwd(
-            userpwd)
+        self.pwd_verifier = PasswordVerifier()
+        self.hashed_userpwd = self._hash_userpwd(userpwd)
+        self.session_cache = SessionCache(session_cache_size, session_cache_ttl) \
+            if session_cache_ttl else None
+        self.session_store = create_session_store(session_store, max_age)
+        self.login_limiter = LoginLimiter(
+            login_concurrency or LoginLimiter.DEFAULT_CONCURRENCY,
+            max_waiting=login_queue, wait_timeout=login_wait)
         self._get_page_context = page_context
         app._get_session = self.get_session
         for method in ['log_event', 'log_any']:
@@ -77,16 +109,51 @@ class AuthentificationAnswers:
         context.update(self._get_page_context())
         return self.templates.TemplateResponse(self.login_page, context)  # pylint: disable=E1101
 
-    def hash_pwd(self, pwd):
+    def hash_pwd(self, pwd, salt=None):
         """
-        Hashes a password.
+        Hashes a password (see @see fn hash_password).
 
         @param      pwd     password
-        @return             hashed password in hexadecimal format
+        @param      salt    salt (bytes), None for a random salt,
+                            the same password then gives a different
+                            result every time
+        @return             hashed password
         """
-        m = hashlib.sha256()
-        m.update(pwd.encode("utf-8"))
-        return m.hexdigest()
+        return hash_password(pwd, salt=salt)
+
+    def _cookie_key_bytes(self):
+        key = self.cookie_key
+        return key if isinstance(key, bytes) else key.encode('utf-8')
+
+    def _hash_userpwd(self, userpwd):
+        """
+        Hashes the common password, the salt is derived from
+        the cookie key so that every process (hypercorn workers,
+        restarted server) computes the same value and accepts
+        the same sessions.
+        """
+        if userpwd is None:
+            return None
+        salt = hmac.new(self._cookie_key_bytes(), b"userpwd",
+                        hashlib.sha256).digest()[:16]
+        return self.hash_pwd(userpwd, salt=salt)
+
+    def pwd_stamp(self):
+        """
+        Returns the value stored in the session instead of the password,
+        an :epkg:`HMAC` of the hashed password with the cookie key.
+        The cookie is only signed, its content is not secret,
+        the stamp does not reveal the hashed password but changes
+        with it: the sessions open before the password changed
+        are not valid anymore.
+
+        @return             string
+        """
+        if self.hashed_userpwd is None:
+            return ''
+        return hmac.new(self._cookie_key_bytes(),
+                        self.hashed_userpwd.encode('utf-8'),
+                        hashlib.sha256).hexdigest()
 
     async def authenticate(self, request):
         """
@@ -109,11 +176,13 @@ class AuthentificationAnswers:
         if loge:
             loge("authenticate", request, session={},  # pylint: disable=E1102
                  alias=fo['alias'])
-        res = self.is_allowed(alias=fo['alias'], pwd=fo['pwd'],
-                              request=request)
+        admitted, res = await self.login_limiter.run(
+            self.is_allowed, fo['alias'], fo['pwd'], request)
+        if not admitted:
+            return self.login_busy(request, fo['alias'])
         if res is not None:
             return res
-        data = dict(alias=fo['alias'], hashpwd=self.hash_pwd(fo['pwd']))
+        data = dict(alias=fo['alias'], hashpwd=self.pwd_stamp())
         returnto = ps.get('returnto', '/')
         context = {'request': request,
                    'alias': fo['alias'], 'returnto': returnto}
@@ -125,10 +194,48 @@ class AuthentificationAnswers:
         # response = RedirectResponse(url=returnto)
         # return response
 
+    def login_busy(self, request, alias):
+        """
+        Returns the page asking the user to retry later
+        when too many logins are waiting (see @see cl LoginLimiter),
+        status 503 and header *Retry-After*.
+
+        @param      request     request
+        @param      alias       alias
+        @return                 response
+        """
+        log = getattr(self, 'log_event', None)
+        if log:
+            log("login-busy", request, session={},  # pylint: disable=E1102
+                alias=alias, **self.login_limiter.metrics())
+        context = {'request': request, 'alias': alias,
+                   'retry': int(self.login_limiter.wait_timeout) + 1}
+        context.update(self._get_page_context())
+        return self.templates.TemplateResponse(  # pylint: disable=E1101
+            'busy.html', context, status_code=503,
+            headers={'Retry-After': str(context['retry'])})
+
+    async def login_metrics(self, request):
+        """
+        Returns the counters of the logins (see @see me LoginLimiter.metrics)
+        in :epkg:`json`. Only a logged user can see them,
+        the others receive the same answer as for any other page.
+        """
+        session = self.get_session(request, notnone=True)
+        if 'alias' not in session:
+            return self.unlogged_response(request, session)  # pylint: disable=E1101
+        return JSONResponse(self.login_limiter.metrics())
+
     async def logout(self, request):
         """
         Logout page.
         """
+        cook = request.cookies.get(self.cookie_name)
+        if self.session_store is not None:
+            if cook is not None:
+                self.session_store.delete(cook)
+        elif self.session_cache is not None:
+            self.session_cache.remove(cook)
         response = RedirectResponse(url=self.redirect_logout)
         response.delete_cookie(self.cookie_name, domain=self.cookie_domain,
                                path=self.cookie_path)
@@ -136,13 +243,18 @@ class AuthentificationAnswers:
 
     def save_session(self, response, data):
         """
-        Saves the session to the response in a secure cookie.
+        Saves the session to the response in a secure cookie
+        or in the session store if there is one, the cookie
+        then only contains the session id.
 
         @param      response    response
         @param      data        data
         """
-        data = ujson.dumps(data)  # pylint: disable=E1101
-        signed_data = self.signer.dumps([data])  # pylint: disable=E1101
+        if self.session_store is not None:
+            signed_data = self.session_store.create(data)
+        else:
+            data = ujson.dumps(data)  # pylint: disable=E1101
+            signed_data = self.signer.dumps([data])  # pylint: disable=E1101
         response.set_cookie(self.cookie_name, signed_data,
                             max_age=self.max_age,
                             httponly=True, domain=self.cookie_domain,
@@ -150,24 +262,85 @@ class AuthentificationAnswers:
 
     def get_session(self, request, notnone=False):
         """
-        Retrieves the session.
+        Retrieves the session. The cookie is decoded once per request,
+        the session is then stored in the request state
+        (``scope['state']``) and returned by the following calls
+        for the same request, by the logging functions for example.
 
-        @param      request     request
+        @param      request     request or :epkg:`ASGI` scope
         @param      notnone     None or empty dictionary
         @return                 session
         """
+        if not isinstance(request, HTTPConnection):
+            request = Request(request)
         cook = request.cookies.get(self.cookie_name)
-        if cook is not None:
-            unsigned = self.signer.loads(cook)
-            data = unsigned[0]
-            jsdata = ujson.loads(data)  # pylint: disable=E1101
-            # We check the hashed password is still good.
-            hashpwd = jsdata.get('hashpwd', '')
-            if not self.authentify_user(jsdata.get('alias', ''), hashpwd, False):
-                # We cancel the authentification.
-                return {}
-            return jsdata
-        return {} if notnone else None
+        cached = getattr(request.state, 'mathenjeu_session', None)
+        if cached is not None and cached[0] == cook:
+            jsdata = cached[1]
+        else:
+            jsdata = self._decode_session(cook)
+            request.state.mathenjeu_session = (cook, jsdata)
+        if jsdata is None:
+            return {} if notnone else None
+        return jsdata
+
+    def _decode_session(self, cook):
+        """
+        Decodes the session stored in a cookie. The verified sessions
+        are kept in a @see cl SessionCache, the signature and the password
+        are only checked again once the session expired from the cache,
+        after a logout or after the password was changed.
+
+        @param      cook        cookie value or None
+        @return                 session, empty if the user is not allowed
+                                anymore, None if there is no cookie
+        """
+        if cook is None:
+            return None
+        if self.session_store is not None:
+            # the store keeps its own cache, a revoked session
+            # must not stay in the cache of the verified cookies
+            return self.session_store.get(cook) or {}
+        if self.session_cache is None:
+            return self._verify_session(cook)
+        cached = self.session_cache.get(cook)
+        if cached is not None and cached[0] == self.hashed_userpwd:
+            return dict(cached[1])
+        jsdata = self._verify_session(cook)
+        self.session_cache.set(cook, (self.hashed_userpwd, jsdata))
+        return dict(jsdata)
+
+    def _verify_session(self, cook):
+        """
+        Checks the signature of a cookie and the password it contains.
+
+        @param      cook        cookie value
+        @return                 session, empty if the user is not allowed
+        """
+        unsigned = self.signer.loads(cook)
+        data = unsigned[0]
+        jsdata = ujson.loads(data)  # pylint: disable=E1101
+        # We check the password did not change.
+        hashpwd = jsdata.get('hashpwd', '')
+        if not self.authentify_user(jsdata.get('alias', ''), hashpwd, False):
+            # We cancel the authentification.
+            return {}
+        return jsdata
+
+    def set_userpwd(self, userpwd):
+        """
+        Changes the common password, the sessions verified
+        with the previous one are removed from the cache.
+
+        @param      userpwd     new password, None to allow any user
+        """
+        self.userpwd = userpwd
+        self.hashed_userpwd = self._hash_userpwd(userpwd)
+        self.pwd_verifier.clear()
+        if self.session_cache is not None:
+            self.session_cache.clear()
+        if self.session_store is not None:
+            self.session_store.clear()
 
     def is_allowed(self, alias, pwd, request):
         """
@@ -191,18 +364,24 @@ class AuthentificationAnswers:
 
         @param      alias       alias or user
         @param      pwd         password
-        @param      hash_before hashes the password before comparing, otherwise,
-                                the function assumes it is already hashed
+        @param      hash_before *pwd* is the password typed by the user,
+                                otherwise, it is the value stored in the session
+                                (see @see me pwd_stamp)
         @return                 boolean
 
         The current behavior is to allow anybody if the alias is longer
-        than 3 characters.
+        than 3 characters. The password is checked with a memory-hard
+        function (see @see fn hash_password), a password already
+        verified is not hashed again (see @see cl PasswordVerifier).
+        The comparisons take the same time whatever the password is.
         """
         if alias is None or len(alias.strip()) <= 3:
             return False
         if self.hashed_userpwd is None:
             return True
+        if pwd is None:
+            return False
         if hash_before:
-            hashed_pwd = self.hash_pwd(pwd)
-            return hashed_pwd == self.hashed_userpwd
-        return pwd == self.hashed_userpwd
+            return self.pwd_verifier.verify(pwd, self.hashed_userpwd)
+        return hmac.compare_digest(pwd.encode('utf-8'),
+                                   self.pwd_stamp().encode('utf-8'))
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Merges events repeated within a short period of time.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+def collapse_events(events):
+    """
+    Removes consecutive duplicates from a list of events,
+    the sequence of changes is kept.
+
+    @param      events      list of events
+    @return                 list of events
+    """
+    res = []
+    for ev in events:
+        if not res or res[-1] != ev:
+            res.append(ev)
+    return res
+
+
+class _Bucket:
+    """
+    Events received for one key within one window.
+    """
+
+    __slots__ = ['begin', 'msg', 'session', 'client', 'data', 'events', 'count']
+
+    def __init__(self, begin, msg, session, client, data):
+        self.begin = begin
+        self.msg = msg
+        self.session = session
+        self.client = client
+        self.data = data
+        self.events = []
+        self.count = 0
+
+
+class EventCoalescer:
+    """
+    Merges the events received for the same key
+    (usually a session, a game and a question) within a window
+    of *window* seconds. The first event of a window is written
+    immediately, the following ones are merged into one record
+    written when the window ends: the events without consecutive
+    duplicates (see @see fn collapse_events) and the number of merged
+    events (field *count*). A window ends when an event is received
+    after its end, whatever the key is, when a background thread
+    checks the windows (every *window* seconds) or when @see me flush
+    is called, the last events of a session are written at most
+    two windows after they were received.
+
+    @param      emit        function ``emit(msg, session, client, data)``
+                            which writes a record, it may be called
+                            by the background thread
+    @param      window      duration of a window in seconds
+    @param      timer       starts the background thread, otherwise
+                            @see me sweep must be called
+    """
+
+    def __init__(self, emit, window=1., timer=True):
+        if window <= 0:
+            raise ValueError(
+                "window must be strictly positive not {0}".format(window))
+        self.emit = emit
+        self.window = window
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+        self.nb_received = 0
+        self.nb_written = 0
+        self.stop = threading.Event()
+        if timer:
+            self.thread = threading.Thread(target=self._run, daemon=True,
+                                           name="EventCoalescer")
+            self.thread.start()
+        else:
+            self.thread = None
+
+    def _run(self):
+        while not self.stop.wait(self.window):
+            try:
+                self.sweep()
+            except Exception as e:  # pylint: disable=W0703
+                # the thread must not die
+                logging.getLogger(__name__).error(
+                    "Unable to write coalesced events due to %r", e)
+
+    def add(self, key, msg, session, client, event, data=None):
+        """
+        Adds one event.
+
+        @param      key         key, events are merged by key
+        @param      msg         event kind
+        @param      session     session
+        @param      client      client (IP address, port)
+        @param      event       event (a string)
+        @param      data        additional data written with the events
+        @return                 True if the event was written immediately
+        """
+        now = time.perf_counter()
+        data = {} if data is None else data
+        with self.lock:
+            self.nb_received += 1
+            ready = self._expired(now)
+            bucket = self.buckets.get(key, None)
+            if bucket is None:
+                self.buckets[key] = _Bucket(now, msg, session, client, data)
+                ready.append((msg, session, client, dict(events=[event], **data)))
+                written = True
+            else:
+                bucket.events.append(event)
+                bucket.count += 1
+                written = False
+            self.nb_written += len(ready)
+        for record in ready:
+            self.emit(*record)
+        return written
+
+    def _expired(self, now):
+        """
+        Removes the windows ended before *now*
+        and returns the records to write.
+        """
+        ready = []
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if now is not None and bucket.begin + self.window > now:
+                break
+            del self.buckets[key]
+            if bucket.count > 0:
+                data = dict(events=collapse_events(bucket.events),
+                            count=bucket.count)
+                data.update(bucket.data)
+                ready.append((bucket.msg, bucket.session, bucket.client, data))
+        return ready
+
+    def sweep(self):
+        """
+        Writes the events of the windows which ended.
+        """
+        self._write(time.perf_counter())
+
+    def flush(self):
+        """
+        Writes every pending event.
+        """
+        self._write(None)
+
+    def _write(self, now):
+        with self.lock:
+            ready = self._expired(now)
+            self.nb_written += len(ready)
+        for record in ready:
+            self.emit(*record)
+
+    def close(self):
+        """
+        Stops the background thread and writes every pending event.
+        """
+        if self.thread is not None:
+            self.stop.set()
+            self.thread.join()
+            self.thread = None
+        self.flush()
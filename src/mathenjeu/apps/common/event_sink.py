@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Writes the events of a web application in a binary format.
+"""
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from ...datalog.formats import EVENT_EXT, EVENT_SCHEMA  # pylint: disable=W0611
+
+_header = struct.Struct("<I")
+
+
+def _to_plain(value):
+    """
+    Converts a mapping such as *QueryParams* into a dictionary
+    :epkg:`msgpack` can serialize.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(v) for v in value]
+    if hasattr(value, 'items'):
+        return {str(k): _to_plain(v) for k, v in value.items()}
+    return str(value)
+
+
+class EventSink:
+    """
+    Writes events into a binary file, every record is a :epkg:`msgpack`
+    list following *EVENT_SCHEMA* preceded by its length
+    (4 bytes, little endian). Unlike the text logs, the records
+    do not need to be repaired before being read
+    (see @see fn enumerate_binlog_records).
+    A new file ``<name>-<date>.events.mpk`` is created every day.
+    @see cl LogApp sends the events to @see cl BatchLogWriter
+    if the logs are written in a background thread, this thread
+    then writes the events by batch.
+
+    :param folder: destination folder
+    :param name: prefix of the files
+    """
+
+    def __init__(self, folder, name):
+        import msgpack  # pylint: disable=C0415
+        self.folder = folder
+        self.name = name
+        self.packer = msgpack.Packer(use_bin_type=True)
+        self.lock = threading.Lock()
+        self.date = None
+        self.stream = None
+        self.filename = None
+
+    def _open(self, date):
+        if self.stream is not None:
+            self.stream.close()
+        self.date = date
+        self.filename = os.path.join(
+            self.folder, "{0}-{1}{2}".format(self.name, date, EVENT_EXT))
+        self.stream = open(self.filename, "ab")  # pylint: disable=R1732
+
+    def _pack(self, created, msg, session, client, data):
+        data = dict(data)
+        alias = session.get('alias', None) if session else None
+        game = data.pop('game', None)
+        qn = data.pop('qn', None)
+        events = data.pop('events', None)
+        sub = data.pop('data', None)
+        record = [created, msg, alias, _to_plain(client), _to_plain(game),
+                  _to_plain(qn), _to_plain(sub), _to_plain(events),
+                  _to_plain(data) if data else None]
+        packed = self.packer.pack(record)
+        return _header.pack(len(packed)) + packed
+
+    def write(self, msg, session, client, data, created=None):
+        """
+        Writes one event.
+
+        :param msg: event kind
+        :param session: session (dictionary) or None
+        :param client: client (IP address, port)
+        :param data: additional data, keys *game*, *qn*, *data*, *events*
+            have their own field, the others are stored in field *extra*
+        :param created: time of the event (``time.time()``),
+            None for the current time
+        """
+        if created is None:
+            created = time.time()
+        self.write_batch([(created, msg, session, client, data)])
+
+    def write_batch(self, events):
+        """
+        Writes many events with only one flush,
+        @see cl BatchLogWriter calls it from its thread.
+
+        :param events: list of ``(created, msg, session, client, data)``,
+            see @see me write
+        """
+        with self.lock:
+            for created, msg, session, client, data in events:
+                packed = self._pack(created, msg, session, client, data)
+                date = datetime.fromtimestamp(created).strftime("%Y-%m-%d")
+                if date != self.date:
+                    self._open(date)
+                self.stream.write(packed)
+            if self.stream is not None:
+                self.stream.flush()
+
+    def close(self):
+        """
+        Closes the current file.
+        """
+        with self.lock:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+                self.date = None
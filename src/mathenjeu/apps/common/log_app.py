@@ -3,7 +3,13 @@
 @file
 @brief Starts an application.
 """
+import logging
 from lightmlrestapi.mlapp.base_logging import BaseLogging  # pylint: disable=C0411
+from .log_writer import BatchLogWriter
+from .event_sink import EventSink
+from .event_coalescer import EventCoalescer
+from .log_rotation import CompressedRotatingFileHandler
+from ...datalog.formats import DATA_TAG
 
 
 class LogApp(BaseLogging):
@@ -13,15 +19,111 @@ class LogApp(BaseLogging):
     about the session whatever it is as a dictionary.
     """
 
-    def __init__(self, folder='.', secret_log=None, fct_session=None, **kwargs):
+    def __init__(self, folder='.', secret_log=None, fct_session=None,
+                 async_log=None, event_sink=None, event_window=None,
+                 compress_log=None, max_log_size=None, **kwargs):
         """
         @param      fct_session     function to return information about a session
         @param      secret_log      to encrypt log (None to ignore)
         @param      folder          folder where to write the logs (None to disable the logging)
+        @param      async_log       None or False to write the logs synchronously,
+                                    True to write them in a background thread
+                                    (see @see cl BatchLogWriter), a dictionary
+                                    to specify the parameters of @see cl BatchLogWriter
+        @param      event_sink      None or False to log the events as text only,
+                                    True to log them also in a binary file
+                                    (see @see cl EventSink), ``'only'`` to log them
+                                    in the binary file only, the events are written
+                                    by the background thread if *async_log* is specified
+        @param      event_window    None to log every event, a duration in seconds
+                                    to merge the events logged with
+                                    @see me log_coalesced_event within this
+                                    duration (see @see cl EventCoalescer)
+        @param      compress_log    None to keep the rotated logs as they are,
+                                    ``'gzip'`` or ``'zstd'`` to compress them
+                                    (see @see cl CompressedRotatingFileHandler)
+        @param      max_log_size    None or a size in bytes, the logs are rotated
+                                    when the file is bigger
         @param      kwargs          additional parameters for :epkg:`BaseLogging`
         """
         BaseLogging.__init__(self, secret=secret_log, folder=folder, **kwargs)
+        if (compress_log or max_log_size) and folder is not None:
+            handler = CompressedRotatingFileHandler(
+                self.handler.baseFilename, compression=compress_log or None,
+                max_bytes=int(max_log_size) if max_log_size else None,
+                encoding=self.handler.encoding, delay=True,
+                when=self.handler.when)
+            handler.setFormatter(self.handler.formatter)
+            self.logger.removeHandler(self.handler)
+            self.logger.addHandler(handler)
+            self.handler = handler
         self.get_session = fct_session
+        if event_sink not in (None, False, True, 'only'):
+            raise ValueError(
+                "event_sink must be None, False, True or 'only' not {0}".format(event_sink))
+        if event_sink and folder is not None:
+            self.event_sink = EventSink(folder, self.__class__.__name__)
+            self.event_sink_only = event_sink == 'only'
+        else:
+            self.event_sink = None
+            self.event_sink_only = False
+        if async_log and folder is not None:
+            params = async_log if isinstance(async_log, dict) else {}
+            self.log_writer = BatchLogWriter(
+                self, event_sink=self.event_sink, **params)
+        else:
+            self.log_writer = None
+        if event_window:
+            self.event_coalescer = EventCoalescer(
+                self._write_event, window=float(event_window))
+        else:
+            self.event_coalescer = None
+
+    def info(self, msg, data):
+        """
+        Logs any kind of data into the logs.
+
+        @param  msg         message
+        @param  data        data to log
+        """
+        if self.log_writer is None:
+            BaseLogging.info(self, msg, data)
+        else:
+            self.log_writer.put(logging.INFO, msg, data)
+
+    def error(self, msg, data):
+        """
+        Logs any kind of data into the logs.
+
+        @param  msg         message
+        @param  data        data to log
+        """
+        if self.log_writer is None:
+            BaseLogging.error(self, msg, data)
+        else:
+            self.log_writer.put(logging.ERROR, msg, data)
+
+    def flush_log(self):
+        """
+        Waits until every log is written if the logs
+        are written in a background thread.
+        """
+        if self.log_writer is not None:
+            self.log_writer.flush()
+
+    def close_log(self):
+        """
+        Writes the remaining logs and stops the background thread,
+        the following logs are written synchronously.
+        Closes the binary file of events.
+        """
+        if self.event_coalescer is not None:
+            self.event_coalescer.close()
+        if self.log_writer is not None:
+            self.log_writer.close()
+            self.log_writer = None
+        if self.event_sink is not None:
+            self.event_sink.close()
 
     def log_any(self, tag, msg, request, session=None, **data):
         """
@@ -51,4 +153,45 @@ class LogApp(BaseLogging):
         """
         if not session and self.get_session:
             session = self.get_session(request)
-        self.log_any('[DATA]', msg, request, session=session, **data)
+        if self.event_coalescer is not None:
+            self.event_coalescer.sweep()
+        self._write_event(msg, session, request["client"], data)
+
+    def log_coalesced_event(self, msg, request, key, event, session=None, **data):
+        """
+        Logs an event which may be repeated many times in a short
+        period of time, the repeated events are merged
+        if parameter *event_window* was specified
+        (see @see cl EventCoalescer), the event is logged in
+        field *events* as @see me log_event would do otherwise.
+
+        @param      msg     event kind
+        @param      request request
+        @param      key     events with the same key are merged
+        @param      event   event (a string)
+        @param      session information about the session
+        @param      data    addition data
+        """
+        if not session and self.get_session:
+            session = self.get_session(request)
+        if self.event_coalescer is None:
+            self._write_event(msg, session, request["client"],
+                              dict(events=[event], **data))
+        else:
+            self.event_coalescer.add(key, msg, session, request["client"],
+                                     event, data)
+
+    def _write_event(self, msg, session, client, data):
+        """
+        Writes an event in the logs and the binary file of events.
+        """
+        if self.event_sink is not None:
+            if self.log_writer is None:
+                self.event_sink.write(msg, session, client, data)
+            else:
+                self.log_writer.put_event(msg, session, client, data)
+            if self.event_sink_only:
+                return
+        log = dict(msg=msg, session=session, client=client)
+        log.update(data)
+        self.info(DATA_TAG, log)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Rotates the logs of a web application into compressed segments.
+"""
+import os
+import gzip
+import logging
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import TimedRotatingFileHandler
+from ...datalog.formats import LOG_COMPRESSIONS
+
+
+def compress_log_file(source, dest, compression='gzip'):
+    """
+    Compresses a file and removes it. The compressed file
+    is first written with extension ``.tmp`` and then renamed,
+    a reader never sees an incomplete segment. It keeps the
+    modification time of the source.
+
+    :param source: file to compress
+    :param dest: compressed file
+    :param compression: ``'gzip'`` or ``'zstd'`` (requires :epkg:`zstandard`)
+    """
+    if compression not in LOG_COMPRESSIONS:
+        raise ValueError("Unknown compression '{0}', expecting one of {1}".format(
+            compression, list(sorted(LOG_COMPRESSIONS))))
+    tmp = dest + ".tmp"
+    with open(source, "rb") as fin:
+        if compression == 'gzip':
+            with gzip.open(tmp, "wb", compresslevel=6) as fout:
+                shutil.copyfileobj(fin, fout, 2 ** 20)
+        else:
+            import zstandard  # pylint: disable=C0415,E0401
+            with open(tmp, "wb") as fout:
+                zstandard.ZstdCompressor().copy_stream(fin, fout)
+    shutil.copystat(source, tmp)
+    os.replace(tmp, dest)
+    os.remove(source)
+
+
+class CompressedRotatingFileHandler(TimedRotatingFileHandler):
+    """
+    Extends :epkg:`TimedRotatingFileHandler` to rotate the logs
+    when the file is bigger than *max_bytes* and to compress
+    the rotated segments (see @see fn compress_log_file).
+    A segment is named after the log file, the date of the rotation
+    and a counter if this name already exists:
+    ``QCMApp-2018-12-12.log.2018-12-12.gz``,
+    ``QCMApp-2018-12-12.log.2018-12-12.1.gz``...
+    Like option *delaycompress* of *logrotate*, the last segment
+    is only compressed at the next rotation, a program following
+    the logs can still read the end of the file after it was rotated.
+    The segments are compressed by a background thread, the rotation
+    happens while a record is written, possibly on the thread running
+    the event loop. Method *close* waits for the compression.
+    No segment is ever removed.
+
+    :param filename: log file
+    :param compression: None, ``'gzip'`` or ``'zstd'``
+    :param max_bytes: maximum size of the log file in bytes,
+        None to rotate the logs only at the time defined by *when*
+    :param kwargs: see :epkg:`TimedRotatingFileHandler`
+    """
+
+    def __init__(self, filename, compression=None, max_bytes=None, **kwargs):
+        if compression is not None and compression not in LOG_COMPRESSIONS:
+            raise ValueError("Unknown compression '{0}', expecting one of {1}".format(
+                compression, list(sorted(LOG_COMPRESSIONS))))
+        TimedRotatingFileHandler.__init__(self, filename, **kwargs)
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.namer = self._name_segment
+        self._compressor = None
+        self._compressing = set()
+        self._compress_lock = threading.Lock()
+        if compression is not None:
+            self.rotator = self._rotate_segment
+
+    def _name_segment(self, default_name):
+        """
+        Returns a name which does not exist yet, the default
+        behaviour removes an existing segment with the same name.
+        """
+        ext = LOG_COMPRESSIONS.get(self.compression, '')
+        name = default_name
+        i = 1
+        while os.path.exists(name) or os.path.exists(name + ext):
+            name = "{0}.{1}".format(default_name, i)
+            i += 1
+        return name + ext
+
+    def _is_segment(self, name):
+        """
+        Tells if *name* is a rotated segment of this log file
+        which is not compressed.
+        """
+        base = os.path.split(self.baseFilename)[-1]
+        if not name.startswith(base + "."):
+            return False
+        suffix = name[len(base) + 1:]
+        parts = suffix.rsplit('.', 1)
+        if len(parts) == 2 and parts[1].isdigit():
+            suffix = parts[0]
+        try:
+            time.strptime(suffix, self.suffix)
+        except ValueError:
+            return False
+        return True
+
+    def _rotate_segment(self, source, dest):
+        """
+        Renames the log file and compresses the previous segments
+        in a background thread.
+        """
+        plain = dest[:-len(LOG_COMPRESSIONS[self.compression])]
+        if os.path.exists(source):
+            os.rename(source, plain)
+        folder = os.path.dirname(self.baseFilename)
+        with self._compress_lock:
+            if self._compressor is None:
+                self._compressor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="LogCompression")
+            for name in os.listdir(folder):
+                full = os.path.join(folder, name)
+                if (full != plain and full not in self._compressing and
+                        self._is_segment(name)):
+                    self._compressing.add(full)
+                    self._compressor.submit(self._compress_segment, full)
+
+    def _compress_segment(self, name):
+        try:
+            compress_log_file(
+                name, name + LOG_COMPRESSIONS[self.compression],
+                self.compression)
+        except Exception as e:  # pylint: disable=W0703
+            # the segment stays uncompressed, the next rotation tries again
+            logging.getLogger(__name__).error(
+                "Unable to compress '%s' due to %r", name, e)
+        finally:
+            with self._compress_lock:
+                self._compressing.discard(name)
+
+    def close(self):
+        """
+        Waits for the compression of the segments and closes the file.
+        """
+        with self._compress_lock:
+            compressor, self._compressor = self._compressor, None
+        if compressor is not None:
+            compressor.shutdown(wait=True)
+        TimedRotatingFileHandler.close(self)
+
+    def shouldRollover(self, record):
+        """
+        Tells if the logs must be rotated before writing *record*.
+        """
+        if TimedRotatingFileHandler.shouldRollover(self, record):
+            return 1
+        if self.max_bytes:
+            if self.stream is not None:
+                size = self.stream.tell()
+            elif os.path.exists(self.baseFilename):
+                size = os.stat(self.baseFilename).st_size
+            else:
+                return 0
+            if size >= self.max_bytes:
+                return 1
+        return 0
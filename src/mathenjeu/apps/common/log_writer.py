@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Writes the logs of a web application in a background thread.
+"""
+import logging
+import queue
+import threading
+import time
+from lightmlrestapi.tools import json_dumps
+from ...datalog.formats import DATA_TAG
+
+_STOP = object()
+_EVENT = object()
+
+
+class BatchLogWriter:
+    """
+    Writes the logs of a @see cl LogApp in a background thread.
+    The application only adds the data to a queue, the thread
+    serializes or encrypts the data and writes the lines by batch,
+    a batch is written when it contains *batch_size* records
+    or *flush_interval* seconds after its first record.
+    The time of every line is the time the data was added
+    to the queue. The application never waits, it is usually
+    the thread running the event loop. The queue is not bounded:
+    the data (message *DATA_TAG*, the events, the errors) is never lost.
+    Once the queue contains *max_queue* records, the other records
+    (information about the pages) are dropped and counted in *nb_dropped*,
+    the data records are counted in *nb_overflows* and a warning
+    is logged every time the queue goes above this size.
+    The events sent with @see me put_event are written the same way
+    into *event_sink*.
+
+    :param logapp: @see cl LogApp (or :epkg:`BaseLogging`)
+    :param batch_size: maximum number of records written at once
+    :param flush_interval: maximum time (seconds) a record waits
+        before being written
+    :param max_queue: size of the queue above which the records
+        which are not data are dropped
+    :param event_sink: @see cl EventSink or None
+    """
+
+    def __init__(self, logapp, batch_size=100, flush_interval=0.05,
+                 max_queue=10000, event_sink=None):
+        self.logapp = logapp
+        self.event_sink = event_sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.queue = queue.Queue()
+        self.above = False
+        self.lock = threading.Lock()
+        self.nb_written = 0
+        self.nb_batches = 0
+        self.nb_dropped = 0
+        self.nb_overflows = 0
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name="BatchLogWriter")
+        self.thread.start()
+
+    def put(self, level, msg, data):
+        """
+        Adds one record to the queue, the records which are not data
+        are dropped if the queue contains more than *max_queue* records.
+
+        :param level: ``logging.INFO`` or ``logging.ERROR``
+        :param msg: message
+        :param data: data, it must not be modified after this call
+        """
+        self._put((time.time(), level, msg, data))
+
+    def put_event(self, msg, session, client, data):
+        """
+        Adds one event to the queue, it is written into *event_sink*
+        (see @see cl EventSink), it is never dropped.
+
+        :param msg: event kind
+        :param session: session or None
+        :param client: client
+        :param data: additional data, it must not be modified after this call
+        """
+        self._put((time.time(), _EVENT, msg, (session, client, data)))
+
+    def _put(self, item):
+        if self.thread is None:
+            self._write([item])
+            return
+        if self.queue.qsize() < self.max_queue:
+            self.above = False
+        else:
+            level, msg = item[1], item[2]
+            if level is not _EVENT and level < logging.ERROR and msg != DATA_TAG:
+                self.nb_dropped += 1
+                return
+            self.nb_overflows += 1
+            if not self.above:
+                self.above = True
+                logging.getLogger(__name__).warning(
+                    "BatchLogWriter: more than %d records are waiting",
+                    self.max_queue)
+        self.queue.put_nowait(item)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self.queue.get()
+            if item is _STOP:
+                self.queue.task_done()
+                break
+            batch = [item]
+            end = time.perf_counter() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = end - time.perf_counter()
+                try:
+                    item = self.queue.get(timeout=timeout) \
+                        if timeout > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    self.queue.task_done()
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+            except Exception as e:  # pylint: disable=W0703
+                # the thread must not die
+                logging.getLogger(__name__).error(
+                    "Unable to write %d log records due to %r", len(batch), e)
+            for _ in batch:
+                self.queue.task_done()
+
+    def _make_record(self, created, level, msg, data):
+        logapp = self.logapp
+        if logapp.secret is None:
+            try:
+                dumped = json_dumps(data)
+            except Exception:  # pylint: disable=W0703
+                # Cannot serialize into json.
+                dumped = str(data)
+        else:
+            dumped = logapp.jwt.encode(data, logapp.secret, algorithm='HS256')
+        record = logapp.logger.makeRecord(
+            logapp.logger.name, level, __file__, 0, msg, None, None,
+            extra=dict(data=dumped))
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        return record
+
+    def _write(self, batch):
+        """
+        Writes a batch of records with only one flush.
+        """
+        logapp = self.logapp
+        events = [(created, msg) + args for created, level, msg, args in batch
+                  if level is _EVENT]
+        if events:
+            self.event_sink.write_batch(events)
+            batch = [item for item in batch if item[1] is not _EVENT]
+            self.nb_written += len(events)
+        if logapp.logger is None or not batch:
+            return
+        records = [self._make_record(*item) for item in batch]
+        handler = logapp.handler
+        with self.lock:
+            handler.acquire()
+            try:
+                for record in records:
+                    if handler.shouldRollover(record):
+                        handler.doRollover()
+                    if handler.stream is None:
+                        handler.stream = handler._open()  # pylint: disable=W0212
+                    handler.stream.write(
+                        handler.format(record) + handler.terminator)
+                if handler.stream is not None:
+                    handler.stream.flush()
+            finally:
+                handler.release()
+        self.nb_written += len(records)
+        self.nb_batches += 1
+
+    def flush(self):
+        """
+        Waits until every record in the queue is written.
+        """
+        if self.thread is not None:
+            self.queue.join()
+
+    def close(self):
+        """
+        Writes the remaining records and stops the thread,
+        the following records are written synchronously.
+        """
+        if self.thread is None:
+            return
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.thread = None
+        # records added while the thread was stopping
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+            self.queue.task_done()
+        if batch:
+            self._write(batch)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Limits the number of logins processed at the same time.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+
+class LoginLimiter:
+    """
+    Runs the costly part of a login (hashing the password,
+    see @see fn hash_password) in a pool of threads and limits
+    the number of logins processed at the same time,
+    the event loop keeps serving the other requests.
+    At most *max_concurrent* logins are processed, the following
+    ones wait in a queue up to *wait_timeout* seconds. A login
+    is rejected if the queue already contains *max_waiting* logins
+    or if it waited too long, the application then returns
+    a page asking the user to retry. Method @see me metrics
+    returns counters to size the servers.
+
+    @param      max_concurrent  maximum number of logins processed at the same time,
+                                it is also the number of threads
+    @param      max_waiting     maximum number of waiting logins
+    @param      wait_timeout    maximum waiting time (seconds)
+    """
+
+    #: number of threads used when the application does not specify it
+    DEFAULT_CONCURRENCY = 4
+
+    def __init__(self, max_concurrent=4, max_waiting=100, wait_timeout=5.):
+        if max_concurrent <= 0:
+            raise ValueError(
+                "max_concurrent must be strictly positive not {0}".format(max_concurrent))
+        if max_waiting < 0:
+            raise ValueError(
+                "max_waiting must be positive not {0}".format(max_waiting))
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent,
+                                           thread_name_prefix="LoginLimiter")
+        self._loop = None
+        self._semaphore = None
+        self.active = 0
+        self.waiting = 0
+        self.peak_active = 0
+        self.peak_waiting = 0
+        self.nb_admitted = 0
+        self.nb_rejected = 0
+        self.nb_timeouts = 0
+        self.total_wait = 0.
+        self.max_wait = 0.
+        self.total_duration = 0.
+
+    def _get_semaphore(self):
+        # a semaphore belongs to an event loop
+        loop = asyncio.get_event_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    async def run(self, fct, *args):
+        """
+        Runs ``fct(*args)`` in a thread once a slot is available.
+
+        @param      fct     function
+        @param      args    arguments
+        @return             ``(True, result)`` or ``(False, None)``
+                            if the login was rejected
+        """
+        semaphore = self._get_semaphore()
+        begin = perf_counter()
+        if semaphore.locked():
+            if self.waiting >= self.max_waiting:
+                self.nb_rejected += 1
+                return False, None
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            try:
+                # the semaphore gives back the permit if the timeout
+                # cancels the acquisition once it succeeded,
+                # wait_for may lose it
+                async with asyncio.timeout(self.wait_timeout):
+                    await semaphore.acquire()
+            except TimeoutError:
+                self.nb_timeouts += 1
+                return False, None
+            finally:
+                self.waiting -= 1
+        else:
+            await semaphore.acquire()
+        wait = perf_counter() - begin
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.nb_admitted += 1
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            begin = perf_counter()
+            res = await self._loop.run_in_executor(self.executor, fct, *args)
+            self.total_duration += perf_counter() - begin
+        finally:
+            self.active -= 1
+            semaphore.release()
+        return True, res
+
+    def metrics(self):
+        """
+        Returns the counters.
+
+        @return         dictionary, *active* and *waiting* are the current
+                        number of processed and waiting logins, *peak_active*
+                        and *peak_waiting* the maximum values since the
+                        application started, *admitted*, *rejected*
+                        (queue full), *timeouts* (waited too long) count the
+                        logins, *wait_mean*, *wait_max*, *duration_mean*
+                        are the waiting and processing times in seconds
+        """
+        n = max(self.nb_admitted, 1)
+        return dict(active=self.active, waiting=self.waiting,
+                    peak_active=self.peak_active,
+                    peak_waiting=self.peak_waiting,
+                    admitted=self.nb_admitted, rejected=self.nb_rejected,
+                    timeouts=self.nb_timeouts,
+                    wait_mean=self.total_wait / n, wait_max=self.max_wait,
+                    duration_mean=self.total_duration / n,
+                    max_concurrent=self.max_concurrent,
+                    max_waiting=self.max_waiting)
+
+    def close(self):
+        """
+        Stops the threads.
+        """
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Hashes and verifies passwords.
+"""
+import base64
+import hashlib
+import hmac
+import os
+from .session_cache import SessionCache
+
+#: Default parameters of :epkg:`scrypt` used by @see fn hash_password,
+#: hashing a password takes about 16 Mb and 50 ms.
+SCRYPT_PARAMS = dict(n=2 ** 14, r=8, p=1)
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def hash_password(pwd, salt=None, n=None, r=None, p=None):
+    """
+    Hashes a password with :epkg:`scrypt` and a random salt.
+
+    :param pwd: password
+    :param salt: salt (bytes), None for a random one
+    :param n: cost parameter, None for the default value (*SCRYPT_PARAMS*)
+    :param r: block size, None for the default value
+    :param p: parallelization, None for the default value
+    :return: string ``scrypt$n$r$p$salt$hash``
+        (salt and hash encoded in base 64)
+    """
+    n = SCRYPT_PARAMS['n'] if n is None else n
+    r = SCRYPT_PARAMS['r'] if r is None else r
+    p = SCRYPT_PARAMS['p'] if p is None else p
+    if salt is None:
+        salt = os.urandom(16)
+    digest = hashlib.scrypt(pwd.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                            maxmem=256 * n * r * p)
+    return "scrypt${0}${1}${2}${3}${4}".format(
+        n, r, p, _b64(salt), _b64(digest))
+
+
+def verify_password(pwd, hashed):
+    """
+    Checks a password against a value returned by
+    @see fn hash_password, the comparison takes the same time
+    whatever the password is (``hmac.compare_digest``).
+
+    :param pwd: password
+    :param hashed: hashed password
+    :return: boolean
+    """
+    if pwd is None or hashed is None:
+        return False
+    parts = hashed.split('$')
+    if len(parts) != 6 or parts[0] != 'scrypt':
+        raise ValueError("Unexpected hashed password format '{0}'".format(
+            parts[0]))
+    n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+    salt = base64.b64decode(parts[4])
+    expected = hash_password(pwd, salt=salt, n=n, r=r, p=p)
+    return hmac.compare_digest(expected.encode('ascii'),
+                               hashed.encode('ascii'))
+
+
+class PasswordVerifier:
+    """
+    Checks passwords with @see fn verify_password and keeps
+    the successful verifications in a @see cl SessionCache,
+    a password already verified is not hashed again. The cache
+    key is an :epkg:`HMAC` of the password and of the hashed password
+    with a random key generated by the process, the passwords
+    are not kept in memory. The failed verifications are not kept,
+    every wrong password costs a full hash.
+
+    :param max_size: maximum number of verifications kept
+    :param ttl: a password is hashed again after this duration (seconds)
+    """
+
+    def __init__(self, max_size=1024, ttl=3600.):
+        self.cache = SessionCache(max_size=max_size, ttl=ttl)
+        self.key = os.urandom(32)
+
+    def verify(self, pwd, hashed):
+        """
+        Checks a password.
+
+        :param pwd: password
+        :param hashed: hashed password (see @see fn hash_password)
+        :return: boolean
+        """
+        if pwd is None or hashed is None:
+            return False
+        key = hmac.new(self.key, "{0}\n{1}".format(hashed, pwd).encode('utf-8'),
+                       hashlib.sha256).digest()
+        if self.cache.get(key) is not None:
+            return True
+        if verify_password(pwd, hashed):
+            self.cache.set(key, True)
+            return True
+        return False
+
+    def clear(self):
+        """
+        Removes every verification.
+        """
+        self.cache.clear()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Keeps the sessions already verified.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionCache:
+    """
+    Bounded cache with a time to live. It keeps at most *max_size*
+    values, the least recently used one is removed first,
+    a value is removed *ttl* seconds after it was added.
+    @see cl AuthentificationAnswers uses it to keep the sessions
+    already verified, the key is the signed cookie.
+
+    @param      max_size    maximum number of values
+    @param      ttl         time to live of a value in seconds
+    """
+
+    def __init__(self, max_size=10000, ttl=60.):
+        if max_size <= 0:
+            raise ValueError(
+                "max_size must be strictly positive not {0}".format(max_size))
+        if ttl <= 0:
+            raise ValueError(
+                "ttl must be strictly positive not {0}".format(ttl))
+        self.max_size = max_size
+        self.ttl = ttl
+        self.values = OrderedDict()
+        self.lock = threading.Lock()
+        self.nb_hits = 0
+        self.nb_misses = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, key):
+        """
+        Returns the value stored for *key*, None if there is none
+        or if it expired.
+
+        @param      key     key
+        @return             value or None
+        """
+        now = time.monotonic()
+        with self.lock:
+            item = self.values.get(key, None)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self.values[key]
+                self.nb_misses += 1
+                return None
+            self.values.move_to_end(key)
+            self.nb_hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        """
+        Stores a value.
+
+        @param      key     key
+        @param      value   value (not None)
+        """
+        end = time.monotonic() + self.ttl
+        with self.lock:
+            self.values[key] = (end, value)
+            self.values.move_to_end(key)
+            while len(self.values) > self.max_size:
+                self.values.popitem(last=False)
+
+    def remove(self, key):
+        """
+        Removes a value if it exists.
+
+        @param      key     key
+        """
+        with self.lock:
+            self.values.pop(key, None)
+
+    def clear(self):
+        """
+        Removes every value.
+        """
+        with self.lock:
+            self.values.clear()
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Stores the sessions on the server side,
+the cookie only contains an opaque session id.
+"""
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import ujson
+from .session_cache import SessionCache
+
+
+class SessionStore(ABC):
+    """
+    Base class for the session stores. A session is created
+    at login, it expires *ttl* seconds later or when it is deleted
+    (logout, revocation). The cookie only contains the session id,
+    a random string of 43 characters.
+
+    @param      ttl     duration of a session in seconds
+    """
+
+    def __init__(self, ttl=14 * 24 * 60 * 60):
+        if ttl <= 0:
+            raise ValueError(
+                "ttl must be strictly positive not {0}".format(ttl))
+        self.ttl = ttl
+
+    @staticmethod
+    def new_id():
+        """
+        Returns a new session id.
+        """
+        return secrets.token_urlsafe(32)
+
+    @abstractmethod
+    def create(self, data):
+        """
+        Creates a session.
+
+        @param      data    session (dictionary, key *alias* is expected)
+        @return             session id
+        """
+
+    @abstractmethod
+    def get(self, sid):
+        """
+        Returns a session.
+
+        @param      sid     session id
+        @return             session or None if it does not exist or expired
+        """
+
+    @abstractmethod
+    def delete(self, sid):
+        """
+        Deletes a session.
+
+        @param      sid     session id
+        """
+
+    @abstractmethod
+    def revoke(self, alias):
+        """
+        Deletes every session of a user.
+
+        @param      alias   user alias
+        @return             number of deleted sessions
+        """
+
+    @abstractmethod
+    def clear(self):
+        """
+        Deletes every session.
+        """
+
+    @abstractmethod
+    def count(self):
+        """
+        Returns the number of active sessions
+        and the number of distinct users.
+
+        @return             ``(sessions, users)``
+        """
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Stores the sessions in a dictionary, the sessions are lost
+    when the process stops and are not shared with other processes
+    (hypercorn workers), see @see cl SQLiteSessionStore.
+
+    @param      ttl     duration of a session in seconds
+    """
+
+    def __init__(self, ttl=14 * 24 * 60 * 60):
+        SessionStore.__init__(self, ttl)
+        # sorted by expiration time, every session has the same duration
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _expire(self, now):
+        while self.sessions:
+            sid, (end, _) = next(iter(self.sessions.items()))
+            if end > now:
+                break
+            del self.sessions[sid]
+
+    def create(self, data):
+        sid = self.new_id()
+        now = time.time()
+        with self.lock:
+            self._expire(now)
+            self.sessions[sid] = (now + self.ttl, dict(data))
+        return sid
+
+    def get(self, sid):
+        now = time.time()
+        with self.lock:
+            item = self.sessions.get(sid, None)
+            if item is None:
+                return None
+            if item[0] <= now:
+                self._expire(now)
+                return None
+            return dict(item[1])
+
+    def delete(self, sid):
+        with self.lock:
+            self.sessions.pop(sid, None)
+
+    def revoke(self, alias):
+        with self.lock:
+            rem = [sid for sid, (_, data) in self.sessions.items()
+                   if data.get('alias', None) == alias]
+            for sid in rem:
+                del self.sessions[sid]
+        return len(rem)
+
+    def clear(self):
+        with self.lock:
+            self.sessions.clear()
+
+    def count(self):
+        with self.lock:
+            self._expire(time.time())
+            users = set(data.get('alias', None)
+                        for _, data in self.sessions.values())
+            return len(self.sessions), len(users)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Stores the sessions in a :epkg:`SQLite` database,
+    several processes (hypercorn workers) can share the same file.
+    The expired sessions are removed when a session is created.
+    Every request reads its session, the sessions read from
+    the database are kept in a @see cl SessionCache during
+    *cache_ttl* seconds, a session deleted or revoked by another
+    process is then still accepted by this one during
+    at most *cache_ttl* seconds.
+
+    @param      filename    database
+    @param      ttl         duration of a session in seconds
+    @param      timeout     time (seconds) a process waits for
+                            the database when another one is writing
+    @param      cache_ttl   duration (seconds) a session read from the database
+                            is kept in memory, None or 0 to disable the cache
+    @param      cache_size  maximum number of sessions kept in memory
+    """
+
+    def __init__(self, filename, ttl=14 * 24 * 60 * 60, timeout=5.,
+                 cache_ttl=2., cache_size=10000):
+        SessionStore.__init__(self, ttl)
+        self.filename = filename
+        self.timeout = timeout
+        self.cache = SessionCache(cache_size, cache_ttl) if cache_ttl else None
+        self.lock = threading.Lock()
+        self.con = sqlite3.connect(filename, timeout=timeout,
+                                   check_same_thread=False,
+                                   isolation_level=None)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, "
+            "alias TEXT, data TEXT, expires REAL)")
+        self.con.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            return self.con.execute(sql, params).fetchall()
+
+    def create(self, data):
+        sid = self.new_id()
+        now = time.time()
+        self._execute("DELETE FROM sessions WHERE expires <= ?", (now, ))
+        self._execute("INSERT INTO sessions VALUES (?, ?, ?, ?)",
+                      (sid, data.get('alias', None),
+                       ujson.dumps(data), now + self.ttl))  # pylint: disable=E1101
+        return sid
+
+    def get(self, sid):
+        now = time.time()
+        if self.cache is not None:
+            cached = self.cache.get(sid)
+            if cached is not None and cached[0] > now:
+                return dict(cached[1])
+        rows = self._execute(
+            "SELECT data, expires FROM sessions WHERE sid = ? AND expires > ?",
+            (sid, now))
+        if not rows:
+            return None
+        data = ujson.loads(rows[0][0])  # pylint: disable=E1101
+        if self.cache is not None:
+            self.cache.set(sid, (rows[0][1], data))
+        return dict(data)
+
+    def delete(self, sid):
+        self._execute("DELETE FROM sessions WHERE sid = ?", (sid, ))
+        if self.cache is not None:
+            self.cache.remove(sid)
+
+    def revoke(self, alias):
+        with self.lock:
+            cur = self.con.execute(
+                "DELETE FROM sessions WHERE alias = ?", (alias, ))
+        if self.cache is not None:
+            # the cache is not indexed by alias
+            self.cache.clear()
+        return cur.rowcount
+
+    def clear(self):
+        self._execute("DELETE FROM sessions")
+        if self.cache is not None:
+            self.cache.clear()
+
+    def count(self):
+        rows = self._execute(
+            "SELECT COUNT(*), COUNT(DISTINCT alias) FROM sessions "
+            "WHERE expires > ?", (time.time(), ))
+        return rows[0]
+
+    def close(self):
+        """
+        Closes the connection to the database.
+        """
+        with self.lock:
+            self.con.close()
+
+
+def create_session_store(store, ttl=14 * 24 * 60 * 60):
+    """
+    Creates a session store.
+
+    @param      store   None, a @see cl SessionStore, ``'memory'``
+                        for a @see cl MemorySessionStore or a filename
+                        for a @see cl SQLiteSessionStore
+    @param      ttl     duration of a session in seconds
+    @return             None or a @see cl SessionStore
+    """
+    if store is None or isinstance(store, SessionStore):
+        return store
+    if not isinstance(store, str) or not store:
+        raise ValueError(
+            "Unable to create a session store from {0!r}".format(store))
+    if store == 'memory':
+        return MemorySessionStore(ttl)
+    return SQLiteSessionStore(store, ttl)
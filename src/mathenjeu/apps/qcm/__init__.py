@@ -3,4 +3,5 @@
 @brief Shortcut to *qcm*.
 """
 
+from .game_catalog import GameCatalog
 from .qcm_app import QCMApp
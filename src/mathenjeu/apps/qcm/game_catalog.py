@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Builds the games once and keeps the display of every question.
+"""
+import threading
+
+
+class GameCatalog:
+    """
+    Keeps the games used by @see cl QCMApp. A game is built
+    the first time it is requested (or by @see me precompile)
+    and never again, the context returned by the display
+    for a question is computed once, the following page views
+    only look it up in a dictionary. The games must not be
+    modified once they were built.
+
+    @param      fct_game    function *lambda name:* @see cl ActivityGroup
+    @param      display     display such as @see cl DisplayQuestionChoiceHTML
+    """
+
+    def __init__(self, fct_game, display):
+        self.fct_game = fct_game
+        self.display = display
+        self.games = {}
+        self.contexts = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.games)
+
+    def get_game(self, name):
+        """
+        Returns a game, builds it if it was never requested.
+
+        @param      name    game name
+        @return             game, see @see cl ActivityGroup
+        """
+        game = self.games.get(name, None)
+        if game is None:
+            with self.lock:
+                game = self.games.get(name, None)
+                if game is None:
+                    game = self.fct_game(name)
+                    if isinstance(game, str):
+                        raise RuntimeError(
+                            "obj_game for '{0}' cannot be string".format(name))
+                    self.games[name] = game
+        return game
+
+    def get_context(self, name, qn):
+        """
+        Returns the context the display computes for a question.
+        The question number is converted into an integer,
+        ``'2'`` and ``2`` share the same context, only key
+        *qn* keeps the value received. A question which
+        cannot be displayed is not kept.
+
+        @param      name    game name
+        @param      qn      question number
+        @return             new dictionary
+        """
+        try:
+            key = name, int(qn)
+        except (ValueError, TypeError):
+            return self.display.get_context(self.get_game(name), qn)
+        context = self.contexts.get(key, None)
+        if context is None:
+            context = self.display.get_context(self.get_game(name), key[1])
+            with self.lock:
+                self.contexts[key] = context
+        context = context.copy()
+        context['qn'] = qn
+        return context
+
+    def precompile(self, names):
+        """
+        Builds the games and the context of every question.
+
+        @param      names   game names
+        """
+        for name in names:
+            game = self.get_game(name)
+            for i in range(len(game)):
+                self.get_context(name, i)
+
+    def clear(self):
+        """
+        Removes every game and context.
+        """
+        with self.lock:
+            self.games.clear()
+            self.contexts.clear()
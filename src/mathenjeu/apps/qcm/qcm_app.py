@@ -10,8 +10,10 @@ from starlette.responses import RedirectResponse, PlainTextResponse
 # from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 from starlette.templating import Jinja2Templates
-from ..common import LogApp, AuthentificationAnswers
+import ujson
+from ..common import LogApp, AuthentificationAnswers, collapse_events
 from ..display import DisplayQuestionChoiceHTML
+from .game_catalog import GameCatalog
 from ...tests import get_game
 
 
@@ -43,10 +45,30 @@ class QCMApp(LogApp, AuthentificationAnswers):
                  title="Web Application MathEnJeu", short_title="MathEnJeu",
                  page_doc="http://www.xavierdupre.fr/app/mathenjeu/helpsphinx/",
                  secure=False, display=None, fct_game=None, games=None,
-                 middles=None, debug=False, userpwd=None):
+                 middles=None, debug=False, userpwd=None,
+                 async_log=None, event_sink=None, event_window=None,
+                 event_batch=None, compress_log=None, max_log_size=None,
+                 session_cache_ttl=60., session_store=None,
+                 login_concurrency=None, login_queue=100, login_wait=5.,
+                 precompile_games=False):
         """
         @param      secret_log      to encrypt log (None to ignore)
         @param      folder          folder where to write the logs (None to disable the logging)
+        @param      async_log       writes the logs in a background thread,
+                                    see @see cl LogApp
+        @param      event_sink      logs the events in a binary file,
+                                    see @see cl LogApp
+        @param      event_window    merges the focus events received for the same
+                                    question within this duration (seconds),
+                                    see @see cl EventCoalescer
+        @param      event_batch     None to send every focus event to route
+                                    ``/event`` when it happens, a duration
+                                    in milliseconds to send them in one
+                                    request every *event_batch* milliseconds
+        @param      compress_log    compresses the rotated logs (``'gzip'``, ``'zstd'``),
+                                    see @see cl LogApp
+        @param      max_log_size    rotates the logs when they are bigger (bytes),
+                                    see @see cl LogApp
 
         @param      max_age         cookie's duration in seconds
         @param      cookie_key      to encrypt information in the cookie (cannot be None)
@@ -55,6 +77,17 @@ class QCMApp(LogApp, AuthentificationAnswers):
                                     domain of the web app (its url)
         @param      cookie_path     path of the cookie once storeds
         @param      secure          use secured connection for cookies
+        @param      session_cache_ttl   a session is verified again after this
+                                    duration (seconds), None to verify every request,
+                                    see @see cl AuthentificationAnswers
+        @param      session_store   stores the sessions on the server side,
+                                    ``'memory'`` or a filename (:epkg:`SQLite`),
+                                    see @see cl AuthentificationAnswers
+        @param      login_concurrency   maximum number of logins processed at the same
+                                    time in a pool of threads, None for the default value,
+                                    see @see cl LoginLimiter
+        @param      login_queue     maximum number of waiting logins
+        @param      login_wait      maximum time (seconds) a login waits
 
         @param      title           title
         @param      short_title     short application title
@@ -63,6 +96,9 @@ class QCMApp(LogApp, AuthentificationAnswers):
         @param      fct_game        function *lambda name:* @see cl ActivityGroup
         @param      games           defines which games is available as a dictionary
                                     ``{ game_id: (game name, first page id) }``
+        @param      precompile_games    builds the games and the display of every question
+                                    when the application starts, otherwise a game is built
+                                    the first time it is requested, see @see cl GameCatalog
         @param      middles         middles ware, list of couple ``[(class, **kwargs)]``
                                     where *kwargs* are the parameter constructor
         @param      userpwd         users are authentified with any alias but a common password
@@ -98,16 +134,25 @@ class QCMApp(LogApp, AuthentificationAnswers):
                                          notauth_page=notauth_page, redirect_logout=redirect_logout,
                                          max_age=max_age, cookie_name=cookie_name, cookie_key=cookie_key,
                                          cookie_domain=cookie_domain, cookie_path=cookie_path,
-                                         page_context=self.page_context, userpwd=userpwd)
+                                         page_context=self.page_context, userpwd=userpwd,
+                                         session_cache_ttl=session_cache_ttl,
+                                         session_store=session_store,
+                                         login_concurrency=login_concurrency,
+                                         login_queue=login_queue, login_wait=login_wait)
         LogApp.__init__(self, folder=folder, secret_log=secret_log,
-                        fct_session=self.get_session)
+                        fct_session=self.get_session, async_log=async_log,
+                        event_sink=event_sink, event_window=event_window,
+                        compress_log=compress_log, max_log_size=max_log_size)
 
+        self.event_batch = event_batch
         self.title = title
         self.short_title = short_title
         self.page_doc = page_doc
         self.display = display
-        self.get_game = fct_game
+        self.catalog = GameCatalog(fct_game, display)
+        self.get_game = self.catalog.get_game
         self.games = games
+        self.precompile_games = precompile_games
         self.templates = Jinja2Templates(directory=templates)
 
         if middles is not None:
@@ -122,6 +167,7 @@ class QCMApp(LogApp, AuthentificationAnswers):
         app.add_route('/logout', self.logout)
         app.add_route('/error', self.on_error)
         app.add_route('/authenticate', self.authenticate, methods=['POST'])
+        app.add_route('/login_metrics', self.login_metrics)
         app.add_route('/answer', self.answer, methods=['POST', 'GET'])
         app.add_exception_handler(404, self.not_found)
         app.add_exception_handler(500, self.server_error)
@@ -155,12 +201,15 @@ class QCMApp(LogApp, AuthentificationAnswers):
         Startups.
         """
         self.info('[QCMApp] startup', None)
+        if self.precompile_games:
+            self.catalog.precompile(self.games)
 
     def cleanup(self):
         """
         Cleans up.
         """
         self.info('[QCMApp] cleanup', None)
+        self.close_log()
 
     def unlogged_response(self, request, session):
         """
@@ -233,21 +282,18 @@ class QCMApp(LogApp, AuthentificationAnswers):
             game = request.query_params.get('game', None)
             if game is None:
                 return self.unknown_game(request, session)
-            obj_game = self.get_game(game)
-            self.info('[QCMApp] qcm.1', str(obj_game))
-            if isinstance(obj_game, str):
-                raise RuntimeError(
-                    "obj_game for '{0}' cannot be string".format(game))
+            self.info('[QCMApp] qcm.1', game)
             qn = request.query_params.get('qn', 0)
             data = dict(game=game, qn=qn)
             events = request.query_params.get('events', None)
             if events:
                 data['events'] = events
             self.log_event("qcm", request, session=session, **data)
-            disp = self.display
-            context = disp.get_context(obj_game, qn)
+            context = self.catalog.get_context(game, qn)
             context.update(session)
             context['game'] = game
+            if self.event_batch:
+                context['event_batch'] = int(self.event_batch)
             if events:
                 context['events'] = events
             context_req = {'request': request}
@@ -298,10 +344,43 @@ class QCMApp(LogApp, AuthentificationAnswers):
     async def event(self, request):
         """
         This route does not return anything interesting except
-        a blank page, but it logs
+        a blank page, but it logs. The focus events are merged
+        if parameter *event_window* was specified. A *POST* request
+        may contain many events sent at once by the page (parameter
+        *event_batch*), the body is ``{"events": [{...}, {...}]}``,
+        they are logged in one record.
         """
         session = self.get_session(request, notnone=True)
+        if request.method == 'POST':
+            body = await request.body()
+            if body:
+                return self.event_batch_answer(request, session, body)
         ps = request.query_params
         tostr = ','.join('{0}:{1}'.format(k, v) for k, v in sorted(ps.items()))
-        self.log_event("event", request, session=session, events=[tostr])
+        key = (session.get('alias', None), ps.get('game', None),
+               ps.get('qn', None))
+        self.log_coalesced_event("event", request, key, tostr, session=session)
+        return PlainTextResponse("")
+
+    def event_batch_answer(self, request, session, body):
+        """
+        Logs the events sent at once by a page.
+
+        @param      request         request
+        @param      session         session
+        @param      body            body of the request
+        @return                     response
+        """
+        try:
+            events = ujson.loads(body)['events']  # pylint: disable=E1101
+            if not isinstance(events, list) or len(events) > 10000:
+                raise ValueError("events must be a list")
+            tostr = [','.join('{0}:{1}'.format(k, v)
+                              for k, v in sorted(ev.items()))
+                     for ev in events]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return PlainTextResponse("", status_code=400)
+        if tostr:
+            self.log_event("event", request, session=session,
+                           events=collapse_events(tostr), count=len(tostr))
         return PlainTextResponse("")
@@ -36,10 +36,22 @@ class StaticApp(LogApp, AuthentificationAnswers):
                  content=None,
                  title="MathEnJeu - Static Files", short_title="MEJ",
                  page_doc="http://www.xavierdupre.fr/app/mathenjeu/helpsphinx/",
-                 secure=False, middles=None, debug=False, userpwd=None):
+                 secure=False, middles=None, debug=False, userpwd=None,
+                 async_log=None, event_sink=None, compress_log=None,
+                 max_log_size=None, session_cache_ttl=60.,
+                 session_store=None,
+                 login_concurrency=None, login_queue=100, login_wait=5.):
         """
         @param      secret_log      to encrypt log (None to ignore)
         @param      folder          folder where to write the logs (None to disable the logging)
+        @param      async_log       writes the logs in a background thread,
+                                    see @see cl LogApp
+        @param      event_sink      logs the events in a binary file,
+                                    see @see cl LogApp
+        @param      compress_log    compresses the rotated logs (``'gzip'``, ``'zstd'``),
+                                    see @see cl LogApp
+        @param      max_log_size    rotates the logs when they are bigger (bytes),
+                                    see @see cl LogApp
 
         @param      max_age         cookie's duration in seconds
         @param      cookie_key      to encrypt information in the cookie (cannot be None)
@@ -48,6 +60,17 @@ class StaticApp(LogApp, AuthentificationAnswers):
                                     domain of the web app (its url)
         @param      cookie_path     path of the cookie once storeds
         @param      secure          use secured connection for cookies
+        @param      session_cache_ttl   a session is verified again after this
+                                    duration (seconds), None to verify every request,
+                                    see @see cl AuthentificationAnswers
+        @param      session_store   stores the sessions on the server side,
+                                    ``'memory'`` or a filename (:epkg:`SQLite`),
+                                    see @see cl AuthentificationAnswers
+        @param      login_concurrency   maximum number of logins processed at the same
+                                    time in a pool of threads, None for the default value,
+                                    see @see cl LoginLimiter
+        @param      login_queue     maximum number of waiting logins
+        @param      login_wait      maximum time (seconds) a login waits
         @param      content         list tuple ``route, folder`` to server
 
         @param      title           title
@@ -80,9 +103,15 @@ class StaticApp(LogApp, AuthentificationAnswers):
                                          notauth_page=notauth_page, redirect_logout=redirect_logout,
                                          max_age=max_age, cookie_name=cookie_name, cookie_key=cookie_key,
                                          cookie_domain=cookie_domain, cookie_path=cookie_path,
-                                         page_context=self.page_context, userpwd=userpwd)
+                                         page_context=self.page_context, userpwd=userpwd,
+                                         session_cache_ttl=session_cache_ttl,
+                                         session_store=session_store,
+                                         login_concurrency=login_concurrency,
+                                         login_queue=login_queue, login_wait=login_wait)
         LogApp.__init__(self, folder=folder, secret_log=secret_log,
-                        fct_session=self.get_session)
+                        fct_session=self.get_session, async_log=async_log,
+                        event_sink=event_sink, compress_log=compress_log,
+                        max_log_size=max_log_size)
 
         self.title = title
         self.short_title = short_title
@@ -102,6 +131,7 @@ class StaticApp(LogApp, AuthentificationAnswers):
         app.add_route('/logout', self.logout)
         app.add_route('/error', self.on_error)
         app.add_route('/authenticate', self.authenticate, methods=['POST'])
+        app.add_route('/login_metrics', self.login_metrics)
         app.add_exception_handler(404, self.not_found)
         app.add_exception_handler(500, self.server_error)
         app.add_route('/', self.main)
@@ -186,6 +216,7 @@ class StaticApp(LogApp, AuthentificationAnswers):
         Cleans up.
         """
         self.info('[StaticApp] cleanup', None)
+        self.close_log()
 
     def unlogged_response(self, request, session):
         """
@@ -26,7 +26,10 @@ def create_qcm_local_app(
                "simple_french_qcm,simple_french_qcm,0;"
                "ml_french_qcm,ml_french_qcm,0"),
         port=8868, middles=None, start=False,
-        userpwd=None, debug=False, fLOG=print):
+        userpwd=None, debug=False, async_log=False, event_sink=False,
+        event_window=None, event_batch=None, compress_log=None,
+        max_log_size=None, session_store=None, login_concurrency=None,
+        fLOG=print):
     """
     Creates a local web-application with very simple authentification.
 
@@ -53,6 +56,26 @@ def create_qcm_local_app(
     :param start: starts the application with :epkg:`uvicorn`
     :param userpwd: users are authentified with any alias but a common password
     :param debug: display debug information (:epkg:`starlette` option)
+    :param async_log: writes the logs in a background thread
+        (see @see cl BatchLogWriter)
+    :param event_sink: logs the events in a binary file
+        (see @see cl EventSink), True or ``'only'``
+    :param event_window: merges the focus events received for the same
+        question within this duration in seconds (see @see cl EventCoalescer)
+    :param event_batch: the pages send the focus events every
+        *event_batch* milliseconds in one request
+    :param compress_log: compresses the rotated logs, ``'gzip'`` or ``'zstd'``
+        (see @see cl CompressedRotatingFileHandler)
+    :param max_log_size: rotates the logs when they are bigger
+        than this size in bytes
+    :param session_store: stores the sessions on the server side,
+        the cookie only contains a session id, ``'memory'``
+        or a filename for a :epkg:`SQLite` database
+        (see @see cl SQLiteSessionStore)
+    :param login_concurrency: maximum number of logins processed
+        at the same time in a pool of threads, the others wait
+        (see @see cl LoginLimiter), None for the default value, the counters are returned
+        by route ``/login_metrics`` to logged users
     :param fLOG: logging function
     :return: @see cl QCMApp
 
@@ -82,7 +105,12 @@ def create_qcm_local_app(
                  cookie_domain=cookie_domain, cookie_path=cookie_path,
                  title=title, short_title=short_title,
                  secure=secure, display=display, fct_game=fct_game,
-                 games=games, page_doc=page_doc, userpwd=userpwd)
+                 games=games, page_doc=page_doc, userpwd=userpwd,
+                 async_log=async_log, event_sink=event_sink,
+                 event_window=event_window, event_batch=event_batch,
+                 compress_log=compress_log, max_log_size=max_log_size,
+                 session_store=session_store,
+                 login_concurrency=login_concurrency)
     if start:
         if fLOG:
             fLOG(
@@ -91,7 +119,7 @@ def create_qcm_local_app(
     return app
 
 
-def create_qcm_https_app(
+def create_qcm_https_app(  # pylint: disable=R0913,R0914
         # log parameters
         secret_log=None,
         folder='.',
@@ -107,7 +135,9 @@ def create_qcm_https_app(
                "simple_french_qcm,simple_french_qcm,0;"
                "ml_french_qcm,ml_french_qcm,0"),
         port=8868, middles=None, start=False,
-        userpwd=None, debug=False,
+        userpwd=None, debug=False, async_log=False, event_sink=False,
+        event_window=None, event_batch=None, compress_log=None,
+        max_log_size=None, session_store=None, login_concurrency=None,
         # hypercorn parameters
         access_log="-",
         access_log_format="%(h)s %(r)s %(s)s %(b)s %(D)s",
@@ -139,6 +169,26 @@ def create_qcm_https_app(
     :param start: starts the application with :epkg:`uvicorn`
     :param userpwd: users are authentified with any alias but a common password
     :param debug: display debug information (:epkg:`starlette` option)
+    :param async_log: writes the logs in a background thread
+        (see @see cl BatchLogWriter)
+    :param event_sink: logs the events in a binary file
+        (see @see cl EventSink), True or ``'only'``
+    :param event_window: merges the focus events received for the same
+        question within this duration in seconds (see @see cl EventCoalescer)
+    :param event_batch: the pages send the focus events every
+        *event_batch* milliseconds in one request
+    :param compress_log: compresses the rotated logs, ``'gzip'`` or ``'zstd'``
+        (see @see cl CompressedRotatingFileHandler)
+    :param max_log_size: rotates the logs when they are bigger
+        than this size in bytes
+    :param session_store: stores the sessions on the server side,
+        the cookie only contains a session id, ``'memory'``
+        or a filename for a :epkg:`SQLite` database
+        (see @see cl SQLiteSessionStore)
+    :param login_concurrency: maximum number of logins processed
+        at the same time in a pool of threads, the others wait
+        (see @see cl LoginLimiter), None for the default value, the counters are returned
+        by route ``/login_metrics`` to logged users
 
     :param access_log: The target location for the access log, use - for stdout.
     :param access_log_format: The log format for the access log, see help docs,
@@ -182,7 +232,11 @@ def create_qcm_https_app(
                   cookie_domain=cookie_domain, cookie_path=cookie_path,
                   title=title, short_title=short_title,
                   secure=secure, display=display, debug=debug,
-                  page_doc=page_doc, userpwd=userpwd)
+                  page_doc=page_doc, userpwd=userpwd, async_log=async_log,
+                  event_sink=event_sink, event_window=event_window,
+                  event_batch=event_batch, compress_log=compress_log,
+                  max_log_size=max_log_size, session_store=session_store,
+                  login_concurrency=login_concurrency)
     app = QCMApp(games=games, fct_game=fct_game, **kwargs)
     if app.app is None:
         raise RuntimeError(  # pragma: no cover
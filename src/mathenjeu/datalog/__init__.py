@@ -4,4 +4,23 @@
 @brief Shortcut to *datalog*.
 """
 
-from .qcmlog import enumerate_qcmlog, enumerate_qcmlogdf
+from .aggregation import aggregate_notnan
+from .anonymize import PersonIdHasher
+from .benchmark import benchmark_qcmlog
+from .binlog import enumerate_binlog_records, is_binlog
+from .export import export_qcmlog, read_qcmlog_store, qcmlog_observation_records
+from .follow import enumerate_qcmlog_follow, enumerate_followed_lines
+from .lineparser import parse_qcmlog_line, QCMLogLineParser, filter_qcmlog_lines
+from .logindex import QCMLogIndex, build_qcmlog_index
+from .logreader import (
+    enumerate_log_lines, split_log_files, log_compression, open_log_file,
+    log_segment_key)
+from .parallel import enumerate_parsed_shards
+from .qcmlog import (
+    enumerate_qcmlog, enumerate_qcmlogdf, enumerate_qcmlog_parsed)
+from .qstats import QuestionStats, QuantileSketch, qcmlog_question_stats
+from .records import FieldKey, QCMObservation, field_key
+from .synthetic import (
+    enumerate_synthetic_qcmlog_lines, write_synthetic_qcmlog)
+from .timeparse import parse_log_time, parse_log_times
+from .widedf import qcmlog_wide_dataframe
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Vectorized aggregation of the answers extracted from the logs.
+"""
+import numpy
+import pandas
+
+
+def _agg_numeric(values, codes, ngroups):
+    """
+    Aggregates a numerical column: sum of the values which are not nan,
+    nan for a group without any value.
+    """
+    if values.dtype.kind == 'f':
+        valid = ~numpy.isnan(values)
+        values = values[valid]
+        codes = codes[valid]
+    count = numpy.bincount(codes, minlength=ngroups)
+    if values.dtype.kind in 'iu':
+        sums = numpy.zeros(ngroups, dtype=numpy.int64)
+        numpy.add.at(sums, codes, values)
+        if count.min() > 0:
+            return sums
+        sums = sums.astype(numpy.float64)
+    else:
+        # bincount returns integers if there is no value
+        sums = numpy.bincount(codes, weights=values, minlength=ngroups).astype(
+            numpy.float64, copy=False)
+    sums[count == 0] = numpy.nan
+    return sums
+
+
+def _agg_timedelta(values, codes, ngroups):
+    """
+    Aggregates a column of durations. The previous implementation
+    (*sum* starting from 0) fails for more than one duration and returns 0,
+    the function keeps the same result.
+    """
+    valid = ~numpy.isnat(values)
+    count = numpy.bincount(codes[valid], minlength=ngroups)
+    if count.max() <= 1:
+        res = numpy.full(ngroups, numpy.timedelta64('NaT'), dtype=values.dtype)
+        res[codes[valid]] = values[valid]
+        return res
+    res = numpy.full(ngroups, numpy.nan, dtype=object)
+    pos = numpy.where(valid)[0]
+    single = count[codes[pos]] == 1
+    for i in pos[single]:
+        res[codes[i]] = pandas.Timedelta(values[i])
+    res[count > 1] = 0
+    return res
+
+
+def _agg_object(values, codes, ngroups):
+    """
+    Aggregates a column of any type. Values 'ok', 'on' become 1,
+    'skip' becomes 1000. The result of a group is the concatenation
+    of its values if the first one is a string, the sum otherwise
+    (0 if the sum fails, the value itself if it is alone),
+    nan for a group without any value.
+    """
+    valid = ~pandas.isnull(values)
+    values = values[valid]
+    codes = codes[valid]
+    res = numpy.full(ngroups, numpy.nan, dtype=object)
+    if values.shape[0] == 0:
+        return res
+    values = values.copy()
+    values[(values == 'ok') | (values == 'on')] = 1
+    values[values == 'skip'] = 1000
+
+    order = numpy.argsort(codes, kind='stable')
+    codes = codes[order]
+    values = values[order]
+    count = numpy.bincount(codes, minlength=ngroups)
+    ends = numpy.cumsum(count)
+    starts = ends - count
+    filled = numpy.where(count > 0)[0]
+
+    is_str = numpy.fromiter((isinstance(v, str) for v in values),
+                            dtype=bool, count=values.shape[0])
+    is_num = numpy.fromiter(
+        (isinstance(v, (int, float, numpy.number)) and not isinstance(v, bool)
+         for v in values), dtype=bool, count=values.shape[0])
+
+    # alone values
+    single = filled[count[filled] == 1]
+    first = starts[single]
+    res[single] = values[first]
+
+    multi = filled[count[filled] > 1]
+    if multi.shape[0] == 0:
+        return res
+    first_str = is_str[starts[multi]]
+
+    # concatenation
+    for g in multi[first_str]:
+        res[g] = ",".join(str(v) for v in values[starts[g]:ends[g]])
+
+    # sums
+    num_groups = multi[~first_str]
+    if num_groups.shape[0] > 0:
+        nb_num = numpy.bincount(codes[is_num], minlength=ngroups)
+        all_num = nb_num[num_groups] == count[num_groups]
+        num_values = numpy.where(is_num, values, 0).astype(numpy.float64)
+        sums = numpy.bincount(codes, weights=num_values, minlength=ngroups)
+        is_float = numpy.fromiter(
+            (isinstance(v, (float, numpy.floating)) for v in values),
+            dtype=bool, count=values.shape[0])
+        nb_float = numpy.bincount(codes[is_float], minlength=ngroups)
+        for g, ok in zip(num_groups, all_num):
+            if not ok:
+                # strings, durations... cannot be added to numbers
+                res[g] = _sum_or_zero(values[starts[g]:ends[g]])
+            elif nb_float[g] > 0:
+                res[g] = sums[g]
+            else:
+                res[g] = int(sums[g])
+    return res
+
+
+def _sum_or_zero(values):
+    """
+    Returns the sum of the values or 0 if they cannot be added.
+    """
+    try:
+        return sum(values)
+    except TypeError:
+        return 0
+
+
+def aggregate_notnan(df, by='person_id'):
+    """
+    Aggregates a dataframe by *by* and returns the same result
+    as ``df.groupby(by).agg(_aggnotnan)`` (see @see fn enumerate_qcmlogdf)
+    but with :epkg:`numpy` reductions chosen based on the column type
+    instead of a loop on every value.
+    For every group and every column, missing values are ignored,
+    'ok' and 'on' become 1, 'skip' becomes 1000, strings are concatenated,
+    numbers are summed, a group without any value gets nan.
+
+    :param df: dataframe
+    :param by: column to group by
+    :return: dataframe indexed by the distinct values of *by*
+    """
+    codes, uniques = pandas.factorize(df[by], sort=True)
+    keep = codes >= 0
+    codes = codes[keep]
+    ngroups = len(uniques)
+    index = pandas.Index(uniques, name=by)
+    res = {}
+    for col in df.columns:
+        if col == by:
+            continue
+        series = df[col]
+        kind = series.dtype.kind
+        values = series.to_numpy()[keep]
+        if kind in 'iuf':
+            agg = _agg_numeric(values, codes, ngroups)
+        elif kind == 'm':
+            agg = _agg_timedelta(values, codes, ngroups)
+        else:
+            agg = _agg_object(values.astype(object), codes, ngroups)
+        if agg.dtype == object:
+            agg = pandas.Series(list(agg), index=index, name=col)
+        else:
+            agg = pandas.Series(agg, index=index, name=col)
+        res[col] = agg
+    return pandas.DataFrame(res, index=index)
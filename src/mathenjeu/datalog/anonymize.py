@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Computes the anonymized identifier of a person
+found in the logs produced by application @see cl QCMApp.
+"""
+import hashlib
+import hmac
+from functools import lru_cache
+
+
+def _hash4alias(st):
+    by = st.encode("utf-8")
+    m = hashlib.sha256()
+    m.update(by)
+    res = m.hexdigest()
+    return res[:20] if len(res) > 20 else res
+
+
+class PersonIdHasher:
+    """
+    Computes the identifier of a person from its alias
+    and its IP address (first 20 characters of a :epkg:`sha256`).
+    A class only has a few hundred distinct pairs, the identifiers
+    are memoized in a bounded cache (least recently used pairs
+    are removed first), the same instance can be used to process
+    many files. If *key* is specified, the identifier is a keyed hash
+    (:epkg:`HMAC`) and cannot be recomputed without the key.
+
+    :param key: secret key (bytes or str), None for a simple hash
+    :param maxsize: maximum number of pairs kept in the cache
+
+    ::
+
+        from mathenjeu.datalog import enumerate_qcmlog, PersonIdHasher
+
+        hasher = PersonIdHasher(key="secret")
+        obs = list(enumerate_qcmlog(["QCMApp.log"], hasher=hasher))
+        print(hasher.cache_info())
+    """
+
+    def __init__(self, key=None, maxsize=4096):
+        if isinstance(key, str):
+            key = key.encode("utf-8")
+        self.key = key
+        self.maxsize = maxsize
+        self._cached = lru_cache(maxsize=maxsize)(self._compute)
+
+    def __getstate__(self):
+        # the cache is not sent to the processes parsing the logs
+        return dict(key=self.key, maxsize=self.maxsize)
+
+    def __setstate__(self, state):
+        self.__init__(state['key'], state['maxsize'])
+
+    def _compute(self, alias, ipadd):
+        st = alias + ipadd
+        if self.key is None:
+            return _hash4alias(st)
+        res = hmac.new(self.key, st.encode("utf-8"),
+                       hashlib.sha256).hexdigest()
+        return res[:20]
+
+    def __call__(self, alias, ipadd):
+        """
+        Returns the identifier of a person.
+
+        :param alias: alias
+        :param ipadd: IP address
+        :return: string
+        """
+        return self._cached(alias, ipadd)
+
+    def cache_info(self):
+        """
+        Returns the statistics of the cache
+        (see :epkg:`functools.lru_cache`).
+        """
+        return self._cached.cache_info()
+
+    def cache_clear(self):
+        """
+        Empties the cache.
+        """
+        self._cached.cache_clear()
+
+
+#: Hasher used when no other one is specified,
+#: the cache is shared by every call.
+_default_hasher = PersonIdHasher()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Measures the time and the memory needed to process
+synthetic logs (see @see fn write_synthetic_qcmlog).
+"""
+import os
+import sys
+import multiprocessing
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+import pandas
+from .lineparser import QCMLogLineParser
+from .qcmlog import enumerate_qcmlog, enumerate_qcmlogdf
+from .qstats import qcmlog_question_stats
+from .synthetic import SYNTHETIC_GAMES, write_synthetic_qcmlog, _get_games
+
+#: Steps measured by @see fn benchmark_qcmlog.
+BENCHMARK_STEPS = ('enumerate_qcmlog', 'enumerate_qcmlogdf',
+                   'consolidate', 'question_stats')
+
+
+def _peak_rss():
+    """
+    Returns the peak resident memory of the current process
+    in megabytes, *nan* if it is not available (Windows).
+    """
+    try:
+        import resource  # pylint: disable=C0415
+    except ImportError:  # pragma: no cover
+        return float('nan')
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 2 ** 10
+
+
+def _run_step(step, name, games, n_jobs=1):
+    """
+    Runs one step on one file, this function is executed
+    in a new process when the steps are isolated.
+
+    :param step: one of *BENCHMARK_STEPS*
+    :param name: filename
+    :param games: list of game names
+    :param n_jobs: see @see fn enumerate_qcmlog
+    :return: number of produced rows, processing time, peak memory
+    """
+    games = _get_games(games)
+    expected = []
+    for game in games:
+        expected.extend(game.expected_answers())
+    parser = QCMLogLineParser(errors='skip')
+    begin = perf_counter()
+    if step == 'enumerate_qcmlog':
+        nb = sum(1 for _ in enumerate_qcmlog(
+            [name], expected, n_jobs=n_jobs, parser=parser))
+    elif step == 'enumerate_qcmlogdf':
+        nb = sum(df.shape[0] for df in enumerate_qcmlogdf(
+            [name], expected, n_jobs=n_jobs, parser=parser))
+    elif step == 'consolidate':
+        nb = sum(df.shape[0] for df in enumerate_qcmlogdf(
+            [name], n_jobs=n_jobs, parser=parser, games=games,
+            consolidate=True))
+    elif step == 'question_stats':
+        nb = qcmlog_question_stats(enumerate_qcmlog(
+            [name], expected, n_jobs=n_jobs, parser=parser)).shape[0]
+    else:
+        raise ValueError("Unknown step '{0}', expecting one of {1}".format(
+            step, BENCHMARK_STEPS))
+    return nb, perf_counter() - begin, _peak_rss()
+
+
+def benchmark_qcmlog(sizes=(10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7), steps=None,
+                     games=None, folder=None, n_jobs=1, isolate=True,
+                     seed=0, fLOG=None):
+    """
+    Generates synthetic logs of every size
+    (see @see fn write_synthetic_qcmlog) and measures the processing
+    time and the peak memory of every step:
+
+    * ``'enumerate_qcmlog'``: observations returned by
+      @see fn enumerate_qcmlog,
+    * ``'enumerate_qcmlogdf'``: one dataframe per student
+      (see @see fn enumerate_qcmlogdf),
+    * ``'consolidate'``: one dataframe for all students
+      (see @see fn qcmlog_wide_dataframe),
+    * ``'question_stats'``: statistics per question
+      (see @see fn qcmlog_question_stats).
+
+    The lines which cannot be parsed are skipped.
+    The peak memory of a process never decreases, every step
+    is run in a new process if *isolate* is True,
+    otherwise the measure is the peak memory of the current process.
+
+    :param sizes: numbers of lines
+    :param steps: steps to measure, None for all (*BENCHMARK_STEPS*)
+    :param games: names of the games, None for *SYNTHETIC_GAMES*
+    :param folder: folder receiving the logs, they are kept,
+        None for a temporary folder removed at the end
+    :param n_jobs: number of processes parsing the logs,
+        see @see fn enumerate_qcmlog
+    :param isolate: runs every step in a new process
+    :param seed: random seed, see @see fn enumerate_synthetic_qcmlog_lines
+    :param fLOG: logging function
+    :return: dataframe, one row per size and step, columns *step*,
+        *lines*, *bytes*, *rows* (number of produced rows),
+        *time* (seconds), *lines_per_s*, *mb_per_s*,
+        *peak_rss* (megabytes), *generation* (time to generate the logs)
+
+    ::
+
+        from mathenjeu.datalog.benchmark import benchmark_qcmlog
+
+        df = benchmark_qcmlog(sizes=[10000, 100000])
+        print(df)
+    """
+    if steps is None:
+        steps = BENCHMARK_STEPS
+    for step in steps:
+        if step not in BENCHMARK_STEPS:
+            raise ValueError("Unknown step '{0}', expecting one of {1}".format(
+                step, BENCHMARK_STEPS))
+    if games is None:
+        games = SYNTHETIC_GAMES
+    games = list(games)
+    temp = folder is None
+    if temp:
+        folder = tempfile.mkdtemp()
+    rows = []
+    try:
+        for size in sizes:
+            name = os.path.join(folder, "QCMApp-{0}.log".format(size))
+            begin = perf_counter()
+            write_synthetic_qcmlog(name, nb_lines=size, games=games, seed=seed)
+            generation = perf_counter() - begin
+            nbytes = os.stat(name).st_size
+            if fLOG:
+                fLOG("[benchmark_qcmlog] generated {0} lines, {1} bytes "
+                     "in {2:1.2f}s".format(size, nbytes, generation))
+            for step in steps:
+                if isolate:
+                    # a new process for every measure
+                    ctx = multiprocessing.get_context('spawn')
+                    with ProcessPoolExecutor(max_workers=1,
+                                             mp_context=ctx) as executor:
+                        nb, duration, rss = executor.submit(
+                            _run_step, step, name, games, n_jobs).result()
+                else:
+                    nb, duration, rss = _run_step(step, name, games, n_jobs)
+                rows.append(dict(
+                    step=step, lines=size, bytes=nbytes, rows=nb,
+                    time=duration, lines_per_s=size / duration,
+                    mb_per_s=nbytes / 2 ** 20 / duration, peak_rss=rss,
+                    generation=generation))
+                if fLOG:
+                    fLOG("[benchmark_qcmlog] {0} {1} lines: {2:1.2f}s, "
+                         "peak_rss={3:1.1f}Mb".format(step, size, duration, rss))
+            if temp:
+                os.remove(name)
+    finally:
+        if temp:
+            shutil.rmtree(folder, ignore_errors=True)
+    return pandas.DataFrame(rows, columns=[
+        'step', 'lines', 'bytes', 'rows', 'time', 'lines_per_s',
+        'mb_per_s', 'peak_rss', 'generation'])
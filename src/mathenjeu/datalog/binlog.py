@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Reads the binary events written by @see cl EventSink.
+"""
+import struct
+from datetime import datetime, timedelta
+from .formats import EVENT_EXT, EVENT_SCHEMA
+
+_header = struct.Struct("<I")
+
+
+def is_binlog(name):
+    """
+    Tells if a file was written by @see cl EventSink.
+    """
+    return name.endswith(EVENT_EXT)
+
+
+def _record2dict(record):
+    """
+    Converts a record into the dictionary @see fn parse_qcmlog_line
+    returns for the same event logged as text.
+    """
+    created, msg, alias, client, game, qn, data, events, extra = record
+    res = dict(msg=msg, session=None if alias is None else dict(alias=alias),
+               client=client)
+    if game is not None:
+        res['game'] = game
+    if qn is not None:
+        res['qn'] = qn
+    if data is not None:
+        res['data'] = data
+    if events is not None:
+        res['events'] = events
+    if extra:
+        res.update(extra)
+    # same precision as the text logs
+    sec = int(created)
+    res['time'] = datetime.fromtimestamp(sec) + timedelta(
+        milliseconds=int((created - sec) * 1000))
+    return res
+
+
+def enumerate_binlog_records(name, chunk_size=2 ** 20, raw=False):
+    """
+    Reads a file written by @see cl EventSink by chunks
+    and yields every complete record, a record being written
+    at the end of the file is ignored.
+
+    :param name: filename
+    :param chunk_size: number of bytes read at once
+    :param raw: returns the records as lists
+        (see *EVENT_SCHEMA*) and not as dictionaries
+    :return: iterator on dictionaries, same format as
+        @see fn parse_qcmlog_line
+    """
+    import msgpack  # pylint: disable=C0415
+    size = len(EVENT_SCHEMA)
+    tail = b''
+    with open(name, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buf = tail + chunk
+            pos = 0
+            end = len(buf)
+            while pos + 4 <= end:
+                length = _header.unpack_from(buf, pos)[0]
+                if pos + 4 + length > end:
+                    break
+                record = msgpack.unpackb(buf[pos + 4:pos + 4 + length],
+                                         raw=False)
+                if not isinstance(record, list) or len(record) != size:
+                    raise ValueError(
+                        "Unexpected record at position {0} in '{1}'".format(
+                            f.tell() - end + pos, name))
+                pos += 4 + length
+                yield record if raw else _record2dict(record)
+            tail = buf[pos:]
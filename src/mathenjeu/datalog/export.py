@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Exports the observations extracted from the logs produced by
+application @see cl QCMApp into a columnar store
+(:epkg:`parquet` files partitioned by day and by game).
+"""
+import os
+import pickle
+import shutil
+from datetime import timedelta
+import pandas
+from .logreader import (
+    enumerate_log_lines, open_log_file, _complete_size, log_compression)
+from .lineparser import parse_qcmlog_line
+from .qcmlog import enumerate_qcmlog_parsed
+
+STORE_COLUMNS = ['person_id', 'alias', 'time', 'qtime', 'game', 'qn',
+                 'field', 'value', 'number']
+STATE_FILE = "_qcmlog_state.pkl"
+STAGING_FOLDER = "_staging"
+HEAD_SIZE = 256
+
+
+def _value2str(v):
+    if v is None:
+        return None
+    if isinstance(v, timedelta):
+        return str(v.total_seconds())
+    return str(v)
+
+
+def _value2number(v):
+    if isinstance(v, timedelta):
+        return v.total_seconds()
+    if isinstance(v, (int, float)):
+        return float(v)
+    return None
+
+
+def qcmlog_observation_records(obs):
+    """
+    Converts one observation produced by @see fn enumerate_qcmlog
+    into rows with a fixed schema *STORE_COLUMNS*. Every field
+    ``<game>-<qn>-<field>`` or any other field becomes one row
+    ``(field, value, number)``, *value* is the value converted
+    into a string, *number* is the same value as a float
+    if it is a number (*good*, *nbvisit*), a duration is converted
+    into seconds, it is null for any other value.
+    An observation without any field becomes one row with
+    null *field*, *value* and *number*.
+
+    :param obs: dictionary
+    :return: list of tuples
+    """
+    game = obs.get('game', None)
+    qn = obs.get('qn', None)
+    if qn is not None:
+        qn = str(qn)
+    base = (obs.get('person_id', None), obs.get('alias', None),
+            obs['time'], obs.get('qtime', None), game, qn)
+    prefix = None if game is None or qn is None else "{0}-{1}-".format(
+        game, qn)
+    res = []
+    for k, v in obs.items():
+        if k in {'person_id', 'alias', 'time', 'qtime', 'game', 'qn'}:
+            continue
+        if prefix is not None and k.startswith(prefix):
+            k = k[len(prefix):]
+        res.append(base + (k, _value2str(v), _value2number(v)))
+    if len(res) == 0:
+        res.append(base + (None, None, None))
+    return res
+
+
+def _read_head(name, size=HEAD_SIZE):
+    """
+    Returns the first bytes of a file (decompressed), they identify
+    a segment after it was renamed or compressed.
+    """
+    with open_log_file(name) as f:
+        return f.read(size)
+
+
+def _same_file(position, head):
+    """
+    Tells if the file starting with *head* is the one
+    *position* was stored for, its first bytes were stored
+    when it was smaller (None for a state written by an older version).
+    """
+    return len(position) < 3 or head.startswith(position[2])
+
+
+def _prune_cache(cache, last_key, max_age):
+    """
+    Removes the questions (keys of *cache*) without any event
+    in the last *max_age* before the last event,
+    except the one in *last_key*.
+
+    :return: number of removed questions
+    """
+    ends = [events[-1][0] for events in cache.values() if events]
+    if not ends:
+        return 0
+    limit = max(ends) - max_age
+    old = [key for key, events in cache.items()
+           if (not events or events[-1][0] < limit) and key not in last_key]
+    for key in old:
+        del cache[key]
+    return len(old)
+
+
+def _load_state(folder):
+    name = os.path.join(folder, STATE_FILE)
+    if not os.path.exists(name):
+        return dict(files={}, cache={}, last_key=[], staged=[])
+    with open(name, "rb") as f:
+        state = pickle.load(f)
+    state.setdefault('staged', [])
+    return state
+
+
+def _save_state(folder, state):
+    name = os.path.join(folder, STATE_FILE)
+    tmp = name + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f)
+    os.replace(tmp, name)
+
+
+def _write_records(folder, records):
+    df = pandas.DataFrame(records, columns=STORE_COLUMNS)
+    df['number'] = df['number'].astype(float)
+    df['day'] = df['time'].dt.strftime('%Y-%m-%d')
+    df['game'] = df['game'].fillna('')
+    df.to_parquet(folder, partition_cols=['day', 'game'], index=False)
+
+
+def _list_staged(staging):
+    """
+    Returns the files written in the staging folder
+    (relative paths).
+    """
+    res = []
+    for root, _, names in os.walk(staging):
+        for name in names:
+            res.append(os.path.relpath(os.path.join(root, name), staging))
+    return sorted(res)
+
+
+def _move_staged(folder, state):
+    """
+    Moves the files listed in ``state['staged']`` from the staging
+    folder into the store, a file already moved is skipped,
+    then removes the staging folder and saves the state.
+    """
+    staging = os.path.join(folder, STAGING_FOLDER)
+    for rel in state['staged']:
+        src = os.path.join(staging, rel)
+        if not os.path.exists(src):
+            continue
+        dest = os.path.join(folder, rel)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(src, dest)
+    state['staged'] = []
+    _save_state(folder, state)
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def _recover_staging(folder, state):
+    """
+    Finishes or cancels a previous call to @see fn export_qcmlog
+    which failed: the files of the staging folder are moved into the
+    store if the state listing them was saved, they are removed
+    otherwise, the lines they come from are then read again.
+    """
+    if state['staged']:
+        _move_staged(folder, state)
+    else:
+        shutil.rmtree(os.path.join(folder, STAGING_FOLDER),
+                      ignore_errors=True)
+
+
+def export_qcmlog(files, folder, expected_answers=None,
+                  batch_size=100000, chunk_size=2 ** 20, parser=None,
+                  hasher=None, max_state_age=24 * 3600):
+    """
+    Parses the logs produced by application @see cl QCMApp
+    and appends the observations (see @see fn qcmlog_observation_records)
+    to a columnar store in *folder*, :epkg:`parquet` files partitioned
+    by day and by game (module :epkg:`pyarrow` is required).
+    The function only processes the lines added since the previous call:
+    it stores in *folder* the position reached in every file
+    identified by its inode (a rotated log keeps its inode) and
+    its first bytes, and the data needed to compute durations.
+    A truncated or replaced file is read again from the beginning.
+    The last line is only processed once it is complete.
+    A compressed segment (see @see fn log_compression) is read once,
+    from the position reached in the file it was compressed from
+    if this one was exported before, under any name: the segment
+    and the file have the same first bytes.
+    The rows are first written into a staging folder,
+    they are moved into the store once the state was saved.
+    If a call fails (a malformed line, a full disk),
+    the store does not change and the next call reads the
+    same lines again: the store never contains the same row twice.
+
+    :param files: list of filenames
+    :param folder: destination folder
+    :param expected_answers: expected answers
+    :param batch_size: number of rows written at once
+    :param chunk_size: number of bytes read at once
+    :param parser: @see cl QCMLogLineParser, None to raise an exception
+        on the first line which cannot be parsed
+    :param hasher: @see cl PersonIdHasher, see @see fn enumerate_qcmlog,
+        the same one must be used for every call
+    :param max_state_age: duration (seconds or *timedelta*), the data
+        needed to compute the durations of a question is removed from
+        the state once the question has no event during this duration
+        (compared to the last line), a later visit is then counted
+        as a first visit, None keeps everything (the state grows with
+        every question ever seen)
+    :return: number of rows added to the store
+
+    The store can then be read with @see fn read_qcmlog_store.
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    state = _load_state(folder)
+    _recover_staging(folder, state)
+    staging = os.path.join(folder, STAGING_FOLDER)
+    positions = state['files']
+    parse = parse_qcmlog_line if parser is None else parser.parse
+
+    def enumerate_new_lines():
+        for name in files:
+            st = os.stat(name)
+            key = (st.st_dev, st.st_ino)
+            head = _read_head(name)
+            if log_compression(name) is not None:
+                if key in positions and _same_file(positions[key], head):
+                    continue
+                # the segment may have been exported before being renamed
+                # (rotation) and compressed, the file is gone but its
+                # first bytes were stored
+                plain = os.path.splitext(os.path.abspath(name))[0]
+                found = [k for k, p in positions.items()
+                         if k != key and (p[0] == plain if len(p) < 3
+                                          else p[2] and head.startswith(p[2]))]
+                start = max((positions[k][1] for k in found), default=0)
+                for line in enumerate_log_lines(name, chunk_size=chunk_size,
+                                                start=start):
+                    data = parse(line)
+                    if data is not None:
+                        yield data
+                for k in found:
+                    del positions[k]
+                positions[key] = (os.path.abspath(name), st.st_size, head)
+                continue
+            start = 0
+            if key in positions and _same_file(positions[key], head):
+                start = positions[key][1]
+            if st.st_size < start:
+                start = 0
+            stop = _complete_size(name, st.st_size)
+            if stop > start:
+                for line in enumerate_log_lines(name, chunk_size=chunk_size,
+                                                start=start, stop=stop):
+                    data = parse(line)
+                    if data is not None:
+                        yield data
+            positions[key] = (os.path.abspath(name), max(start, stop),
+                              head[:max(start, stop)])
+
+    records = []
+    total = 0
+    for obs in enumerate_qcmlog_parsed(
+            enumerate_new_lines(), expected_answers,
+            cache=state['cache'], last_key=state['last_key'],
+            hasher=hasher):
+        records.extend(qcmlog_observation_records(obs))
+        if len(records) >= batch_size:
+            _write_records(staging, records)
+            total += len(records)
+            records = []
+    if records:
+        _write_records(staging, records)
+        total += len(records)
+    if max_state_age is not None:
+        if not isinstance(max_state_age, timedelta):
+            max_state_age = timedelta(seconds=max_state_age)
+        _prune_cache(state['cache'], state['last_key'], max_state_age)
+    # the rows are committed once the state is saved
+    state['staged'] = _list_staged(staging)
+    _save_state(folder, state)
+    _move_staged(folder, state)
+    return total
+
+
+def read_qcmlog_store(folder, filters=None, columns=None):
+    """
+    Reads the store created by @see fn export_qcmlog.
+
+    :param folder: folder
+    :param filters: filters on partitions, example:
+        ``[('day', '=', '2018-12-12'), ('game', '=', 'simple_french_qcm')]``,
+        only the files in the selected partitions are read
+    :param columns: columns to read, None for all
+    :return: dataframe, column *value* contains strings,
+        column *number* the numerical values
+        (see @see fn qcmlog_observation_records)
+    """
+    df = pandas.read_parquet(folder, filters=filters, columns=columns)
+    for c in ['day', 'game']:
+        if c in df.columns:
+            df[c] = df[c].astype(str)
+    return df
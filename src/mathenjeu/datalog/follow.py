@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Follows the logs produced by application @see cl QCMApp
+while they are written (``tail -f``).
+"""
+import os
+import time
+from .logreader import (
+    enumerate_log_lines, _complete_size, log_compression, log_segment_key)
+from .lineparser import parse_qcmlog_line
+from .logindex import INDEX_EXT
+from .qcmlog import enumerate_qcmlog_parsed
+
+
+def _list_log_files(folder, prefix):
+    """
+    Returns the log files in *folder* starting with *prefix*,
+    rotated files included, the oldest first (see @see fn log_segment_key).
+    """
+    res = []
+    for name in os.listdir(folder):
+        if not name.startswith(prefix) or ".log" not in name:
+            continue
+        if name.endswith(INDEX_EXT) or name.endswith(".tmp"):
+            continue
+        full = os.path.join(folder, name)
+        try:
+            st = os.stat(full)
+        except FileNotFoundError:  # pragma: no cover
+            # removed by the rotation
+            continue
+        if not os.path.isfile(full):
+            continue
+        res.append((log_segment_key(name), full, st))
+    res.sort(key=lambda r: r[0])
+    return [(full, st) for _, full, st in res]
+
+
+def _enumerate_parsed(name, parse, chunk_size):
+    """
+    Parses every line of a file.
+    """
+    for line in enumerate_log_lines(name, chunk_size=chunk_size):
+        data = parse(line)
+        if data is not None:
+            yield data
+
+
+def enumerate_followed_lines(folder, prefix="QCMApp", delay=0.1,
+                             timeout=None, from_start=True,
+                             chunk_size=2 ** 20, positions=None,
+                             parser=None):
+    """
+    Watches the log files in *folder* and yields every parsed line
+    (see @see fn parse_qcmlog_line) as soon as it is complete.
+    Every file is identified by its inode, a file renamed by the rotation
+    (see :epkg:`TimedRotatingFileHandler`) is read until its end
+    and the new file is read from the beginning. A truncated file is read
+    again from the beginning. Compressed segments
+    (see @see cl CompressedRotatingFileHandler) are only read if they exist
+    when the function starts and *from_start* is True, the segments
+    created later were followed before being compressed.
+
+    :param folder: folder containing the logs
+    :param prefix: only considers files starting with this prefix
+        and containing ``.log``
+    :param delay: time (seconds) to wait before looking for new lines
+    :param timeout: stops after *timeout* seconds without any new line,
+        None to never stop
+    :param from_start: processes the existing content, otherwise
+        only the lines added after the first call
+    :param chunk_size: number of bytes read at once
+    :param positions: dictionary ``{(st_dev, st_ino): position}``,
+        modified inplace (None for a new one), it can be given
+        to continue a previous processing
+    :param parser: @see cl QCMLogLineParser, None to raise an exception
+        on the first line which cannot be parsed
+    :return: iterator on dictionaries
+    """
+    parse = parse_qcmlog_line if parser is None else parser.parse
+    if positions is None:
+        positions = {}
+    if not from_start:
+        for name, st in _list_log_files(folder, prefix):
+            positions[st.st_dev, st.st_ino] = (
+                st.st_size if log_compression(name) is not None
+                else _complete_size(name, st.st_size))
+    last = time.perf_counter()
+    first = True
+    while True:
+        found = False
+        seen = set()
+        for name, st in _list_log_files(folder, prefix):
+            key = (st.st_dev, st.st_ino)
+            seen.add(key)
+            if log_compression(name) is not None:
+                # a compressed segment never changes
+                if first and key not in positions:
+                    for data in _enumerate_parsed(name, parse, chunk_size):
+                        found = True
+                        yield data
+                positions[key] = st.st_size
+                continue
+            start = positions.get(key, 0)
+            if st.st_size < start:
+                start = 0
+            try:
+                stop = _complete_size(name, st.st_size)
+            except FileNotFoundError:  # pragma: no cover
+                continue
+            if stop <= start:
+                positions[key] = start
+                continue
+            for line in enumerate_log_lines(name, chunk_size=chunk_size,
+                                            start=start, stop=stop):
+                found = True
+                data = parse(line)
+                if data is not None:
+                    yield data
+            positions[key] = stop
+        # an inode may be reused by a new file
+        for key in list(positions):
+            if key not in seen:
+                del positions[key]
+        first = False
+        now = time.perf_counter()
+        if found:
+            last = now
+        elif timeout is not None and now - last >= timeout:
+            break
+        time.sleep(delay)
+
+
+def enumerate_qcmlog_follow(folder, prefix="QCMApp", expected_answers=None,
+                            delay=0.1, timeout=None, from_start=True,
+                            chunk_size=2 ** 20, as_records=False,
+                            parser=None, hasher=None):
+    """
+    Follows the logs produced by application @see cl QCMApp
+    while they are written (``tail -f``) and yields new observations
+    within *delay* seconds. It relies on @see fn enumerate_followed_lines
+    to watch the folder and on @see fn enumerate_qcmlog_parsed
+    to compute the observations, the information needed to compute
+    the durations and the number of visits is kept between two polls,
+    a question left open by a student is completed when
+    the student moves to the next one.
+
+    :param folder: folder containing the logs
+        (see @see cl LogApp)
+    :param prefix: only considers files starting with this prefix
+    :param expected_answers: expected answers
+    :param delay: time (seconds) to wait before looking for new lines
+    :param timeout: stops after *timeout* seconds without any new line,
+        None to never stop
+    :param from_start: processes the existing content, otherwise
+        only the lines added after the first call
+    :param chunk_size: number of bytes read at once
+    :param as_records: returns @see cl QCMObservation instead
+        of dictionaries
+    :param parser: @see cl QCMLogLineParser, None to raise an exception
+        on the first line which cannot be parsed
+    :param hasher: @see cl PersonIdHasher, see @see fn enumerate_qcmlog
+    :return: iterator on observations
+
+    ::
+
+        from mathenjeu.datalog import enumerate_qcmlog_follow
+
+        for obs in enumerate_qcmlog_follow("logs", timeout=3600):
+            print(obs)
+    """
+    parsed = enumerate_followed_lines(
+        folder, prefix=prefix, delay=delay, timeout=timeout,
+        from_start=from_start, chunk_size=chunk_size, parser=parser)
+    for obs in enumerate_qcmlog_parsed(parsed, expected_answers,
+                                       as_records=as_records, hasher=hasher):
+        yield obs
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Formats of the files written by the web applications
+and read by module *datalog*. This module does not import anything,
+*datalog* does not depend on the web applications.
+"""
+
+#: Tag of the lines of logs containing the data (answers, events...).
+DATA_TAG = "[DATA]"
+
+#: Supported compressions and the extension of the compressed segments
+#: (see @see cl CompressedRotatingFileHandler).
+LOG_COMPRESSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+#: Extension of the files written by @see cl EventSink.
+EVENT_EXT = ".events.mpk"
+
+#: Fields of every record written by @see cl EventSink.
+EVENT_SCHEMA = ('time', 'msg', 'alias', 'client', 'game', 'qn',
+                'data', 'events', 'extra')
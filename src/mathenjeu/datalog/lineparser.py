@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Parses one line of the logs produced by application
+@see cl QCMApp.
+"""
+import re
+import ujson
+from .timeparse import parse_log_time
+
+DATA_SEP = ",INFO,[DATA],"
+
+_queryparams = re.compile('QueryParams\\(\\"game=([a-z_]+)\\"\\)')
+
+#: Kinds of lines returned by @see fn _parse_line.
+REPAIR_KINDS = ('json', 'quotes', 'queryparams')
+
+
+def _parse_line(line):
+    """
+    Parses one line and tells which repair was applied.
+    The shape of the line is guessed before decoding the json
+    so that :epkg:`ujson` is called only once:
+
+    * ``'json'``: the line is valid json,
+    * ``'quotes'``: the line only contains single quotes,
+    * ``'queryparams'``: same as the previous one but message
+      ``finish`` also contains ``QueryParams(...)`` or a tuple.
+
+    :param line: line (without end of line characters)
+    :return: ``(data, kind)``
+    """
+    ti, sep, sdata = line.partition(DATA_SEP)
+    if not sep:
+        raise ValueError("Unable to find '{0}' in line\n{1}".format(
+            DATA_SEP, line))
+    if '"' in sdata or "'" not in sdata:
+        kind = 'json'
+    else:
+        sdata = sdata.replace("'", '"')
+        if '"msg": "finish"' in sdata and (
+                'QueryParams' in sdata or '"client": ("' in sdata):
+            kind = 'queryparams'
+            sdata = sdata.replace('"client": ("', '"client": ["')
+            sdata = sdata.replace(
+                '), "data": QueryParams', '], "data": QueryParams')
+            sdata = _queryparams.sub('{"game":"\\1"}', sdata)
+        else:
+            kind = 'quotes'
+    try:
+        data = ujson.loads(sdata)  # pylint: disable=E1101
+    except ValueError as e:
+        raise ValueError(
+            "Unable to process line ({0})\n{1}".format(kind, line)) from e
+    if not isinstance(data, dict):
+        raise ValueError(
+            "Line does not contain a dictionary\n{0}".format(line))
+    data['time'] = parse_log_time(ti)
+    return data, kind
+
+
+# the ways the key msg is written in the logs (json, old logs)
+_msg_prefixes = ('"msg":"', '"msg": "', "'msg': '")
+
+
+def _line_msg(line):
+    """
+    Returns the value of key *msg* found in a line before
+    decoding it or None if it cannot be found.
+    """
+    for prefix in _msg_prefixes:
+        i = line.find(prefix)
+        if i >= 0:
+            i += len(prefix)
+            return line[i:line.find(prefix[-1], i)]
+    return None
+
+
+def filter_qcmlog_lines(lines, msgs):
+    """
+    Removes the lines whose message (key *msg*) is not in *msgs*
+    without decoding them, a substring search is enough.
+    The lines where the message cannot be found are kept,
+    the data must be checked again once decoded.
+
+    :param lines: iterator on lines
+    :param msgs: set of messages to keep
+    :return: iterator on lines
+    """
+    for line in lines:
+        msg = _line_msg(line)
+        if msg is None or msg in msgs:
+            yield line
+
+
+def parse_qcmlog_line(line):
+    """
+    Parses one line ``<time>,INFO,[DATA],<json>``
+    and returns the data as a dictionary with an additional
+    key ``'time'``. Old logs may contain single quotes
+    or ``QueryParams(...)``, the function tries to repair them.
+    It raises an exception if the line cannot be parsed,
+    see @see cl QCMLogLineParser for other behaviours.
+
+    :param line: line (without end of line characters)
+    :return: dictionary
+    """
+    return _parse_line(line)[0]
+
+
+class QCMLogLineParser:
+    """
+    Parses the lines of the logs produced by application
+    @see cl QCMApp (see @see fn parse_qcmlog_line),
+    counts the repairs applied to every line and decides
+    what to do with the lines which cannot be parsed.
+
+    :param errors: ``'raise'`` to raise an exception,
+        ``'skip'`` to ignore the line, ``'collect'`` to ignore the line
+        and keep it in attribute *failures*
+
+    Attribute *counts* stores the number of lines for every kind
+    of repair (see *REPAIR_KINDS*) and ``'error'``,
+    attribute *failures* stores tuples ``(line, error message)``.
+
+    ::
+
+        from mathenjeu.datalog import enumerate_qcmlog, QCMLogLineParser
+
+        parser = QCMLogLineParser(errors='collect')
+        obs = list(enumerate_qcmlog(["QCMApp.log"], parser=parser))
+        print(parser.counts)
+    """
+
+    def __init__(self, errors='raise'):
+        if errors not in ('raise', 'skip', 'collect'):
+            raise ValueError(
+                "errors must be 'raise', 'skip' or 'collect' not '{0}'".format(errors))
+        self.errors = errors
+        self.counts = {k: 0 for k in REPAIR_KINDS + ('error', )}
+        self.failures = []
+
+    def parse(self, line):
+        """
+        Parses one line.
+
+        :param line: line
+        :return: dictionary or None if the line cannot be parsed
+            and *errors* is not ``'raise'``
+        """
+        try:
+            data, kind = _parse_line(line)
+        except ValueError as e:
+            self.counts['error'] += 1
+            if self.errors == 'raise':
+                raise
+            if self.errors == 'collect':
+                self.failures.append((line, str(e)))
+            return None
+        self.counts[kind] += 1
+        return data
+
+    def parse_lines(self, lines):
+        """
+        Parses every line and returns the parsed ones.
+
+        :param lines: iterator on lines
+        :return: list of dictionaries
+        """
+        res = []
+        for line in lines:
+            data = self.parse(line)
+            if data is not None:
+                res.append(data)
+        return res
+
+    def update(self, counts, failures):
+        """
+        Merges the results of another parser
+        (used by @see fn enumerate_parsed_shards).
+
+        :param counts: dictionary of counts
+        :param failures: list of failures
+        """
+        for k, v in counts.items():
+            self.counts[k] += v
+        self.failures.extend(failures)
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Index on the logs produced by application @see cl QCMApp
+to retrieve the lines of one person, one game or one period
+without reading the whole files.
+"""
+import os
+import mmap
+import pickle
+from datetime import datetime
+import numpy
+from .logreader import DATA_TAG, _complete_size, log_compression
+from .lineparser import parse_qcmlog_line
+from .anonymize import _default_hasher
+from .qcmlog import _person, _comma_semi, _events_list
+
+INDEX_EXT = ".qidx"
+INDEX_VERSION = 1
+
+
+def _line_game(data):
+    """
+    Returns the game a parsed line refers to or None.
+    """
+    game = data.get('game', None)
+    if game is not None:
+        return game
+    sub = data.get('data', None)
+    if isinstance(sub, dict) and 'game' in sub:
+        return sub['game']
+    events = _events_list(data)
+    if events:
+        for ev in events:
+            if isinstance(ev, str):
+                game = _comma_semi(ev).get('game', None)
+                if game is not None:
+                    return game
+    return None
+
+
+def _enumerate_offsets(mm, start, stop, tag=DATA_TAG):
+    """
+    Enumerates the complete lines containing *tag*
+    in the byte range ``[start, stop[`` of a :epkg:`mmap`.
+
+    :return: iterator on ``(offset, line)``
+    """
+    btag = tag.encode("utf-8")
+    pos = start
+    while pos < stop:
+        end = mm.find(b'\n', pos, stop)
+        if end == -1:
+            # incomplete line
+            break
+        line = mm[pos:end]
+        if btag in line:
+            yield pos, line.decode("utf-8").strip("\r")
+        pos = end + 1
+
+
+def _index_name(name):
+    return name + INDEX_EXT
+
+
+def _empty_index(st, fingerprint):
+    return dict(version=INDEX_VERSION, ino=(st.st_dev, st.st_ino),
+                hasher=fingerprint, size=0, offsets=[],
+                persons={}, games={}, hours={})
+
+
+def _append_posting(postings, key, i):
+    if key in postings:
+        postings[key].append(i)
+    else:
+        postings[key] = [i]
+
+
+def build_qcmlog_index(name, hasher=None, parser=None):
+    """
+    Builds or updates the index of a log file produced by
+    application @see cl QCMApp and stores it next to the file
+    (same name with extension *INDEX_EXT*). The index stores
+    the position of every line and, for every *person_id*, every game
+    and every hour, the list of lines referring to it.
+    Only the lines added since the previous call are processed,
+    the index is built again from the beginning if the file
+    was replaced or truncated or if *hasher* changed.
+
+    :param name: log filename
+    :param hasher: @see cl PersonIdHasher used to compute *person_id*,
+        it must be the same as the one used to process the logs
+    :param parser: @see cl QCMLogLineParser, None to raise an exception
+        on the first line which cannot be parsed
+    :return: index (dictionary)
+
+    Compressed segments (see @see fn log_compression) cannot be indexed.
+    """
+    if log_compression(name) is not None:
+        raise ValueError(
+            "A compressed file cannot be indexed: '{0}'".format(name))
+    parse = parse_qcmlog_line if parser is None else parser.parse
+    if hasher is None:
+        hasher = _default_hasher
+    # identifies the hasher without storing its key
+    fingerprint = hasher("", "")
+    st = os.stat(name)
+    iname = _index_name(name)
+    index = None
+    if os.path.exists(iname):
+        with open(iname, "rb") as f:
+            index = pickle.load(f)
+        if (index.get('version', None) != INDEX_VERSION or
+                index['ino'] != (st.st_dev, st.st_ino) or
+                index['hasher'] != fingerprint or
+                index['size'] > st.st_size):
+            index = None
+    if index is None:
+        index = _empty_index(st, fingerprint)
+    stop = _complete_size(name, st.st_size)
+    if stop <= index['size']:
+        return index
+
+    # postings are stored as lists while building the index
+    offsets = list(index['offsets'])
+    postings = {}
+    for k in ['persons', 'games', 'hours']:
+        postings[k] = {key: list(v) for key, v in index[k].items()}
+
+    with open(name, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for pos, line in _enumerate_offsets(mm, index['size'], stop):
+                data = parse(line)
+                if data is None:
+                    continue
+                i = len(offsets)
+                offsets.append(pos)
+                person = _person(data, hasher)
+                if person is not None:
+                    _append_posting(postings['persons'], person[1], i)
+                game = _line_game(data)
+                if game is not None:
+                    _append_posting(postings['games'], game, i)
+                hour = data['time'].replace(
+                    minute=0, second=0, microsecond=0)
+                _append_posting(postings['hours'], hour, i)
+
+    index['size'] = stop
+    index['offsets'] = numpy.array(offsets, dtype=numpy.int64)
+    for k, post in postings.items():
+        index[k] = {key: numpy.array(v, dtype=numpy.int64)
+                    for key, v in post.items()}
+    tmp = iname + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(index, f)
+    os.replace(tmp, iname)
+    return index
+
+
+class QCMLogIndex:
+    """
+    Retrieves the lines of logs produced by application
+    @see cl QCMApp for one person, one game or one period
+    with an index (see @see fn build_qcmlog_index),
+    the selected lines are read with :epkg:`mmap`.
+
+    :param files: list of log filenames,
+        from the oldest to the newest
+    :param hasher: @see cl PersonIdHasher, see @see fn build_qcmlog_index
+    :param parser: @see cl QCMLogLineParser,
+        see @see fn build_qcmlog_index
+
+    ::
+
+        from mathenjeu.datalog import QCMLogIndex, enumerate_qcmlog_parsed
+
+        index = QCMLogIndex(["QCMApp.log"])
+        lines = index.select(person_id="8a8c40ad28eb1206efd5")
+        obs = list(enumerate_qcmlog_parsed(lines))
+
+    The observations computed from a selection may differ
+    from the observations computed from the whole logs,
+    a question is left when the next one is entered
+    and this one may not be part of the selection.
+    """
+
+    def __init__(self, files, hasher=None, parser=None):
+        self.files = list(files)
+        self.hasher = hasher
+        self.parser = parser
+        self.indexes = {}
+        self.update()
+
+    def update(self):
+        """
+        Updates the index of every file, only the lines
+        added since the last update are processed.
+        """
+        for name in self.files:
+            self.indexes[name] = build_qcmlog_index(
+                name, hasher=self.hasher, parser=self.parser)
+
+    @property
+    def persons(self):
+        "Returns the set of indexed *person_id*."
+        return set(k for ind in self.indexes.values() for k in ind['persons'])
+
+    @property
+    def games(self):
+        "Returns the set of indexed games."
+        return set(k for ind in self.indexes.values() for k in ind['games'])
+
+    @staticmethod
+    def _select_lines(index, person_id, game, time_range):
+        """
+        Returns the positions of the selected lines in one file.
+        """
+        sel = None
+        if person_id is not None:
+            sel = index['persons'].get(person_id, None)
+            if sel is None:
+                return None
+        if game is not None:
+            rows = index['games'].get(game, None)
+            if rows is None:
+                return None
+            sel = rows if sel is None else numpy.intersect1d(
+                sel, rows, assume_unique=True)
+        if time_range is not None:
+            begin, end = time_range
+            rows = [v for k, v in index['hours'].items()
+                    if (begin is None or k >= begin.replace(
+                        minute=0, second=0, microsecond=0)) and
+                    (end is None or k < end)]
+            if len(rows) == 0:
+                return None
+            rows = numpy.sort(numpy.hstack(rows))
+            sel = rows if sel is None else numpy.intersect1d(
+                sel, rows, assume_unique=True)
+        if sel is None:
+            return index['offsets']
+        return index['offsets'][sel]
+
+    def select(self, person_id=None, game=None, time_range=None):
+        """
+        Returns the parsed lines (see @see fn parse_qcmlog_line)
+        referring to one person, one game and within a period,
+        in the same order as in the files.
+        The lines are given to @see fn enumerate_qcmlog_parsed
+        to get the observations.
+
+        :param person_id: person identifier or None for all
+        :param game: game name or None for all
+        :param time_range: ``(begin, end)``, *begin* is included,
+            *end* is excluded, one of them can be None,
+            None for no restriction
+        :return: iterator on dictionaries
+        """
+        if time_range is not None:
+            begin, end = time_range
+            if begin is not None and not isinstance(begin, datetime):
+                raise TypeError("begin must be a datetime")
+            if end is not None and not isinstance(end, datetime):
+                raise TypeError("end must be a datetime")
+        parse = parse_qcmlog_line if self.parser is None else self.parser.parse
+        for name in self.files:
+            index = self.indexes[name]
+            offsets = QCMLogIndex._select_lines(
+                index, person_id, game, time_range)
+            if offsets is None or len(offsets) == 0:
+                continue
+            with open(name, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for pos in offsets:
+                        line = mm[pos:mm.find(b'\n', pos)]
+                        line = line.decode("utf-8").strip("\r")
+                        data = parse(line)
+                        if data is None:
+                            continue
+                        if time_range is not None:
+                            t = data['time']
+                            if begin is not None and t < begin:
+                                continue
+                            if end is not None and t >= end:
+                                continue
+                        yield data
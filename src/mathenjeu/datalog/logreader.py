@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Streaming readers for the logs produced by application
+@see cl QCMApp.
+"""
+import os
+import gzip
+from .formats import LOG_COMPRESSIONS, DATA_TAG
+from .binlog import is_binlog
+
+
+def log_compression(name):
+    """
+    Returns the compression of a log segment written by
+    @see cl CompressedRotatingFileHandler guessed from its extension
+    (``'gzip'``, ``'zstd'``) or None if the file is not compressed.
+    """
+    for compression, ext in LOG_COMPRESSIONS.items():
+        if name.endswith(ext):
+            return compression
+    return None
+
+
+def open_log_file(name):
+    """
+    Opens a log file in binary mode, a compressed segment
+    (see @see fn log_compression) is decompressed while it is read.
+
+    :param name: filename
+    :return: stream
+    """
+    compression = log_compression(name)
+    if compression is None:
+        return open(name, "rb")  # pylint: disable=R1732
+    if compression == 'gzip':
+        return gzip.open(name, "rb")
+    import zstandard  # pylint: disable=C0415,E0401
+    return zstandard.ZstdDecompressor().stream_reader(
+        open(name, "rb"), closefd=True)  # pylint: disable=R1732
+
+
+def enumerate_log_lines(name, chunk_size=2 ** 20, tag=DATA_TAG,
+                        encoding="utf-8", start=0, stop=None):
+    """
+    Reads a log file by chunks of fixed size and yields
+    every line containing *tag* as soon as it is complete.
+    The file is never fully loaded in memory.
+    Parameters *start*, *stop* restrict the reading to the lines
+    starting in the byte range ``[start, stop[``, contiguous ranges
+    return every line once and only once.
+    A compressed segment (see @see fn log_compression) is decompressed
+    by chunks while it is read, positions refer to the decompressed
+    content and the bytes before *start* are decompressed to be skipped.
+
+    :param name: filename
+    :param chunk_size: number of bytes read at once
+    :param tag: only keeps lines containing this string,
+        None to keep every line
+    :param encoding: encoding
+    :param start: first byte
+    :param stop: last byte (excluded) or None for the end of the file
+    :return: iterator on lines (without the end of line characters)
+    """
+    if chunk_size <= 0:
+        raise ValueError(
+            "chunk_size must be strictly positive not {0}".format(chunk_size))
+    btag = None if tag is None else tag.encode(encoding)
+    tail = b''
+    with open_log_file(name) as f:
+        # The line starting before start belongs to the previous range.
+        skip = start > 0
+        if skip:
+            f.seek(start - 1)
+        # pos is the position of the first byte of tail
+        pos = max(start - 1, 0)
+        while stop is None or pos < stop:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buf = tail + chunk
+            if skip:
+                i = buf.find(b'\n')
+                if i == -1:
+                    pos += len(buf)
+                    tail = b''
+                    continue
+                buf = buf[i + 1:]
+                pos += i + 1
+                skip = False
+            lines = buf.split(b'\n')
+            tail = lines.pop()
+            for line in lines:
+                if stop is not None and pos >= stop:
+                    return
+                if btag is None or btag in line:
+                    yield line.decode(encoding).strip("\r")
+                pos += len(line) + 1
+    if tail and (stop is None or pos < stop) and (btag is None or btag in tail):
+        yield tail.decode(encoding).strip("\r")
+
+
+def log_segment_key(name):
+    """
+    Returns a key sorting the log files and their rotated segments
+    (see @see cl CompressedRotatingFileHandler) from the oldest
+    to the newest: ``QCMApp-2018-12-12.log.2018-12-12.gz``,
+    ``QCMApp-2018-12-12.log.2018-12-12.1``, ``QCMApp-2018-12-12.log``.
+    The order relies on the names and not on the modification time
+    which changes when a segment is compressed.
+
+    :param name: filename
+    :return: tuple
+    """
+    name = os.path.split(name)[-1]
+    compression = log_compression(name)
+    if compression is not None:
+        name = name[:-len(LOG_COMPRESSIONS[compression])]
+    pos = name.find(".log.")
+    if pos == -1:
+        # the live file comes after its segments
+        return (name, 1, '', 0)
+    suffix = name[pos + 5:]
+    counter = 0
+    parts = suffix.rsplit('.', 1)
+    if len(parts) == 2 and parts[1].isdigit():
+        suffix, counter = parts[0], int(parts[1])
+    return (name[:pos + 4], 0, suffix, counter)
+
+
+def split_log_files(files, shard_size=2 ** 26):
+    """
+    Splits a list of files into byte ranges which can be
+    processed independently with @see fn enumerate_log_lines.
+    Files written by @see cl EventSink are not split,
+    compressed segments neither (*stop* is None).
+
+    :param files: list of filenames
+    :param shard_size: approximative size of a range in bytes
+    :return: list of ``(filename, start, stop)``
+    """
+    if shard_size <= 0:
+        raise ValueError(
+            "shard_size must be strictly positive not {0}".format(shard_size))
+    shards = []
+    for name in files:
+        size = os.stat(name).st_size
+        if size == 0:
+            continue
+        if is_binlog(name):
+            shards.append((name, 0, size))
+            continue
+        if log_compression(name) is not None:
+            shards.append((name, 0, None))
+            continue
+        for start in range(0, size, shard_size):
+            shards.append((name, start, min(start + shard_size, size)))
+    return shards
+
+
+def _complete_size(name, size):
+    """
+    Returns the position after the last end of line
+    found before *size*, lines after it may be incomplete.
+    """
+    with open(name, "rb") as f:
+        pos = size
+        while pos > 0:
+            begin = max(pos - 2 ** 16, 0)
+            f.seek(begin)
+            buf = f.read(pos - begin)
+            i = buf.rfind(b'\n')
+            if i != -1:
+                return begin + i + 1
+            pos = begin
+    return 0
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Parses the logs produced by application
+@see cl QCMApp with several processes.
+"""
+import gc
+import marshal
+import os
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from .binlog import is_binlog, enumerate_binlog_records
+from .logreader import enumerate_log_lines, split_log_files
+from .lineparser import QCMLogLineParser, filter_qcmlog_lines
+
+
+def _dump_rows(rows, prepared=False):
+    """
+    Serializes the parsed lines sent back by a worker.
+    :epkg:`marshal` is much faster than :epkg:`pickle` to decode
+    many small dictionaries, the times are converted into tuples
+    as :epkg:`marshal` does not support *datetime*.
+    If *prepared* is True, every row is a tuple, the dictionary
+    is the second element (see *prepare* in @see fn enumerate_parsed_shards).
+    """
+    items = rows
+    if prepared:
+        rows = [row[1] for row in rows]
+    for row in rows:
+        t = row.get('time', None)
+        if isinstance(t, datetime):
+            row['time'] = (t.year, t.month, t.day, t.hour, t.minute,
+                           t.second, t.microsecond)
+    try:
+        return b'm' + marshal.dumps(items)
+    except ValueError:
+        # a value marshal cannot serialize
+        for row in rows:
+            t = row.get('time', None)
+            if isinstance(t, tuple):
+                row['time'] = datetime(*t)
+        return b'p' + pickle.dumps(items, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _load_rows(data, prepared=False):
+    """
+    Restores the parsed lines serialized by @see fn _dump_rows.
+    The garbage collector is disabled while the objects are created,
+    it would otherwise be triggered many times and it takes
+    most of the time.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if data[:1] == b'p':
+            return pickle.loads(data[1:])
+        res = marshal.loads(data[1:])
+    finally:
+        if enabled:
+            gc.enable()
+    rows = [row[1] for row in res] if prepared else res
+    for row in rows:
+        t = row.get('time', None)
+        if isinstance(t, tuple):
+            row['time'] = datetime(*t)
+    return res
+
+
+def _parse_shard(shard, chunk_size=2 ** 20, errors='raise', msgs=None,
+                 prepare=None):
+    """
+    Parses every line of a byte range.
+    This function is executed by the workers.
+
+    :param shard: ``(filename, start, stop)``
+    :param chunk_size: number of bytes read at once
+    :param errors: see @see cl QCMLogLineParser
+    :param msgs: only keeps these messages, None for all
+    :param prepare: see @see fn enumerate_parsed_shards
+    :return: list of dictionaries serialized by @see fn _dump_rows,
+        counts and failures (see @see cl QCMLogLineParser)
+    """
+    name, start, stop = shard
+    parser = QCMLogLineParser(errors=errors)
+    if is_binlog(name):
+        rows = list(enumerate_binlog_records(name, chunk_size=chunk_size))
+    else:
+        lines = enumerate_log_lines(name, chunk_size=chunk_size,
+                                    start=start, stop=stop)
+        if msgs is not None:
+            lines = filter_qcmlog_lines(lines, msgs)
+        rows = parser.parse_lines(lines)
+    if msgs is not None:
+        rows = [row for row in rows if row.get('msg', None) in msgs]
+    if prepare is not None:
+        rows = [row for row in map(prepare, rows) if row is not None]
+    return _dump_rows(rows, prepare is not None), parser.counts, parser.failures
+
+
+def enumerate_parsed_shards(files, n_jobs=None, shard_size=2 ** 26,
+                            chunk_size=2 ** 20, parser=None, msgs=None,
+                            prepare=None):
+    """
+    Splits the files into byte ranges (see @see fn split_log_files),
+    parses them with a pool of processes
+    (decoding :epkg:`json` and times is the costly part)
+    and returns the parsed lines in file order, the same order
+    as a sequential reading, the rows are not merged by time.
+    They are in chronological order only if the files
+    are given from the oldest to the newest.
+    Only ``2 * n_jobs`` ranges are processed or waiting at the same time.
+    The workers send back the parsed lines serialized with
+    :epkg:`marshal` (see @see fn _dump_rows), decoding :epkg:`pickle`
+    in the main process would take as long as parsing the lines.
+
+    :param files: list of filenames
+    :param n_jobs: number of processes, None for all the cores
+    :param shard_size: approximative size of a range in bytes
+    :param chunk_size: number of bytes read at once
+    :param parser: @see cl QCMLogLineParser, it receives the counts
+        and the failures of every range, None to raise an exception
+        on the first line which cannot be parsed
+    :param msgs: only keeps these messages (key *msg*), None for all,
+        the other lines are removed before being decoded
+        (see @see fn filter_qcmlog_lines)
+    :param prepare: None or a function the workers call on every
+        parsed line, it must be picklable and return None to remove
+        the line or a tuple whose second element is a dictionary
+        with key *time*, @see fn enumerate_qcmlog uses it to build
+        the observations in the workers, the main process
+        only computes the durations
+    :return: iterator on dictionaries or on the results of *prepare*
+    """
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    if parser is None:
+        parser = QCMLogLineParser()
+
+    def merge(future):
+        data, counts, failures = future.result()
+        parser.update(counts, failures)
+        return _load_rows(data, prepare is not None)
+
+    shards = split_log_files(files, shard_size=shard_size)
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        pending = deque()
+        for shard in shards:
+            pending.append(executor.submit(
+                _parse_shard, shard, chunk_size, parser.errors, msgs,
+                prepare))
+            if len(pending) >= 2 * n_jobs:
+                for data in merge(pending.popleft()):
+                    yield data
+        while pending:
+            for data in merge(pending.popleft()):
+                yield data
@@ -3,12 +3,19 @@
 @file
 @brief Helpers to process data from logs.
 """
-import re
-from datetime import datetime
-import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import partial
 import numpy
 import pandas
-import ujson
+from .logreader import enumerate_log_lines
+from .aggregation import aggregate_notnan
+from .binlog import is_binlog, enumerate_binlog_records
+from .anonymize import _default_hasher
+from .lineparser import parse_qcmlog_line, filter_qcmlog_lines
+from .parallel import enumerate_parsed_shards
+from .records import QCMObservation, field_key
+from .widedf import qcmlog_wide_dataframe
 
 
 def _duration(seq):
@@ -29,131 +36,347 @@ def _duration(seq):
     return dt
 
 
-def _enumerate_processed_row(rows, data, cache, last_key, set_expected_answers=None):
+def _comma_semi(st):
+    if st is None:
+        return {}
+    res = {}
+    for val in st.split(','):
+        spl = val.split(':')
+        if len(spl) == 1:
+            res[spl[0]] = True
+        elif len(spl) == 2:
+            res[spl[0]] = spl[1]
+        else:
+            raise ValueError(  # pragma: no cover
+                "Unable to parse value '{0}'".format(st))
+    return res
+
+
+def _person(data, hasher=None):
+    """
+    Returns *alias*, *person_id* or None if there is no session.
+    *hasher* is a @see cl PersonIdHasher.
+    """
+    session = data.get('session', None)
+    ipadd = data.get('client', ['NN.NN.NN.NN'])[0]
+    if ipadd is None:
+        raise ValueError(  # pragma: no cover
+            "Unable to extract an ip address from {0}".format(data))
+    if session is None:
+        return None
+    alias = session['alias']
+    if hasher is None:
+        hasher = _default_hasher
+    return alias, hasher(alias, ipadd)
+
+
+def _enter_question(cache, last_key, key, time):
+    if key not in cache:
+        cache[key] = []
+    cache[key].append((time, 'enter'))
+    if len(last_key) > 0:
+        cache[last_key[0]].append((time, 'leave'))
+        last_key.clear()
+    last_key.append(key)
+
+
+def _leave_question(cache, last_key, key, time):
+    """
+    Returns the number of visits and the duration.
+    """
+    if key not in cache:
+        cache[key] = []
+    cache[key].append((time, 'leave'))
+    last_key.clear()
+    return len(cache[key]) * 0.5, _duration(cache[key])
+
+
+def _events_list(data):
+    events = data.get('events', None)
+    if events is not None and not isinstance(events, list):
+        events = [events]
+    return events
+
+
+def _prepare_row(data, set_expected_answers=None, hasher=None, fields=None):
+    """
+    Does the part of @see fn _enumerate_processed_row which does not
+    depend on the previous lines: it builds the observation,
+    @see fn _apply_prepared_row then adds the number of visits
+    and the duration. This part can be done by the processes
+    parsing the logs (see @see fn enumerate_parsed_shards).
+
+    @param      data                    data as dictionaries
+    @param      set_expected_answers    set of expected answers,
+                                        adds a field if one is found
+    @param      hasher                  @see cl PersonIdHasher or None
+    @param      fields                  set of fields to keep or None for all
+    @return                             None if the line does not produce any
+                                        observation, otherwise a tuple
+                                        ``(key, row, events, names)``,
+                                        *names* is None for a question
+                                        and the names of the fields *nbvisit*,
+                                        *duration* for an answer
+    """
+    keys = {'qn', 'game', 'next', 'events'}
+    person = _person(data, hasher)
+    if person is None:
+        return None
+    event = data.get('msg', None)
+    if event not in ('qcm', 'answer'):
+        return None
+    alias, person_id = person
+    want_good = fields is None or 'good' in fields
+    want_events = fields is None or 'events' in fields
+
+    res = dict(person_id=person_id, alias=alias, time=data['time'])
+    if event == 'qcm':
+        res['qtime'] = 'begin'
+        key = person_id, alias, data['game'], data['qn']
+        names = None
+    else:
+        res["qtime"] = 'end'
+        q = data.get('data', None)
+        good = {}
+        if q is not None:
+            qn = q['qn']
+            game = q['game']
+            q2 = {}
+            for k, v in q.items():
+                if k in keys:
+                    q2[k] = v
+                else:
+                    keep = fields is None or k in fields
+                    if not keep and not want_good:
+                        continue
+                    name = "{0}-{1}-{2}".format(game, qn, k)
+                    if keep:
+                        q2[name] = v
+                    key_short = "{0}-{1}".format(game, qn)
+                    if name in set_expected_answers:
+                        good[key_short] = 1
+                    elif key_short not in good:
+                        good[key_short] = 0
+
+            res.update(q2)
+        key = person_id, alias, q['game'], q['qn']
+        # the values are known once the previous lines are processed,
+        # the keys are inserted now to keep the same order
+        name_nbvisit, name_duration = None, None
+        if fields is None or 'nbvisit' in fields:
+            name_nbvisit = "{0}-{1}-{2}".format(game, qn, 'nbvisit')
+            res[name_nbvisit] = None
+        if fields is None or 'duration' in fields:
+            name_duration = "{0}-{1}-{2}".format(game, qn, 'duration')
+            res[name_duration] = None
+        if want_good:
+            for k, v in good.items():
+                res[k + '-good'] = v
+        names = name_nbvisit, name_duration
+
+    events = _events_list(data) if want_events else None
+    if events is not None:
+        events = [_comma_semi(ev) for ev in events]
+    return key, res, events, names
+
+
+def _apply_prepared_row(prepared, cache, last_key):
+    """
+    Updates the durations with a line prepared by @see fn _prepare_row
+    and returns the observations. The lines must be given in the same
+    order as the logs.
+
+    @param      prepared    result of @see fn _prepare_row
+    @param      cache       cache events
+    @param      last_key    last seen key
+    @return                 iterator on clean rows
+    """
+    key, res, events, names = prepared
+    if names is None:
+        _enter_question(cache, last_key, key, res['time'])
+    else:
+        nbvisit, duration = _leave_question(
+            cache, last_key, key, res['time'])
+        if names[0] is not None:
+            res[names[0]] = nbvisit
+        if names[1] is not None:
+            res[names[1]] = duration
+    yield res
+
+    if events is not None:
+        res = res.copy()
+        res['qtime'] = 'event'
+        for ev in events:
+            res.update(ev)
+            yield res
+
+
+def _enumerate_processed_row(data, cache, last_key, set_expected_answers=None,
+                             hasher=None, fields=None):
     """
     Converts time, data as dictionary into other data
-    as dictionary.
+    as dictionary, see @see fn _prepare_row
+    and @see fn _apply_prepared_row.
 
-    @param      rows                    previous rows
     @param      data                    data as dictionaries
     @param      cache                   cache events
     @param      last_key                last seen key
     @param      set_expected_answers    set of expected answers,
                                         adds a field if one is found
+    @param      hasher                  @see cl PersonIdHasher or None
+    @param      fields                  set of fields to keep or None for all
     @return                             iterator on clean rows
     """
-    def comma_semi(st):
-        if st is None:
-            return {}
-        res = {}
-        for val in st.split(','):
-            spl = val.split(':')
-            if len(spl) == 1:
-                res[spl[0]] = True
-            elif len(spl) == 2:
-                res[spl[0]] = spl[1]
+    prepared = _prepare_row(data, set_expected_answers, hasher, fields)
+    if prepared is None:
+        return
+    for res in _apply_prepared_row(prepared, cache, last_key):
+        yield res
+
+
+def _enumerate_processed_record(data, cache, last_key, set_expected_answers,
+                                hasher=None, fields=None):
+    """
+    Same as @see fn _enumerate_processed_row but returns
+    @see cl QCMObservation. Every observation is a new object.
+    *set_expected_answers* is a set of @see cl FieldKey.
+    """
+    person = _person(data, hasher)
+    if person is None:
+        return
+    alias, person_id = person
+    time = data['time']
+    event = data.get('msg', None)
+    if event == 'qcm':
+        game, qn = data['game'], data['qn']
+        _enter_question(cache, last_key, (person_id, alias, game, qn), time)
+        yield QCMObservation(person_id, alias, time, 'begin', game, qn)
+        fields_obs = {}
+    elif event == "answer":
+        q = data.get('data', None)
+        game, qn = q['game'], q['qn']
+        fields_obs = {}
+        good = None
+        for k, v in q.items():
+            if k in {'qn', 'game', 'next', 'events'}:
+                fields_obs[field_key(None, None, k)] = v
             else:
-                raise ValueError(  # pragma: no cover
-                    "Unable to parse value '{0}'".format(st))
-        return res
+                keep = fields is None or k in fields
+                if not keep and fields is not None and 'good' not in fields:
+                    continue
+                key = field_key(game, qn, k)
+                if keep:
+                    fields_obs[key] = v
+                if key in set_expected_answers:
+                    good = 1
+                elif good is None:
+                    good = 0
+        nbvisit, duration = _leave_question(
+            cache, last_key, (person_id, alias, game, qn), time)
+        if fields is None or 'nbvisit' in fields:
+            fields_obs[field_key(game, qn, 'nbvisit')] = nbvisit
+        if fields is None or 'duration' in fields:
+            fields_obs[field_key(game, qn, 'duration')] = duration
+        if good is not None and (fields is None or 'good' in fields):
+            fields_obs[field_key(game, qn, 'good')] = good
+        yield QCMObservation(person_id, alias, time, 'end', game, qn,
+                             tuple(fields_obs.items()))
+    else:
+        return
 
-    def hash4alias(st):
-        by = st.encode("utf-8")
-        m = hashlib.sha256()
-        m.update(by)
-        res = m.hexdigest()
-        return res[:20] if len(res) > 20 else res
+    if fields is not None and 'events' not in fields:
+        return
+    events = _events_list(data)
+    if events is not None:
+        for ev in events:
+            for k, v in _comma_semi(ev).items():
+                fields_obs[field_key(None, None, k)] = v
+            yield QCMObservation(person_id, alias, time, 'event', game, qn,
+                                 tuple(fields_obs.items()))
 
-    session = data.get('session', None)
-    ipadd = data.get('client', ['NN.NN.NN.NN'])[0]
-    if ipadd is None:
-        raise ValueError(  # pragma: no cover
-            "Unable to extract an ip address from {0}".format(data))
-    keys = {'qn', 'game', 'next', 'events'}
-    if session is not None:  # pylint: disable=R1702
-        alias = session['alias']
-        person_id = hash4alias(alias + ipadd)
-
-        res = dict(person_id=person_id, alias=alias, time=data['time'])
-        event = data.get('msg', None)
-        if event == 'qcm':
-            res['qtime'] = 'begin'
-            key = person_id, alias, data['game'], data['qn']
-            if key not in cache:
-                cache[key] = []
-            cache[key].append((data['time'], 'enter'))
-            if len(last_key) > 0:
-                cache[last_key[0]].append((data['time'], 'leave'))
-                last_key.clear()
-            last_key.append(key)
-            yield res
 
-            events = data.get('events', None)
-            res0 = res.copy()
-            res0['qtime'] = 'event'
-            if events is not None:
-                if not isinstance(events, list):
-                    events = [events]
-                res = res0.copy()
-                for event in events:
-                    ev = comma_semi(event)
-                    res.update(ev)
-                    yield res
-
-        elif event == "answer":
-            res["qtime"] = 'end'
-            q = data.get('data', None)
-            good = {}
-            if q is not None:
-                qn = q['qn']
-                game = q['game']
-                q2 = {}
-                for k, v in q.items():
-                    if k in keys:
-                        q2[k] = v
-                    else:
-                        key = "{0}-{1}-{2}".format(game, qn, k)
-                        q2[key] = v
-                        key_short = "{0}-{1}".format(game, qn)
-                        if key in set_expected_answers:
-                            good[key_short] = 1
-                        elif key_short not in good:
-                            good[key_short] = 0
-
-                res.update(q2)
-            key = person_id, alias, q['game'], q['qn']
-            if key not in cache:
-                cache[key] = []
-            cache[key].append((data['time'], 'leave'))
-            duration = _duration(cache[key])
-            res["{0}-{1}-{2}".format(
-                game, qn, 'nbvisit')] = len(cache[key]) * 0.5
-            res["{0}-{1}-{2}".format(game, qn, 'duration')] = duration
-            for k, v in good.items():
-                res[k + '-good'] = v
-            last_key.clear()
-            yield res
+def _enumerate_parsed_lines(files, chunk_size=2 ** 20, parser=None,
+                            msgs=None):
+    """
+    Parses every line of every file sequentially,
+    files written by @see cl EventSink do not need any parsing.
 
-            events = data.get('events', None)
-            res0 = res.copy()
-            res0['qtime'] = 'event'
-            if events is not None:
-                if not isinstance(events, list):
-                    events = [events]
-                res = res0.copy()
-                for event in events:
-                    ev = comma_semi(event)
-                    res.update(ev)
-                    yield res
+    :param files: list of filenames
+    :param chunk_size: number of bytes read at once
+    :param parser: @see cl QCMLogLineParser or None
+    :param msgs: only keeps these messages, None for all
+    :return: iterator on dictionaries
+    """
+    parse = parse_qcmlog_line if parser is None else parser.parse
+    for name in files:
+        if is_binlog(name):
+            rows = enumerate_binlog_records(name, chunk_size=chunk_size)
+        else:
+            lines = enumerate_log_lines(name, chunk_size=chunk_size)
+            if msgs is not None:
+                lines = filter_qcmlog_lines(lines, msgs)
+            rows = map(parse, lines)
+        for data in rows:
+            if data is None:
+                continue
+            if msgs is not None and data.get('msg', None) not in msgs:
+                continue
+            yield data
+
+
+def _set_expected_answers(expected_answers):
+    """
+    Returns the set of the expected answers.
+    """
+    set_expected_answers = set()
+    if expected_answers is not None:
+        for a in expected_answers:
+            for _ in a:
+                set_expected_answers.add(_)
+    return set_expected_answers
 
 
-def enumerate_qcmlog(files, expected_answers=None):
+def enumerate_qcmlog(files, expected_answers=None, chunk_size=2 ** 20,
+                     n_jobs=1, shard_size=2 ** 26, as_records=False,
+                     parser=None, hasher=None, msgs=None, fields=None):
     """
     Processes many files of logs produced by application
-    @see cl QCMApp.
+    @see cl QCMApp, text logs or binary events
+    (see @see cl EventSink). Files are read by chunks
+    (see @see fn enumerate_log_lines), the memory
+    does not grow with the size of the logs.
+    If *n_jobs* is not 1, the files are split into byte ranges
+    parsed by a pool of processes
+    (see @see fn enumerate_parsed_shards) which also build
+    the observations (except if *as_records* is True).
+    The durations are still computed in the main process
+    in the order of the files so that the output does not
+    depend on *n_jobs*, the observations are not sorted by time.
 
     :param files: list of filenames
     :param expected_answers: expected answers
+    :param chunk_size: number of bytes read at once
+    :param n_jobs: number of processes parsing the logs,
+        None for all the cores
+    :param shard_size: approximative size of the byte ranges
+        processed by every process (if *n_jobs* is not 1)
+    :param as_records: returns @see cl QCMObservation instead of
+        dictionaries, keys are interned @see cl FieldKey
+        and no string is formatted for every observation,
+        ``obs.to_dict()`` returns the dictionary
+    :param parser: @see cl QCMLogLineParser, it decides what to do
+        with a line which cannot be parsed and counts the repairs,
+        None raises an exception on the first malformed line
+    :param hasher: @see cl PersonIdHasher which computes *person_id*
+        from the alias and the IP address (memoized, optionally keyed),
+        None for a default one shared by every call
+    :param msgs: only processes the lines with these messages (key *msg*),
+        None for all, the other lines are removed before being decoded
+        (see @see fn filter_qcmlog_lines), only messages ``'qcm'``
+        and ``'answer'`` produce observations, ``('qcm', 'answer')``
+        returns the same observations and skips the other lines
+    :param fields: only keeps these fields, None for all,
+        see @see fn enumerate_qcmlog_parsed
     :return: iterator on observations as dictionary
 
     Example of data it processes::
@@ -170,61 +393,89 @@ def enumerate_qcmlog(files, expected_answers=None):
         2018-12-12 17:56:54,208,INFO,[DATA],{"msg":"event","session":{"alias":"xavierd"},"events":["game:simple_french_qcm,qn:3"]}
         2018-12-12 17:56:54,239,INFO,[DATA],{"msg":"event","session":{"alias":"xavierd"},"events":["game:simple_french_qcm,qn:3"]}
     """
-    set_expected_answers = set()
-    if expected_answers is not None:
-        for a in expected_answers:
-            for _ in a:
-                set_expected_answers.add(_)
+    if msgs is not None:
+        msgs = frozenset(msgs)
+    if n_jobs == 1:
+        parsed = _enumerate_parsed_lines(
+            files, chunk_size=chunk_size, parser=parser, msgs=msgs)
+    elif as_records:
+        parsed = enumerate_parsed_shards(
+            files, n_jobs=n_jobs, shard_size=shard_size,
+            chunk_size=chunk_size, parser=parser, msgs=msgs)
+    else:
+        # the workers build the observations, the main process
+        # only computes the durations in the order of the logs
+        prepare = partial(
+            _prepare_row,
+            set_expected_answers=_set_expected_answers(expected_answers),
+            hasher=hasher,
+            fields=None if fields is None else frozenset(fields))
+        cache, last_key = {}, []
+        for prepared in enumerate_parsed_shards(
+                files, n_jobs=n_jobs, shard_size=shard_size,
+                chunk_size=chunk_size, parser=parser, msgs=msgs,
+                prepare=prepare):
+            for obs in _apply_prepared_row(prepared, cache, last_key):
+                yield obs
+        return
+    for obs in enumerate_qcmlog_parsed(parsed, expected_answers,
+                                       as_records=as_records, hasher=hasher,
+                                       fields=fields):
+        yield obs
+
+
+def enumerate_qcmlog_parsed(parsed, expected_answers=None,
+                            cache=None, last_key=None, as_records=False,
+                            hasher=None, fields=None):
+    """
+    Converts parsed lines (see @see fn parse_qcmlog_line)
+    into observations, it is the second step of
+    @see fn enumerate_qcmlog. *cache* and *last_key*
+    keep the necessary information to compute the durations,
+    they can be given to continue a previous processing.
 
-    rows = []
-    cache = {}
-    last_key = []
-    for name in files:
-        if len(rows) > 1000:
-            rows = rows[-1000:]
-        with open(name, "r", encoding="utf-8") as f:
-            for line in f.readlines():
-                if "[DATA]" not in line:
-                    continue
-                line = line.strip("\n\r")
-                spl = line.split(",INFO,[DATA],")
-                ti = spl[0]
-                sdata = ",INFO,[DATA],".join(spl[1:])
-                try:
-                    data = ujson.loads(sdata)  # pylint: disable=E1101
-                except ValueError:
-                    if '"' not in sdata and "'" in sdata:
-                        sdata2 = sdata.replace("'", '"')
-                        try:
-                            data = ujson.loads(sdata2)  # pylint: disable=E1101
-                        except ValueError:
-                            if '"msg": "finish"' in sdata2:
-                                # Fix the code somewhere else.
-                                sdata3 = sdata2.replace(
-                                    '"client": ("', '"client": ["')
-                                sdata3 = sdata3.replace(
-                                    '), "data": QueryParams', '], "data": QueryParams')
-                                sdata3 = re.sub(
-                                    'QueryParams\\(\\"game=([a-z_]+)\\"\\)', '{"game":"\\1"}', sdata3)
-                                try:
-                                    data = ujson.loads(  # pylint: disable=E1101
-                                        sdata3)
-                                except ValueError as e:
-                                    raise ValueError(
-                                        "Unable to process line\n{}\n{}\n{}".format(
-                                            sdata, sdata2, sdata3)) from e
-                            else:
-                                raise ValueError(
-                                    "Unable to process line\n{}\n{}".format(
-                                        sdata, sdata2)) from e
-
-                tid = datetime.strptime(ti, '%Y-%m-%d %H:%M:%S,%f')
-                data['time'] = tid
-                obss = _enumerate_processed_row(
-                    rows, data, cache, last_key, set_expected_answers)
-                for obs in obss:
-                    yield obs
-                rows.append(data)
+    :param parsed: iterator on dictionaries
+    :param expected_answers: expected answers
+    :param cache: dictionary, modified inplace (None for a new one)
+    :param last_key: list, modified inplace (None for a new one)
+    :param as_records: returns @see cl QCMObservation instead
+        of dictionaries
+    :param hasher: @see cl PersonIdHasher which computes *person_id*,
+        None for a default one shared by every call
+    :param fields: None for every field, otherwise the names of the
+        fields to keep: ``'good'``, ``'duration'``, ``'nbvisit'``,
+        the name of an answer (``'a0'``, ``'b'``...), ``'events'`` keeps
+        the observations created from the events,
+        *person_id*, *alias*, *time*, *qtime*, *game*, *qn*, *next*
+        are always kept, the other fields are not built
+    :return: iterator on observations as dictionary
+    """
+    if fields is not None:
+        fields = frozenset(fields)
+    set_expected_answers = _set_expected_answers(expected_answers)
+
+    if cache is None:
+        cache = {}
+    if last_key is None:
+        last_key = []
+
+    if as_records:
+        expected_keys = set()
+        for name in set_expected_answers:
+            spl = name.rsplit('-', 2)
+            if len(spl) == 3:
+                expected_keys.add(field_key(*spl))
+        for data in parsed:
+            for obs in _enumerate_processed_record(
+                    data, cache, last_key, expected_keys, hasher, fields):
+                yield obs
+        return
+
+    for data in parsed:
+        obss = _enumerate_processed_row(
+            data, cache, last_key, set_expected_answers, hasher, fields)
+        for obs in obss:
+            yield obs
 
 
 def _aggnotnan_serie(values):
@@ -267,13 +518,35 @@ def _aggnotnan(values):
     return df
 
 
-def enumerate_qcmlogdf(files, expected_answers=None):
+def enumerate_qcmlogdf(files, expected_answers=None, n_jobs=1,
+                       max_idle_rows=500, max_idle_time=None,
+                       consolidate=False, games=None, parser=None,
+                       hasher=None):
     """
     Processes many files of logs produced by application
-    @see cl QCMApp in dataframe.
+    @see cl QCMApp in dataframe. The function returns
+    the dataframe of a person once this person is idle:
+    no new observation in the last *max_idle_rows* observations
+    or, if *max_idle_time* is specified, during *max_idle_time*.
+    If *consolidate* is True, the function returns only one dataframe
+    with one row per person built in a single pass
+    (see @see fn qcmlog_wide_dataframe).
 
     :param files: list of filenames
-    :param expected_answers: expected answers
+    :param expected_answers: expected answers, if None and *games*
+        is specified, the expected answers are given by the games
+    :param n_jobs: number of processes parsing the logs,
+        see @see fn enumerate_qcmlog
+    :param max_idle_rows: number of observations
+    :param max_idle_time: duration (seconds or *timedelta*),
+        replaces *max_idle_rows* if not None
+    :param consolidate: returns one dataframe for all persons
+    :param games: list of @see cl ActivityGroup, used to
+        allocate the columns if *consolidate* is True
+    :param parser: @see cl QCMLogLineParser,
+        see @see fn enumerate_qcmlog
+    :param hasher: @see cl PersonIdHasher,
+        see @see fn enumerate_qcmlog
     :return: iterator on observations as dictionary
 
     Example of data it processes::
@@ -300,29 +573,57 @@ def enumerate_qcmlogdf(files, expected_answers=None):
         cols2 = [c for c in df2.columns if select_name(c)]
         cols2.sort()
         df_question = df2[cols + cols2]
-        gr_ans = df_question.groupby("person_id").agg(_aggnotnan)
+        gr_ans = aggregate_notnan(df_question, "person_id")
         return gr_ans
 
+    if expected_answers is None and games is not None:
+        expected_answers = []
+        for game in games:
+            expected_answers.extend(game.expected_answers())
+    if consolidate:
+        yield qcmlog_wide_dataframe(
+            enumerate_qcmlog(files, expected_answers, n_jobs=n_jobs,
+                             parser=parser, hasher=hasher),
+            games=games)
+        return
+
+    if max_idle_time is not None and not isinstance(max_idle_time, timedelta):
+        max_idle_time = timedelta(seconds=max_idle_time)
+
     stack = {}
-    index = {}
-    for i, row in enumerate(enumerate_qcmlog(files, expected_answers)):
+    # persons sorted by last seen row, the first one is the oldest
+    index = OrderedDict()
+    first_seen = {}
+    for i, row in enumerate(enumerate_qcmlog(
+            files, expected_answers, n_jobs=n_jobs, parser=parser,
+            hasher=hasher)):
 
         person_id = row.get('person_id', None)
         if person_id is None:
             continue
 
-        index[person_id] = i
+        index[person_id] = (i, row['time'])
+        index.move_to_end(person_id)
         if person_id not in stack:
             stack[person_id] = []
+            first_seen[person_id] = i
         stack[person_id].append(row)
 
         rem = []
-        for k, ind in index.items():
-            if i - ind > 500:
-                rem.append(k)
+        for k, (ind, last) in index.items():
+            if max_idle_time is None:
+                if i - ind <= max_idle_rows:
+                    break
+            elif row['time'] - last <= max_idle_time:
+                break
+            rem.append(k)
+        for k in rem:
+            del index[k]
+        if len(rem) > 1:
+            rem.sort(key=first_seen.__getitem__)
         for k in rem:
             yield prepare_df(stack[k])
             del stack[k]
-            del index[k]
+            del first_seen[k]
     for k, rows in stack.items():
         yield prepare_df(rows)
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Statistics for every question computed in one pass
+over the observations extracted from the logs.
+"""
+import math
+from datetime import timedelta
+import numpy
+import pandas
+from .records import QCMObservation
+
+# _duration returns this value when a question is left without being entered
+_UNKNOWN_DURATION = timedelta(days=1)
+
+
+class QuantileSketch:
+    """
+    Estimates quantiles of positive values in one pass
+    with a bounded memory. Values are counted in buckets
+    whose bounds grow geometrically, every estimated quantile
+    is within a relative error *relative_accuracy* of a true value
+    (same idea as *DDSketch*). The number of buckets only depends on
+    the ratio between the greatest and the smallest values,
+    about 1000 buckets for durations between one millisecond and one day
+    with the default accuracy.
+
+    :param relative_accuracy: relative accuracy
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(
+                "relative_accuracy must be in ]0, 1[ not {0}".format(
+                    relative_accuracy))
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zeros = 0
+        self.count = 0
+        self.sum = 0.
+        self.min = None
+        self.max = None
+
+    def add(self, x):
+        """
+        Adds a value (negative values are counted as 0).
+        """
+        if x > 0:
+            k = math.ceil(math.log(x) / self.log_gamma)
+            self.bins[k] = self.bins.get(k, 0) + 1
+        else:
+            x = 0.
+            self.zeros += 1
+        self.count += 1
+        self.sum += x
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        """
+        Adds the values counted by another sketch
+        with the same accuracy.
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Both sketches must have the same accuracy.")
+        for k, v in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + v
+        self.zeros += other.zeros
+        self.count += other.count
+        self.sum += other.sum
+        for v in [other.min, other.max]:
+            if v is None:
+                continue
+            if self.min is None or v < self.min:
+                self.min = v
+            if self.max is None or v > self.max:
+                self.max = v
+
+    def quantile(self, q):
+        """
+        Returns the estimated quantile *q* (in [0, 1]),
+        nan if the sketch is empty.
+        """
+        if self.count == 0:
+            return numpy.nan
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return 0.
+        seen = self.zeros
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen > rank:
+                value = 2 * self.gamma ** k / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max  # pragma: no cover
+
+    def mean(self):
+        """
+        Returns the mean, nan if the sketch is empty.
+        """
+        return self.sum / self.count if self.count > 0 else numpy.nan
+
+
+class _QuestionCounter:
+    """
+    Counters for one question.
+    """
+
+    def __init__(self, relative_accuracy):
+        self.n = 0
+        self.ngood = 0
+        self.good = 0
+        self.skip = 0
+        self.revisit = 0
+        self.durations = QuantileSketch(relative_accuracy)
+
+    def add(self, good, button, nbvisit, duration):
+        "Counts one answer."
+        self.n += 1
+        if good is not None:
+            self.ngood += 1
+            self.good += good
+        if button == 'skip':
+            self.skip += 1
+        if nbvisit is not None and nbvisit > 1:
+            self.revisit += 1
+        if isinstance(duration, timedelta) and duration != _UNKNOWN_DURATION:
+            self.durations.add(duration.total_seconds())
+
+
+class QuestionStats:
+    """
+    Computes statistics for every question in one pass over
+    the observations produced by @see fn enumerate_qcmlog
+    (dictionaries or @see cl QCMObservation), only the answers
+    (``qtime == 'end'``) are considered. The memory only depends
+    on the number of questions. For every game and every question:
+
+    * *n*: number of answers,
+    * *accuracy*: proportion of good answers, *expected_answers*
+      must be given to @see fn enumerate_qcmlog otherwise every answer
+      is considered as wrong, nan if no answer can be checked,
+    * *skip_rate*: proportion of answers with button ``skip``,
+    * *revisit_rate*: proportion of answers given after
+      visiting the question more than once,
+    * *duration_mean*, *duration_q<p>*: mean and quantiles
+      of the time spent on the question (seconds), unknown durations
+      are excluded, quantiles are estimated with @see cl QuantileSketch.
+
+    :param quantiles: quantiles to estimate
+    :param relative_accuracy: relative accuracy of the quantiles
+
+    ::
+
+        from mathenjeu.datalog import enumerate_qcmlog, QuestionStats
+
+        stats = QuestionStats()
+        stats.update(enumerate_qcmlog(["QCMApp.log"], expected_answers))
+        print(stats.to_dataframe())
+    """
+
+    def __init__(self, quantiles=(0.5, 0.9), relative_accuracy=0.01):
+        self.quantiles = tuple(quantiles)
+        self.relative_accuracy = relative_accuracy
+        self.counters = {}
+
+    def _counter(self, game, qn):
+        key = (game, qn)
+        counter = self.counters.get(key, None)
+        if counter is None:
+            counter = _QuestionCounter(self.relative_accuracy)
+            self.counters[key] = counter
+        return counter
+
+    def add(self, obs):
+        """
+        Processes one observation.
+        """
+        if isinstance(obs, QCMObservation):
+            if obs.qtime != 'end' or obs.game is None or obs.qn is None:
+                return
+            values = {k.field: v for k, v in obs.fields
+                      if k.game == obs.game and k.qn == obs.qn}
+            self._counter(obs.game, obs.qn).add(
+                values.get('good', None), values.get('b', None),
+                values.get('nbvisit', None), values.get('duration', None))
+            return
+        if obs.get('qtime', None) != 'end':
+            return
+        game = obs.get('game', None)
+        qn = obs.get('qn', None)
+        if game is None or qn is None:
+            return
+        prefix = "{0}-{1}-".format(game, qn)
+        self._counter(game, str(qn)).add(
+            obs.get(prefix + 'good', None), obs.get(prefix + 'b', None),
+            obs.get(prefix + 'nbvisit', None),
+            obs.get(prefix + 'duration', None))
+
+    def update(self, observations):
+        """
+        Processes many observations.
+
+        :param observations: iterator on observations
+        :return: self
+        """
+        for obs in observations:
+            self.add(obs)
+        return self
+
+    def to_dataframe(self):
+        """
+        Returns the statistics, one row per question,
+        sorted by game and question number.
+
+        :return: dataframe indexed by *game*, *qn*
+        """
+        def sort_key(key):
+            game, qn = key
+            return (game, 0, int(qn), '') if qn.isdigit() else (game, 1, 0, qn)
+
+        rows = []
+        keys = sorted(self.counters, key=sort_key)
+        for key in keys:
+            c = self.counters[key]
+            row = dict(n=c.n,
+                       accuracy=c.good / c.ngood if c.ngood > 0 else numpy.nan,
+                       skip_rate=c.skip / c.n, revisit_rate=c.revisit / c.n,
+                       duration_mean=c.durations.mean())
+            for q in self.quantiles:
+                row["duration_q%d" % int(round(q * 100))] = \
+                    c.durations.quantile(q)
+            rows.append(row)
+        columns = ['n', 'accuracy', 'skip_rate', 'revisit_rate',
+                   'duration_mean'] + ["duration_q%d" % int(round(q * 100))
+                                       for q in self.quantiles]
+        index = pandas.MultiIndex.from_tuples(keys, names=['game', 'qn']) \
+            if keys else pandas.MultiIndex.from_arrays([[], []],
+                                                       names=['game', 'qn'])
+        return pandas.DataFrame(rows, index=index, columns=columns)
+
+
+def qcmlog_question_stats(observations, quantiles=(0.5, 0.9),
+                          relative_accuracy=0.01):
+    """
+    Computes statistics for every question in one pass
+    over observations produced by @see fn enumerate_qcmlog,
+    see @see cl QuestionStats.
+
+    :param observations: iterator on observations
+    :param quantiles: quantiles to estimate
+    :param relative_accuracy: relative accuracy of the quantiles
+    :return: dataframe indexed by *game*, *qn*
+    """
+    stats = QuestionStats(quantiles=quantiles,
+                          relative_accuracy=relative_accuracy)
+    return stats.update(observations).to_dataframe()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Compact representation of the observations produced by
+@see fn enumerate_qcmlog.
+"""
+import sys
+from collections import namedtuple
+
+
+class FieldKey(namedtuple('FieldKey', ['game', 'qn', 'field'])):
+    """
+    Name of a field of an observation split into its components,
+    *game* and *qn* are None for a field which is not related
+    to a question such as ``'next'`` or ``'focus'``.
+    Keys are interned, see @see fn field_key.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        "Returns the name used by the dictionaries."
+        if self.game is None:
+            return self.field
+        return "{0}-{1}-{2}".format(self.game, self.qn, self.field)
+
+
+_keys = {}
+
+
+def field_key(game, qn, field):
+    """
+    Returns the unique @see cl FieldKey for these components,
+    the same object is returned for the same components.
+
+    :param game: game name or None
+    :param qn: question number or None
+    :param field: field name
+    :return: @see cl FieldKey
+    """
+    t = (game, qn, field)
+    key = _keys.get(t, None)
+    if key is None:
+        key = FieldKey(
+            None if game is None else sys.intern(str(game)),
+            None if qn is None else sys.intern(str(qn)),
+            sys.intern(str(field)))
+        _keys[t] = key
+    return key
+
+
+class QCMObservation:
+    """
+    One observation produced by @see fn enumerate_qcmlog
+    when *as_records* is True. Attributes *game*, *qn* indicate
+    the question the observation is about (None if unknown),
+    *fields* is a tuple of pairs ``(FieldKey, value)``.
+    """
+    __slots__ = ('person_id', 'alias', 'time', 'qtime', 'game', 'qn',
+                 'fields')
+
+    def __init__(self, person_id, alias, time, qtime, game=None, qn=None,
+                 fields=()):
+        self.person_id = person_id
+        self.alias = alias
+        self.time = time
+        self.qtime = qtime
+        self.game = game
+        self.qn = qn
+        self.fields = fields
+
+    def __repr__(self):
+        "usual"
+        return "{0}({1!r}, {2!r}, {3!r}, {4!r}, game={5!r}, qn={6!r}, fields={7!r})".format(
+            self.__class__.__name__, self.person_id, self.alias, self.time,
+            self.qtime, self.game, self.qn, self.fields)
+
+    def __eq__(self, other):
+        "usual"
+        if not isinstance(other, QCMObservation):
+            return False
+        return all(getattr(self, k) == getattr(other, k)
+                   for k in self.__slots__)
+
+    def __hash__(self):
+        "usual"
+        return hash((self.person_id, self.time, self.qtime))
+
+    def to_dict(self):
+        """
+        Returns the dictionary @see fn enumerate_qcmlog would return
+        for this observation.
+        """
+        res = dict(person_id=self.person_id, alias=self.alias,
+                   time=self.time, qtime=self.qtime)
+        for k, v in self.fields:
+            res[str(k)] = v
+        return res
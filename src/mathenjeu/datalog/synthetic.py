@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Generates synthetic logs similar to the logs
+produced by application @see cl QCMApp.
+"""
+import heapq
+import random
+from datetime import datetime, timedelta
+import ujson
+from .lineparser import DATA_SEP
+
+#: Games played by default by the synthetic students.
+SYNTHETIC_GAMES = ('simple_french_qcm', 'simple_cinema_qcm', 'ml_french_qcm')
+
+_wrong_texts = ['Pythagore', 'Euclide', 'Archimède', 'Astérix']
+
+
+def _get_games(games):
+    """
+    Returns a list of @see cl ActivityGroup, *games* may contain
+    names (see @see fn get_game).
+    """
+    from ..tests import get_game  # pylint: disable=C0415
+    if games is None:
+        games = SYNTHETIC_GAMES
+    return [get_game(g) if isinstance(g, str) else g for g in games]
+
+
+def _game_questions(game):
+    """
+    Returns the name of the game and, for every question,
+    the number of choices (None for a free text)
+    and the expected fields.
+    """
+    name = game.Name
+    prefix = len(name) + 1
+    res = []
+    for qn, expected in enumerate(game.expected_answers()):
+        answers = game[qn].Answers
+        fields = [e[prefix + len(str(qn)) + 1:] for e in expected]
+        res.append((None if answers is None else len(answers), fields))
+    return name, res
+
+
+def _dumps(msg, alias, client, **kwargs):
+    data = dict(msg=msg, session=dict(alias=alias), client=client)
+    data.update(kwargs)
+    return ujson.dumps(data)  # pylint: disable=E1101
+
+
+def _legacy(msg, alias, client, **kwargs):
+    """
+    Writes a line the way the first versions of the application did,
+    with :epkg:`Python` representation and not :epkg:`json`.
+    """
+    if msg == 'finish':
+        return "{{'msg': 'finish', 'session': {{'alias': '{0}'}}, " \
+               "'client': ('{1}', {2}), 'data': QueryParams('game={3}')}}".format(
+                   alias, client[0], client[1], kwargs['game'])
+    data = dict(msg=msg, session=dict(alias=alias), client=client)
+    data.update(kwargs)
+    return str(data)
+
+
+def _enumerate_student(rnd, alias, start, questions, think_time,
+                       focus_events, skip_rate, revisit_rate, legacy_rate):
+    """
+    Yields the lines ``(seconds, data)`` of one student
+    playing every game, *seconds* is relative to the beginning
+    of the logs, times are increasing.
+    """
+    t = start
+    ip = "10.{0}.{1}.{2}".format(rnd.randint(0, 255), rnd.randint(0, 255),
+                                 rnd.randint(1, 254))
+
+    def client():
+        return [ip, rnd.randint(1024, 65535)]
+
+    def line(msg, **kwargs):
+        if legacy_rate > 0 and msg in ('event', 'finish') and \
+                rnd.random() < legacy_rate:
+            return _legacy(msg, alias, client(), **kwargs)
+        if msg == 'finish':
+            kwargs = dict(data=["game"])
+        return _dumps(msg, alias, client(), **kwargs)
+
+    ability = rnd.uniform(0.3, 0.95)
+    yield t, _dumps('home-logged', alias, client())
+    for name, game in questions:
+        for qn, (nb, expected) in enumerate(game):
+            visits = 2 if rnd.random() < revisit_rate else 1
+            for visit in range(visits):
+                t += rnd.uniform(0.05, 2.)
+                yield t, line('qcm', game=name, qn=str(qn))
+                nbev = int(rnd.expovariate(1. / focus_events)) \
+                    if focus_events > 0 else 0
+                for _ in range(nbev):
+                    t += rnd.expovariate(1. / think_time) / (nbev + 1)
+                    yield t, line('event', events=[
+                        "focus:true,game:{0},qn:{1}".format(name, qn)])
+                t += rnd.expovariate(1. / think_time)
+                data = {}
+                events = []
+                skip = visit < visits - 1 or rnd.random() < skip_rate
+                if nb is None:
+                    if not skip or rnd.random() < 0.5:
+                        data['ANS'] = " " + (
+                            expected[0] if expected and rnd.random() < ability
+                            else rnd.choice(_wrong_texts))
+                else:
+                    if expected and rnd.random() < ability:
+                        checked = expected
+                    else:
+                        checked = ["a%d" % i for i in sorted(rnd.sample(
+                            range(nb), rnd.randint(1, min(2, nb))))]
+                    if skip and rnd.random() < 0.5:
+                        checked = []
+                    for c in checked:
+                        data[c] = "on"
+                        events.append("-{0},on".format(c))
+                data['b'] = 'skip' if skip else 'ok'
+                data['game'] = name
+                data['qn'] = str(qn)
+                data['next'] = str(qn + 1) if qn + 1 < len(game) else "None"
+                if events:
+                    data['events'] = "".join(events)
+                yield t, line('answer', data=data)
+        t += rnd.uniform(0.01, 0.1)
+        yield t, line('finish', game=name)
+        t += rnd.uniform(0.5, 5.)
+        yield t, _dumps('home-logged', alias, client())
+
+
+def enumerate_synthetic_qcmlog_lines(  # pylint: disable=R0913,R0914
+        nb_lines=None, nb_students=None, games=None, seed=0, begin=None,
+        arrival=5., think_time=10., focus_events=3., skip_rate=0.1,
+        revisit_rate=0.05, legacy_rate=0.01, malformed_rate=0.001):
+    """
+    Generates logs similar to the logs produced by application
+    @see cl QCMApp. Students arrive one after another and play
+    every game: they see every question (message ``qcm``),
+    the page sends focus events (message ``event``), they answer
+    or skip the question (message ``answer``, a good answer
+    depends on the ability of the student), then they finish
+    the game (message ``finish``). The lines of the students
+    playing at the same time are interleaved by time.
+    Some lines are written with the format of the first
+    versions of the application (single quotes, ``QueryParams``),
+    @see fn parse_qcmlog_line repairs them, some lines are cut
+    as if the application had been stopped while writing them,
+    they cannot be parsed and require a parser ignoring them
+    (see @see cl QCMLogLineParser). The output only depends on
+    the parameters.
+
+    :param nb_lines: number of lines to generate, None to stop
+        when the *nb_students* students have finished
+    :param nb_students: number of students,
+        None to stop after *nb_lines* lines
+    :param games: list of games (names or @see cl ActivityGroup)
+        taken from :mod:`mathenjeu.tests.qcms`,
+        None for *SYNTHETIC_GAMES*
+    :param seed: random seed
+    :param begin: time of the first line (*datetime*),
+        None for ``2018-12-12 08:00:00``
+    :param arrival: average time between two students (seconds)
+    :param think_time: average time spent on a question (seconds)
+    :param focus_events: average number of focus events per question
+    :param skip_rate: probability to skip a question
+    :param revisit_rate: probability to see a question twice
+    :param legacy_rate: probability to write an event
+        with the legacy format
+    :param malformed_rate: probability to cut a line
+    :return: iterator on lines (without end of line)
+
+    ::
+
+        from mathenjeu.datalog import enumerate_synthetic_qcmlog_lines
+
+        for line in enumerate_synthetic_qcmlog_lines(nb_lines=5):
+            print(line)
+    """
+    if nb_lines is None and nb_students is None:
+        raise ValueError("nb_lines or nb_students must be specified")
+    if begin is None:
+        begin = datetime(2018, 12, 12, 8, 0, 0)
+    questions = [_game_questions(g) for g in _get_games(games)]
+    rnd = random.Random(seed)
+    cut = random.Random(seed + 1)
+
+    heap = []
+    next_student = 0
+    next_start = 0.
+    nb = 0
+    last_sec = None
+    prefix = None
+    while True:
+        while (nb_students is None or next_student < nb_students) and (
+                not heap or next_start <= heap[0][0]):
+            gen = _enumerate_student(
+                random.Random(seed * 1000003 + next_student),
+                "s{0:07d}".format(next_student), next_start, questions,
+                think_time, focus_events, skip_rate, revisit_rate,
+                legacy_rate)
+            first = next(gen, None)
+            if first is not None:
+                heapq.heappush(heap, (first[0], next_student, first[1], gen))
+            next_student += 1
+            next_start += rnd.expovariate(1. / arrival)
+        if not heap:
+            break
+
+        t, i, data, gen = heap[0]
+        sec = int(t)
+        if sec != last_sec:
+            last_sec = sec
+            prefix = (begin + timedelta(seconds=sec)).strftime(
+                "%Y-%m-%d %H:%M:%S")
+        if malformed_rate > 0 and cut.random() < malformed_rate:
+            data = data[:len(data) // 2]
+        yield "{0},{1:03d}{2}{3}".format(
+            prefix, int((t - sec) * 1000), DATA_SEP, data)
+        nb += 1
+        if nb_lines is not None and nb >= nb_lines:
+            break
+
+        nxt = next(gen, None)
+        if nxt is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (nxt[0], i, nxt[1], gen))
+
+
+def write_synthetic_qcmlog(filename, nb_lines=None, nb_students=None,
+                           buffer_size=10000, **kwargs):
+    """
+    Writes synthetic logs into a file
+    (see @see fn enumerate_synthetic_qcmlog_lines).
+
+    :param filename: destination
+    :param nb_lines: number of lines
+    :param nb_students: number of students
+    :param buffer_size: number of lines written at once
+    :param kwargs: see @see fn enumerate_synthetic_qcmlog_lines
+    :return: number of written lines
+    """
+    nb = 0
+    buffer = []
+    with open(filename, "w", encoding="utf-8") as f:
+        for line in enumerate_synthetic_qcmlog_lines(
+                nb_lines=nb_lines, nb_students=nb_students, **kwargs):
+            buffer.append(line)
+            if len(buffer) >= buffer_size:
+                f.write("\n".join(buffer))
+                f.write("\n")
+                nb += len(buffer)
+                buffer = []
+        if buffer:
+            f.write("\n".join(buffer))
+            f.write("\n")
+            nb += len(buffer)
+    return nb
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Parses the time prefix of the logs produced by application
+@see cl QCMApp, ``2018-12-12 17:56:42,833``.
+"""
+from datetime import datetime
+import numpy
+
+LOG_TIME_FORMAT = '%Y-%m-%d %H:%M:%S,%f'
+
+_hour_cache = {}
+
+
+def _parse_hour(prefix):
+    """
+    Parses ``2018-12-12 17`` and caches the result.
+    """
+    res = _hour_cache.get(prefix, None)
+    if res is None:
+        if (prefix[4] != '-' or prefix[7] != '-' or prefix[10] != ' ' or
+                not prefix[:4].isdigit() or not prefix[5:7].isdigit() or
+                not prefix[8:10].isdigit() or not prefix[11:13].isdigit()):
+            raise ValueError("Unexpected prefix '{0}'.".format(prefix))
+        res = (int(prefix[:4]), int(prefix[5:7]),
+               int(prefix[8:10]), int(prefix[11:13]))
+        if len(_hour_cache) >= 4096:
+            _hour_cache.clear()
+        _hour_cache[prefix] = res
+    return res
+
+
+def parse_log_time(ti):
+    """
+    Parses a time formatted as ``'%Y-%m-%d %H:%M:%S,%f'``
+    with milliseconds, the format used by module :epkg:`logging`.
+    The date and the hour are cached,
+    minutes, seconds and milliseconds are sliced.
+    The function falls back to :epkg:`datetime.strptime`
+    for any other format.
+
+    :param ti: string
+    :return: datetime
+    """
+    if len(ti) == 23 and ti[13] == ':' and ti[16] == ':' and ti[19] == ',':
+        mi, se, ms = ti[14:16], ti[17:19], ti[20:]
+        if mi.isdigit() and se.isdigit() and ms.isdigit():
+            try:
+                y, m, d, h = _parse_hour(ti[:13])
+                return datetime(y, m, d, h, int(mi), int(se), int(ms) * 1000)
+            except ValueError:
+                pass
+    return datetime.strptime(ti, LOG_TIME_FORMAT)
+
+
+def parse_log_times(values):
+    """
+    Converts many times formatted as ``'%Y-%m-%d %H:%M:%S,%f'``
+    into an array of type ``datetime64[ms]`` in one call to :epkg:`numpy`.
+    Values in another format are converted with @see fn parse_log_time.
+
+    :param values: list or array of strings
+    :return: array of ``datetime64[ms]``
+    """
+    arr = numpy.asarray(values, dtype=str)
+    res = numpy.empty(arr.shape, dtype='datetime64[ms]')
+    if arr.size == 0:
+        return res
+    flat = arr.ravel()
+    res_flat = res.ravel()
+    chars = flat.astype('U23').view('U1').reshape((flat.shape[0], 23))
+    good = ((numpy.char.str_len(flat) == 23) & (chars[:, 4] == '-') &
+            (chars[:, 7] == '-') & (chars[:, 10] == ' ') &
+            (chars[:, 13] == ':') & (chars[:, 16] == ':') &
+            (chars[:, 19] == ','))
+    if good.any():
+        iso = chars[good].copy()
+        iso[:, 10] = 'T'
+        iso[:, 19] = '.'
+        try:
+            res_flat[good] = iso.view('U23').ravel().astype('datetime64[ms]')
+        except ValueError:
+            # One value cannot be parsed, every one is parsed
+            # with the slow path.
+            good[:] = False
+    for i in numpy.where(~good)[0]:
+        res_flat[i] = numpy.datetime64(parse_log_time(flat[i]), 'ms')
+    return res
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+@file
+@brief Builds one wide dataframe, one row per person,
+from the observations extracted from the logs.
+"""
+from datetime import timedelta
+import numpy
+import pandas
+from .aggregation import _sum_or_zero
+
+_NONE, _NUM, _STR, _TD, _OTHER = 0, 1, 2, 3, 4
+
+
+class _WideColumn:
+    """
+    Aggregates the values of one column for every person
+    with the same rules as @see fn aggregate_notnan.
+    Numbers are summed into typed arrays, only cells starting
+    with a string or another type keep the list of their values.
+    """
+
+    def __init__(self, capacity):
+        self.first = numpy.zeros(capacity, dtype=numpy.int8)
+        self.count = numpy.zeros(capacity, dtype=numpy.int32)
+        self.sums = numpy.zeros(capacity, dtype=numpy.float64)
+        self.failed = numpy.zeros(capacity, dtype=numpy.bool_)
+        self.values = {}
+
+    def resize(self, capacity):
+        "Increases the number of rows."
+        n = self.first.shape[0]
+        for name in ['first', 'count', 'sums', 'failed']:
+            old = getattr(self, name)
+            new = numpy.zeros(capacity, dtype=old.dtype)
+            new[:n] = old
+            setattr(self, name, new)
+
+    def add(self, row, v):
+        "Adds a value which is not null."
+        if isinstance(v, str):
+            if v in ('ok', 'on'):
+                v = 1
+            elif v == 'skip':
+                v = 1000
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            kind = _NUM
+        elif isinstance(v, str):
+            kind = _STR
+        elif isinstance(v, timedelta):
+            kind = _TD
+        else:
+            kind = _OTHER
+        first = self.first[row]
+        self.count[row] += 1
+        if first == _NONE:
+            self.first[row] = kind
+            first = kind
+            if kind == _NUM:
+                self.sums[row] = v
+            else:
+                self.values[row] = [v]
+        elif first == _NUM:
+            if kind == _NUM:
+                self.sums[row] += v
+            else:
+                # sum(...) raises an exception, the result is 0
+                self.failed[row] = True
+        elif first == _TD:
+            # sum(...) starts with 0 and always fails with durations
+            self.failed[row] = True
+        else:
+            self.values[row].append(v)
+
+    def to_array(self, n):
+        "Returns the aggregated values for the first *n* rows."
+        first = self.first[:n]
+        count = self.count[:n]
+        if (first == _NUM).sum() + (first == _NONE).sum() == n and \
+                not self.failed[:n].any():
+            res = self.sums[:n].copy()
+            res[count == 0] = numpy.nan
+            return res
+        if (first == _TD).sum() + (first == _NONE).sum() == n and \
+                count.max() <= 1:
+            return [self.values[row][0] if first[row] == _TD else pandas.NaT
+                    for row in range(n)]
+        res = []
+        for row in range(n):
+            kind = first[row]
+            if kind == _NONE:
+                res.append(numpy.nan)
+            elif kind == _NUM:
+                res.append(0 if self.failed[row] else self.sums[row])
+            elif kind == _STR:
+                res.append(",".join(str(_) for _ in self.values[row]))
+            elif kind == _TD:
+                res.append(0 if self.failed[row] else
+                           pandas.Timedelta(self.values[row][0]))
+            else:
+                vals = self.values[row]
+                res.append(vals[0] if len(vals) == 1 else _sum_or_zero(vals))
+        return res
+
+
+def _game_columns(games):
+    """
+    Returns the columns expected for a list of games.
+    """
+    cols = []
+    for game in games:
+        name = game.Name
+        for i, act in enumerate(game):
+            prefix = "%s-%d-" % (name, i)
+            answers = act['content'].get('answers', None)
+            if answers:
+                cols.extend(prefix + k for k in answers)
+            else:
+                cols.append(prefix + 'ANS')
+            cols.extend(prefix + k for k in ['b', 'duration', 'good',
+                                             'nbvisit'])
+    return cols
+
+
+def qcmlog_wide_dataframe(observations, games=None, capacity=1024):
+    """
+    Builds one dataframe with one row per person and one column
+    per field ``<game>-<qn>-<field>`` from observations produced by
+    @see fn enumerate_qcmlog. The values are aggregated with the same rules
+    as @see fn aggregate_notnan (only observations ``qtime == 'end'``)
+    but in a single pass filling typed arrays, the cost grows with the
+    number of filled cells and not with the number of persons.
+
+    :param observations: iterator on observations
+    :param games: list of @see cl ActivityGroup, the columns for these
+        games are allocated before reading the observations and
+        are always part of the result, others are added when they appear
+    :param capacity: number of persons allocated at first,
+        the arrays grow if needed
+    :return: dataframe indexed by *person_id*, columns are sorted
+    """
+    columns = {}
+    if games is not None:
+        for col in _game_columns(games):
+            columns[col] = _WideColumn(capacity)
+    persons = {}
+    for obs in observations:
+        if obs.get('qtime', None) != 'end':
+            continue
+        person_id = obs.get('person_id', None)
+        if person_id is None:
+            continue
+        row = persons.get(person_id, None)
+        if row is None:
+            row = len(persons)
+            persons[person_id] = row
+            if row >= capacity:
+                capacity *= 2
+                for col in columns.values():
+                    col.resize(capacity)
+        for k, v in obs.items():
+            if "-" not in k or v is None:
+                continue
+            if isinstance(v, float) and numpy.isnan(v):
+                continue
+            col = columns.get(k, None)
+            if col is None:
+                col = _WideColumn(capacity)
+                columns[k] = col
+            col.add(row, v)
+
+    n = len(persons)
+    names = list(persons)
+    order = numpy.argsort(numpy.array(names, dtype=object), kind='stable') \
+        if n > 0 else numpy.array([], dtype=numpy.int64)
+    index = pandas.Index([names[i] for i in order], name='person_id')
+    data = {}
+    for k in sorted(columns):
+        values = columns[k].to_array(n)
+        if isinstance(values, list):
+            data[k] = pandas.Series(
+                [values[i] for i in order], index=index)
+        else:
+            data[k] = pandas.Series(values[order], index=index)
+    return pandas.DataFrame(data, index=index)